@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_unread(apps, schema_editor):
+    Profil = apps.get_model("accounts", "Profil")
+    Notification = apps.get_model("messaging", "Notification")
+    counts = Notification.objects.filter(lu=False).order_by().values("user_id").annotate(n=Count("id"))
+    for row in counts.iterator():
+        Profil.objects.filter(user_id=row["user_id"]).update(notifications_non_lues=row["n"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_profil_role'),
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profil',
+            name='notifications_non_lues',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -22,6 +22,8 @@ class Profil(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="profil")
     role = models.CharField(max_length=30, choices=ROLE_CHOICES, default=ROLE_AGENT)
     telephone = models.CharField(max_length=30, blank=True)
+    # Compteur dénormalisé des notifications non lues (voir messaging/services.py)
+    notifications_non_lues = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -1,4 +1,8 @@
-"""Configuration ASGI pour le projet."""
+"""Configuration ASGI pour le projet.
+
+Nécessaire pour le flux temps réel des notifications (``/notifications/flux/``),
+par ex. ``uvicorn adjahi_platform.asgi:application``.
+"""
 
 import os
 
@@ -103,6 +103,16 @@ DATABASES = {
     }
 }
 
+# Cache Django: mémoire du processus par défaut. Avec plusieurs workers, un cache partagé
+# (ex. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://...)
+# propage les invalidations à tous les processus.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "adjahi"),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -137,6 +147,9 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Pagination par curseur (keyset) sur l'attribut ``ordering`` de chaque viewset
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.KeysetCursorPagination",
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", "50")),
 }
 
 if DEBUG:
@@ -144,6 +157,92 @@ if DEBUG:
         "rest_framework.authentication.BasicAuthentication"
     )
 
+# Journal d'audit: écriture asynchrone par lots (voir audit/writer.py)
+AUDIT_ASYNC_ENABLED = os.getenv("AUDIT_ASYNC_ENABLED", "1") == "1"
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL_MS = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "500"))
+# Répertoire du spool JSONL (vide = désactivé)
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR", "")
+
+# Suivi des accès patients (date_dernier_acces): écriture groupée toutes les N secondes
+# (0 = écriture immédiate) et dédoublonnage des accès répétés sur la fenêtre donnée.
+PATIENT_ACCESS_FLUSH_INTERVAL = int(os.getenv("PATIENT_ACCESS_FLUSH_INTERVAL", "30"))
+PATIENT_ACCESS_DEDUP_WINDOW = int(os.getenv("PATIENT_ACCESS_DEDUP_WINDOW", "300"))
+
+# Agrégats journaliers des tableaux de bord (commande refresh_kpi_rollups):
+# les jours postérieurs au dernier rafraîchissement sont calculés en direct.
+KPI_ROLLUP_LIVE_FALLBACK = os.getenv("KPI_ROLLUP_LIVE_FALLBACK", "1") == "1"
+
+# Exports Excel en flux: nombre de lignes lues par requête.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+
+# Purge de rétention (core/purge.py, commande purge_data): lignes supprimées par lot
+# et pause entre deux lots (secondes) pour ne pas bloquer le trafic.
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "5000"))
+PURGE_BATCH_PAUSE = float(os.getenv("PURGE_BATCH_PAUSE", "0.1"))
+
+# Rapports générés en tâche de fond (voir reports/jobs.py): worker intégré au processus web
+# (sinon `python manage.py run_report_worker`), réutilisation d'un fichier identique récent
+# et délai au-delà duquel une génération "en cours" est considérée interrompue (secondes).
+REPORT_WORKER_EMBEDDED = os.getenv("REPORT_WORKER_EMBEDDED", "1") == "1"
+REPORT_WORKER_POLL_INTERVAL = int(os.getenv("REPORT_WORKER_POLL_INTERVAL", "5"))
+REPORT_REUSE_SECONDS = int(os.getenv("REPORT_REUSE_SECONDS", "900"))
+REPORT_JOB_TIMEOUT = int(os.getenv("REPORT_JOB_TIMEOUT", "1800"))
+
+# Rendu PDF (voir core/pdf.py): processus dédiés (0 = rendu dans la requête), rendus en attente
+# au-delà desquels on répond 503, délai maximal (secondes) et cache des ordonnances (vide = désactivé).
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+PDF_RENDER_QUEUE = int(os.getenv("PDF_RENDER_QUEUE", "8"))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", str(BASE_DIR / "var" / "pdf_cache"))
+
+# Rappels SMS (voir patients/sms_dispatch.py): envois simultanés, débit max vers le
+# provider (SMS/s, 0 = illimité), nombre d'essais et délai initial (secondes, doublé à chaque essai).
+SMS_CONCURRENCY = int(os.getenv("SMS_CONCURRENCY", "10"))
+SMS_RATE_PER_SECOND = float(os.getenv("SMS_RATE_PER_SECOND", "20"))
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", "3"))
+SMS_RETRY_BACKOFF = float(os.getenv("SMS_RETRY_BACKOFF", "1.0"))
+# Réservation des rappels (patients/reminders.py): taille des lots, durée du bail (secondes)
+# et nombre maximal de réservations d'un même rappel avant échec définitif.
+SMS_REMINDER_BATCH = int(os.getenv("SMS_REMINDER_BATCH", "500"))
+SMS_REMINDER_LEASE_SECONDS = int(os.getenv("SMS_REMINDER_LEASE_SECONDS", "300"))
+SMS_REMINDER_MAX_CLAIMS = int(os.getenv("SMS_REMINDER_MAX_CLAIMS", "3"))
+# Provider SMS (patients/sms_provider.py): local_file (dev), http, fake ou chemin pointé.
+SMS_BACKEND = os.getenv("SMS_BACKEND", "local_file")
+SMS_OUTBOX_PATH = os.getenv("SMS_OUTBOX_PATH", str(BASE_DIR / "logs" / "sms_outbox.log"))
+SMS_HTTP_URL = os.getenv("SMS_HTTP_URL", "")
+SMS_HTTP_TOKEN = os.getenv("SMS_HTTP_TOKEN", "")
+SMS_HTTP_SENDER = os.getenv("SMS_HTTP_SENDER", "ADJAHI")
+SMS_HTTP_TIMEOUT = float(os.getenv("SMS_HTTP_TIMEOUT", "10"))
+# SMS émis par les vues (confirmation de RDV): envoi en tâche de fond après le commit
+SMS_ASYNC_ENABLED = os.getenv("SMS_ASYNC_ENABLED", "1") == "1"
+
+# Notifications en temps réel (messaging/realtime.py): flux SSE servi en ASGI
+# (uvicorn/daphne sur adjahi_platform.asgi). Pub/sub en mémoire du processus
+# ou Redis (paquet `redis`) pour plusieurs processus.
+REALTIME_BROKER = os.getenv("REALTIME_BROKER", "memory")
+REALTIME_REDIS_URL = os.getenv("REALTIME_REDIS_URL", "redis://localhost:6379/0")
+REALTIME_HEARTBEAT_SECONDS = int(os.getenv("REALTIME_HEARTBEAT_SECONDS", "20"))
+# En WSGI, le flux renvoie l'état courant et le navigateur se reconnecte après ce délai (ms).
+REALTIME_WSGI_RETRY_MS = int(os.getenv("REALTIME_WSGI_RETRY_MS", "15000"))
+# Boîte de réception (messaging/inbox.py): fils par page ; messages affichés par fenêtre
+# dans un fil (messaging/history.py).
+INBOX_PAGE_SIZE = int(os.getenv("INBOX_PAGE_SIZE", "30"))
+MESSAGE_WINDOW_SIZE = int(os.getenv("MESSAGE_WINDOW_SIZE", "50"))
+
+# Recherche patients (patients/search.py): indicatif ajouté aux numéros nationaux (E.164).
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "225")
+# Liste des patients (patients/listing.py): patients par page et durée (secondes) du cache
+# des compteurs par zone, invalidé à chaque création/modification.
+PATIENT_PAGE_SIZE = int(os.getenv("PATIENT_PAGE_SIZE", "50"))
+PATIENT_KPI_CACHE_SECONDS = int(os.getenv("PATIENT_KPI_CACHE_SECONDS", "300"))
+# Dossier patient (patients/dossier.py): entrées affichées par rubrique, puis par « Voir plus ».
+DOSSIER_SECTION_SIZE = int(os.getenv("DOSSIER_SECTION_SIZE", "10"))
+# Doublons (patients/duplicates.py): score minimal (0..1) d'une paire enregistrée.
+DUPLICATE_MIN_SCORE = float(os.getenv("DUPLICATE_MIN_SCORE", "0.85"))
+# Anonymisation RGPD (patients/anonymization.py): patients traités par transaction.
+ANONYMIZATION_CHUNK_SIZE = int(os.getenv("ANONYMIZATION_CHUNK_SIZE", "500"))
+
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/accounts/login/"
@@ -0,0 +1,26 @@
+"""ETag / If-None-Match pour les réponses GET de l'API."""
+
+from __future__ import annotations
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+class ConditionalGetMixin:
+    """Ajoute un ETag (empreinte du contenu) et répond 304 si le client l'a déjà.
+
+    Le corps est tout de même calculé côté serveur : le gain porte sur la
+    bande passante des clients mobiles qui rafraîchissent une page inchangée.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ("GET", "HEAD") or response.status_code != 200 or response.has_header("ETag"):
+            return response
+
+        response.render()
+        etag = quote_etag(hashlib.md5(response.content, usedforsecurity=False).hexdigest())
+        response["ETag"] = etag
+        return get_conditional_response(request, etag=etag, response=response)
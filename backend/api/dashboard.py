@@ -0,0 +1,148 @@
+"""Agrégats du tableau de bord API en un nombre constant de requêtes.
+
+Les compteurs patients/consultations/CPN sont lus par (jour, zone) depuis les
+agrégats journaliers (``core.rollups.KpiReader``, calcul direct pour les jours
+récents) puis sommés en Python ; seuls les RDV à 24h et les perdues de vue sont
+calculés en direct. Le nombre de requêtes ne dépend pas du nombre de zones.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any
+
+from django.db.models import Count
+from django.utils import timezone
+
+from core.rollups import KpiReader
+from patients.models import Patient, RendezVous, SuiviCPN
+
+KPI_FIELDS = [
+    "total_patients",
+    "total_consultations",
+    "rdv_24h",
+    "cpn1",
+    "cpn2",
+    "cpn3",
+    "cpn4",
+    "perdues_de_vue",
+]
+SECTION_FIELDS = ["consultations_daily", "zone_stats"]
+ALL_FIELDS = KPI_FIELDS + SECTION_FIELDS
+
+# Colonnes d'agrégats nécessaires à chaque champ.
+_COLUMNS = {
+    "total_patients": {"patients"},
+    "total_consultations": {"consultations"},
+    "rdv_24h": set(),
+    "cpn1": {"cpn1"},
+    "cpn2": {"cpn2"},
+    "cpn3": {"cpn3"},
+    "cpn4": {"cpn4"},
+    "perdues_de_vue": set(),
+    "consultations_daily": {"consultations"},
+    "zone_stats": {"patients", "consultations", "cpn1"},
+}
+
+
+def zone_codes() -> list[str]:
+    return [code for code, _label in Patient._meta.get_field("zone").choices]
+
+
+def parse_fields(raw: str | None) -> list[str]:
+    """Champs demandés via ``?fields=a,b`` (tous par défaut) ; lève ``ValueError`` si inconnus."""
+    if not raw:
+        return list(ALL_FIELDS)
+    requested = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in ALL_FIELDS]
+    if unknown:
+        raise ValueError(", ".join(unknown))
+    return requested
+
+
+def build_summary(
+    *,
+    zone: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+    fields: list[str] | None = None,
+) -> dict[str, Any]:
+    fields = list(fields or ALL_FIELDS)
+    columns: set[str] = set()
+    for f in fields:
+        columns |= _COLUMNS[f]
+
+    # Une seule lecture (jour, zone) sert aux KPI, aux stats par zone et au journalier.
+    rows = KpiReader().zone_rows(sorted(columns)) if columns else []
+
+    def total(column: str, *, in_zone: str | None = zone, period: bool = True) -> int:
+        n = 0
+        for r in rows:
+            if in_zone and r["zone"] != in_zone:
+                continue
+            if period and ((start and r["day"] < start) or (end and r["day"] > end)):
+                continue
+            n += r[column]
+        return n
+
+    now = timezone.now()
+    rdv_by_zone: dict[str, int] = {}
+    if "rdv_24h" in fields or "zone_stats" in fields:
+        rdv_by_zone = {
+            r["patient__zone"]: r["n"]
+            for r in RendezVous.objects.filter(
+                statut="PLANIFIE", date_heure__gte=now, date_heure__lte=now + timedelta(hours=24)
+            )
+            .order_by()
+            .values("patient__zone")
+            .annotate(n=Count("id"))
+        }
+
+    kpis: dict[str, int] = {}
+    if "total_patients" in fields:
+        kpis["total_patients"] = total("patients", period=False)
+    if "total_consultations" in fields:
+        kpis["total_consultations"] = total("consultations")
+    if "rdv_24h" in fields:
+        kpis["rdv_24h"] = rdv_by_zone.get(zone, 0) if zone else sum(rdv_by_zone.values())
+    for n in (1, 2, 3, 4):
+        if f"cpn{n}" in fields:
+            kpis[f"cpn{n}"] = total(f"cpn{n}")
+
+    if "perdues_de_vue" in fields:
+        # "Perdues de vue" (règle simple): CPN1 faite, mais pas CPN2 après 60 jours
+        cutoff = timezone.localdate() - timedelta(days=60)
+        cpn1_old_patient_ids = SuiviCPN.objects.filter(numero=1, date__lte=cutoff).values_list("patient_id", flat=True)
+        cpn2_patient_ids = SuiviCPN.objects.filter(numero=2).values_list("patient_id", flat=True)
+        perdues_de_vue = Patient.objects.filter(id__in=cpn1_old_patient_ids).exclude(id__in=cpn2_patient_ids)
+        if zone:
+            perdues_de_vue = perdues_de_vue.filter(zone=zone)
+        kpis["perdues_de_vue"] = perdues_de_vue.count()
+
+    payload: dict[str, Any] = {}
+    if kpis:
+        payload["kpis"] = kpis
+
+    if "consultations_daily" in fields:
+        daily: dict[date, int] = {}
+        for r in rows:
+            if zone and r["zone"] != zone:
+                continue
+            if (start and r["day"] < start) or (end and r["day"] > end) or not r["consultations"]:
+                continue
+            daily[r["day"]] = daily.get(r["day"], 0) + r["consultations"]
+        payload["consultations_daily"] = [{"day": str(day), "count": count} for day, count in sorted(daily.items())]
+
+    if "zone_stats" in fields:
+        payload["zone_stats"] = [
+            {
+                "zone": z,
+                "patients": total("patients", in_zone=z, period=False),
+                "consultations": total("consultations", in_zone=z, period=False),
+                "cpn1": total("cpn1", in_zone=z, period=False),
+                "rdv_24h": rdv_by_zone.get(z, 0),
+            }
+            for z in zone_codes()
+        ]
+
+    return payload
@@ -0,0 +1,128 @@
+"""Pagination par curseur (keyset) sur un ordre stable et composite.
+
+Le curseur encode les valeurs de tri de la dernière (ou première) ligne de la
+page ; la page suivante est obtenue par un filtre lexicographique
+``(a, id) > (a0, id0)`` au lieu d'un OFFSET, ce qui garde un coût constant
+quelle que soit la profondeur de pagination.
+
+L'ordre vient de l'attribut ``ordering`` de la vue (ex. ``("-date_consultation", "id")``) ;
+``id`` est ajouté s'il manque pour garantir l'unicité.
+
+Le curseur a le format de ``core.keyset`` (valeurs de tri suivies du sens,
+``1`` pour la page précédente) ; ses valeurs sont typées selon les champs de
+tri, un curseur illisible ou mal typé donne ``404``.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.keyset import cursor_values, decode_cursor, encode_cursor, keyset_filter, ordering_fields
+
+
+def _invert(ordering: tuple[str, ...]) -> tuple[str, ...]:
+    return tuple(f[1:] if f.startswith("-") else f"-{f}" for f in ordering)
+
+
+class KeysetCursorPagination(BasePagination):
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    default_ordering = ("-id",)
+
+    def get_ordering(self, view) -> tuple[str, ...]:
+        ordering = tuple(getattr(view, "ordering", None) or self.default_ordering)
+        if not any(f.lstrip("-") in ("id", "pk") for f in ordering):
+            ordering += ("id",)
+        return ordering
+
+    def get_page_size(self, request) -> int:
+        page_size = api_settings.PAGE_SIZE or 50
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw:
+            try:
+                page_size = int(raw)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def decode_cursor(self, request, queryset) -> tuple[list[Any], bool] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        data = decode_cursor(encoded, len(self.ordering) + 1)
+        if data is None or data[-1] not in (0, 1):
+            raise NotFound("Curseur invalide.")
+        values = cursor_values(data[:-1], ordering_fields(queryset, self.ordering))
+        if values is None:
+            raise NotFound("Curseur invalide.")
+        return values, bool(data[-1])
+
+    def encode_cursor(self, obj, *, reverse: bool) -> str:
+        values = [getattr(obj, f.lstrip("-")) for f in self.ordering]
+        encoded = encode_cursor([*values, int(reverse)])
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(view)
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request, queryset)
+        reverse = bool(cursor and cursor[1])
+        ordering = _invert(self.ordering) if reverse else self.ordering
+
+        qs = queryset.order_by(*ordering)
+        if cursor:
+            qs = qs.filter(keyset_filter(ordering, cursor[0]))
+
+        rows = list(qs[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
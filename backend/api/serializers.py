@@ -1,11 +1,53 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 
 from community.models import DossierCommunautaire, Pathologie, SuiviCommunautaire
 from messaging.models import Message, Notification, Thread
-from patients.models import Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
+from patients.models import CasSuivi, Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
 
 
-class PatientSerializer(serializers.ModelSerializer):
+def requested_fields(request) -> set[str] | None:
+    """Champs demandés via ``?fields=a,b`` (None = tous), en lecture seulement.
+
+    Une écriture garde tous ses champs : les données envoyées ne doivent pas
+    être ignorées à cause du paramètre.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    raw = request.query_params.get("fields")
+    if not raw:
+        return None
+    return {f.strip() for f in raw.split(",") if f.strip()}
+
+
+class SparseFieldsMixin:
+    """Sélection de champs pour le serializer racine d'une requête.
+
+    ``?fields=id,nom`` ne renvoie que ces champs ; ``?expand=patient`` remplace
+    la clé étrangère par l'objet imbriqué (serializers déclarés dans
+    ``Meta.expandable``, en lecture seule).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self._context.get("request") if hasattr(self, "_context") else None
+        if request is None:
+            return
+
+        fields = requested_fields(request)
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+        if request.method in SAFE_METHODS:
+            expandable = getattr(self.Meta, "expandable", {})
+            raw = request.query_params.get("expand") or ""
+            for name in {f.strip() for f in raw.split(",") if f.strip()}:
+                if name in expandable and name in self.fields:
+                    self.fields[name] = expandable[name](read_only=True)
+
+
+class PatientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Patient
         fields = [
@@ -24,31 +66,41 @@ class PatientSerializer(serializers.ModelSerializer):
         ]
 
 
-class ConsultationSerializer(serializers.ModelSerializer):
+class ConsultationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Consultation
         fields = ["id", "patient", "date_consultation", "motif", "observation", "created_at"]
+        expandable = {"patient": PatientSerializer}
 
 
-class SuiviCPNSerializer(serializers.ModelSerializer):
+class SuiviCPNSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SuiviCPN
         fields = ["id", "patient", "numero", "date", "notes", "created_at"]
+        expandable = {"patient": PatientSerializer}
 
 
-class RendezVousSerializer(serializers.ModelSerializer):
+class RendezVousSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = RendezVous
         fields = ["id", "patient", "date_heure", "objet", "statut", "created_at"]
+        expandable = {"patient": PatientSerializer}
+
+
+class CasSuiviSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CasSuivi
+        fields = ["id", "patient", "type_cas", "statut", "date_signalement", "notes", "created_at"]
+        expandable = {"patient": PatientSerializer}
 
 
-class LigneOrdonnanceSerializer(serializers.ModelSerializer):
+class LigneOrdonnanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = LigneOrdonnance
         fields = ["id", "ordonnance", "medicament", "posologie", "duree", "commentaire"]
 
 
-class OrdonnanceSerializer(serializers.ModelSerializer):
+class OrdonnanceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     lignes = LigneOrdonnanceSerializer(many=True, read_only=True)
 
     class Meta:
@@ -62,21 +114,22 @@ class OrdonnanceSerializer(serializers.ModelSerializer):
             "created_at",
             "lignes",
         ]
+        expandable = {"patient": PatientSerializer}
 
 
-class PathologieSerializer(serializers.ModelSerializer):
+class PathologieSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Pathologie
         fields = ["id", "code", "nom"]
 
 
-class SuiviCommunautaireSerializer(serializers.ModelSerializer):
+class SuiviCommunautaireSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SuiviCommunautaire
         fields = ["id", "dossier", "date", "traitement", "observation", "created_at"]
 
 
-class DossierCommunautaireSerializer(serializers.ModelSerializer):
+class DossierCommunautaireSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     suivis = SuiviCommunautaireSerializer(many=True, read_only=True)
 
     class Meta:
@@ -91,21 +144,22 @@ class DossierCommunautaireSerializer(serializers.ModelSerializer):
             "created_at",
             "suivis",
         ]
+        expandable = {"patient": PatientSerializer, "pathologie": PathologieSerializer}
 
 
-class ThreadSerializer(serializers.ModelSerializer):
+class ThreadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Thread
         fields = ["id", "sujet", "participants", "created_at"]
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ["id", "thread", "sender", "contenu", "created_at"]
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ["id", "user", "type", "titre", "corps", "url", "lu", "created_at"]
@@ -0,0 +1,139 @@
+"""Historique chronologique d'un patient, toutes rubriques confondues.
+
+Chaque source (CPN, rendez-vous, consultations, ordonnances, cas suivis,
+suivis communautaires) est lue du plus récent au plus ancien par paquets
+keyset sur ``(date, id)`` ; ``heapq.merge`` fusionne ces flux à la demande,
+si bien qu'une page de N évènements lit au plus N + 1 lignes par source.
+
+Le curseur garde, pour chaque source, la clé du dernier évènement renvoyé
+(``None`` si la source n'a encore rien fourni) : la page suivante reprend
+chaque flux juste après. Une date sans heure est placée au début de sa
+journée (fuseau courant) pour la fusion avec les dates-heures.
+"""
+
+from __future__ import annotations
+
+import heapq
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Any, Callable, Iterator
+
+from django.db.models import DateField, Prefetch, QuerySet
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from community.models import SuiviCommunautaire
+from core.keyset import cursor_values, decode_cursor, encode_cursor, keyset_filter, ordering_fields
+from patients.models import CasSuivi, Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
+
+from .serializers import (
+    CasSuiviSerializer,
+    ConsultationSerializer,
+    OrdonnanceSerializer,
+    RendezVousSerializer,
+    SuiviCommunautaireSerializer,
+    SuiviCPNSerializer,
+)
+
+
+@dataclass(frozen=True)
+class Source:
+    name: str
+    queryset: Callable[[Patient], QuerySet]
+    # Champ (ou annotation) portant la date de l'évènement
+    field: str
+    serializer: type
+
+    @property
+    def ordering(self) -> tuple[str, str]:
+        return (f"-{self.field}", "-id")
+
+
+SOURCES: tuple[Source, ...] = (
+    Source("cpn", lambda p: SuiviCPN.objects.filter(patient=p), "date", SuiviCPNSerializer),
+    Source("rdv", lambda p: RendezVous.objects.filter(patient=p), "date_heure", RendezVousSerializer),
+    Source(
+        "consultation", lambda p: Consultation.objects.filter(patient=p), "date_consultation", ConsultationSerializer
+    ),
+    Source(
+        "ordonnance",
+        lambda p: Ordonnance.objects.filter(patient=p).prefetch_related(
+            Prefetch("lignes", queryset=LigneOrdonnance.objects.order_by("id"))
+        ),
+        "date",
+        OrdonnanceSerializer,
+    ),
+    Source(
+        "cas_suivi",
+        # Cas sans date de signalement : date de saisie.
+        lambda p: CasSuivi.objects.filter(patient=p).annotate(
+            date_evenement=Coalesce("date_signalement", TruncDate("created_at"), output_field=DateField())
+        ),
+        "date_evenement",
+        CasSuiviSerializer,
+    ),
+    Source(
+        "suivi_communautaire",
+        lambda p: SuiviCommunautaire.objects.filter(dossier__patient=p),
+        "date",
+        SuiviCommunautaireSerializer,
+    ),
+)
+
+
+def _moment(value: date | datetime) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def _stream(index: int, source: Source, patient: Patient, after: list[Any] | None, chunk: int) -> Iterator[tuple]:
+    """Évènements d'une source, du plus récent au plus ancien, avec leur clé de fusion."""
+    qs = source.queryset(patient).order_by(*source.ordering)
+    while True:
+        page = qs.filter(keyset_filter(source.ordering, after)) if after else qs
+        rows = list(page[:chunk])
+        for obj in rows:
+            when = getattr(obj, source.field)
+            yield (-_moment(when).timestamp(), index, -obj.pk), obj, when
+        if len(rows) < chunk:
+            return
+        after = [getattr(rows[-1], source.field), rows[-1].pk]
+
+
+def decode_timeline_cursor(raw: str | None, patient: Patient) -> list[list[Any] | None]:
+    """Positions par source, typées selon leur ordre ; ``ValueError`` si le curseur est illisible."""
+    if not raw:
+        return [None] * len(SOURCES)
+    positions = decode_cursor(raw, len(SOURCES))
+    if positions is None:
+        raise ValueError("curseur invalide")
+    for i, (source, position) in enumerate(zip(SOURCES, positions)):
+        if position is None:
+            continue
+        fields = ordering_fields(source.queryset(patient), source.ordering)
+        positions[i] = cursor_values(position, fields) if isinstance(position, list) else None
+        if positions[i] is None:
+            raise ValueError("curseur invalide")
+    return positions
+
+
+def patient_timeline(patient: Patient, *, cursor: str | None = None, page_size: int = 50) -> dict[str, Any]:
+    """Page d'évènements après ``cursor`` ; ``next_cursor`` vaut ``None`` en fin d'historique."""
+    positions = decode_timeline_cursor(cursor, patient)
+    streams = [_stream(i, source, patient, positions[i], page_size + 1) for i, source in enumerate(SOURCES)]
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+
+    results = []
+    has_more = False
+    for key, obj, when in merged:
+        if len(results) == page_size:
+            has_more = True
+            break
+        index = key[1]
+        source = SOURCES[index]
+        positions[index] = [when, obj.pk]
+        results.append({"type": source.name, "date": when.isoformat(), "data": source.serializer(obj).data})
+    for stream in streams:
+        stream.close()
+    return {"results": results, "next_cursor": encode_cursor(positions) if has_more else None}
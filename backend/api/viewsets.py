@@ -1,9 +1,17 @@
+from django.db.models import Prefetch
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from community.models import DossierCommunautaire, Pathologie, SuiviCommunautaire
 from messaging.models import Message, Notification, Thread
+from messaging.services import mark_all_read, recount_unread
 from patients.models import Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
 
+from .conditional import ConditionalGetMixin
 from .serializers import (
     ConsultationSerializer,
     LigneOrdonnanceSerializer,
@@ -17,64 +25,134 @@ from .serializers import (
     SuiviCommunautaireSerializer,
     SuiviCPNSerializer,
     ThreadSerializer,
+    requested_fields,
 )
+from .timeline import patient_timeline
 
 
-class PatientViewSet(viewsets.ModelViewSet):
-    queryset = Patient.objects.all()
-    serializer_class = PatientSerializer
+class BaseModelViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """ModelViewSet de l'API : pagination par curseur sur ``ordering`` et ETag."""
+
+    ordering: tuple[str, ...] = ("-id",)
+
+    def wants(self, field: str) -> bool:
+        fields = requested_fields(self.request)
+        return fields is None or field in fields
 
 
-class ConsultationViewSet(viewsets.ModelViewSet):
+class PatientViewSet(BaseModelViewSet):
+    queryset = Patient.objects.all()
+    serializer_class = PatientSerializer
+    ordering = ("nom", "prenoms", "id")
+
+    @action(detail=True, methods=["get"])
+    def timeline(self, request, pk=None):
+        """Historique du patient toutes rubriques confondues, du plus récent au plus ancien."""
+        patient = get_object_or_404(Patient.objects.only("id"), pk=pk)
+        page_size = self.paginator.get_page_size(request)
+        try:
+            page = patient_timeline(patient, cursor=request.query_params.get("cursor"), page_size=page_size)
+        except ValueError:
+            raise NotFound("Curseur invalide.")
+        next_link = None
+        if page["next_cursor"]:
+            next_link = replace_query_param(request.build_absolute_uri(), "cursor", page["next_cursor"])
+        return Response({"next": next_link, "results": page["results"]})
+
+
+class ConsultationViewSet(BaseModelViewSet):
     queryset = Consultation.objects.select_related("patient").all()
     serializer_class = ConsultationSerializer
+    ordering = ("-date_consultation", "id")
 
 
-class SuiviCPNViewSet(viewsets.ModelViewSet):
+class SuiviCPNViewSet(BaseModelViewSet):
     queryset = SuiviCPN.objects.select_related("patient").all()
     serializer_class = SuiviCPNSerializer
+    ordering = ("-date", "id")
 
 
-class RendezVousViewSet(viewsets.ModelViewSet):
+class RendezVousViewSet(BaseModelViewSet):
     queryset = RendezVous.objects.select_related("patient").all()
     serializer_class = RendezVousSerializer
+    ordering = ("-date_heure", "id")
 
 
-class OrdonnanceViewSet(viewsets.ModelViewSet):
-    queryset = Ordonnance.objects.select_related("patient").prefetch_related("lignes").all()
+class OrdonnanceViewSet(BaseModelViewSet):
+    queryset = Ordonnance.objects.select_related("patient").all()
     serializer_class = OrdonnanceSerializer
+    ordering = ("-date", "-id")
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.wants("lignes"):
+            qs = qs.prefetch_related(Prefetch("lignes", queryset=LigneOrdonnance.objects.order_by("id")))
+        return qs
 
-class LigneOrdonnanceViewSet(viewsets.ModelViewSet):
+
+class LigneOrdonnanceViewSet(BaseModelViewSet):
     queryset = LigneOrdonnance.objects.select_related("ordonnance", "ordonnance__patient").all()
     serializer_class = LigneOrdonnanceSerializer
+    ordering = ("id",)
 
 
-class PathologieViewSet(viewsets.ModelViewSet):
+class PathologieViewSet(BaseModelViewSet):
     queryset = Pathologie.objects.all()
     serializer_class = PathologieSerializer
+    ordering = ("nom", "id")
 
 
-class DossierCommunautaireViewSet(viewsets.ModelViewSet):
-    queryset = DossierCommunautaire.objects.select_related("patient", "pathologie").prefetch_related("suivis").all()
+class DossierCommunautaireViewSet(BaseModelViewSet):
+    queryset = DossierCommunautaire.objects.select_related("patient", "pathologie").all()
     serializer_class = DossierCommunautaireSerializer
+    ordering = ("-date_diagnostic", "-id")
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.wants("suivis"):
+            qs = qs.prefetch_related("suivis")
+        return qs
 
 
-class SuiviCommunautaireViewSet(viewsets.ModelViewSet):
+class SuiviCommunautaireViewSet(BaseModelViewSet):
     queryset = SuiviCommunautaire.objects.select_related("dossier", "dossier__patient", "dossier__pathologie").all()
     serializer_class = SuiviCommunautaireSerializer
+    ordering = ("-date", "-id")
 
 
-class ThreadViewSet(viewsets.ModelViewSet):
+class ThreadViewSet(BaseModelViewSet):
     queryset = Thread.objects.all().prefetch_related("participants")
     serializer_class = ThreadSerializer
+    ordering = ("-created_at", "-id")
 
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(BaseModelViewSet):
     queryset = Message.objects.select_related("thread", "sender").all()
     serializer_class = MessageSerializer
+    ordering = ("created_at", "id")
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(BaseModelViewSet):
     queryset = Notification.objects.select_related("user").all()
     serializer_class = NotificationSerializer
+    ordering = ("-created_at", "-id")
+
+    # Écritures unitaires : le compteur de non-lues des utilisateurs concernés est resynchronisé.
+    def perform_create(self, serializer):
+        notification = serializer.save()
+        recount_unread([notification.user_id])
+
+    def perform_update(self, serializer):
+        previous_user_id = serializer.instance.user_id
+        notification = serializer.save()
+        recount_unread({previous_user_id, notification.user_id})
+
+    def perform_destroy(self, instance):
+        user_id = instance.user_id
+        instance.delete()
+        recount_unread([user_id])
+
+    @action(detail=False, methods=["post"], url_path="tout-lire")
+    def mark_all_read(self, request):
+        """Marque toutes les notifications de l'utilisateur connecté comme lues."""
+        return Response({"updated": mark_all_read(request.user.pk), "count": 0})
@@ -3,11 +3,10 @@ from __future__ import annotations
 from typing import Callable
 
 from django.http import HttpRequest, HttpResponse
-from django.utils import timezone
 
 from audit.models import AuditLog
 from audit.utils import log_action
-from patients.models import Patient
+from patients.access_tracking import get_tracker
 
 
 class AuditMiddleware:
@@ -41,11 +40,8 @@ class AuditMiddleware:
             if len(parts) >= 2 and parts[0] == "patients":
                 pk_str = parts[1]
                 if pk_str.isdigit():
-                    try:
-                        patient = Patient.objects.get(pk=int(pk_str))
-                        Patient.objects.filter(pk=patient.pk).update(date_dernier_acces=timezone.now())
-                    except Patient.DoesNotExist:
-                        pass
+                    # Écrit en différé, par lots (voir patients/access_tracking.py)
+                    get_tracker().record(int(pk_str))
 
         return response
 
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('CREATE', 'CREATE'), ('UPDATE', 'UPDATE'), ('DELETE', 'DELETE'), ('EXPORT', 'EXPORT'), ('LOGIN', 'LOGIN'), ('LOGOUT', 'LOGOUT'), ('ACCESS', 'ACCESS')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -2,9 +2,13 @@ from __future__ import annotations
 
 from typing import Any
 
+from django.conf import settings
+from django.db import connection
 from django.http import HttpRequest
+from django.utils import timezone
 
 from .models import AuditLog
+from .writer import get_writer
 
 
 def _get_client_ip(request: HttpRequest) -> str:
@@ -14,6 +18,16 @@ def _get_client_ip(request: HttpRequest) -> str:
     return request.META.get("REMOTE_ADDR", "") or ""
 
 
+def request_audit_fields(request: HttpRequest) -> dict[str, Any]:
+    """Auteur, IP et user-agent d'une requête, pour une entrée ``AuditLog``."""
+    user = request.user if getattr(request, "user", None) and request.user.is_authenticated else None
+    return {
+        "user_id": user.pk if user is not None else None,
+        "ip_address": _get_client_ip(request),
+        "user_agent": (request.META.get("HTTP_USER_AGENT", "") or "")[:255],
+    }
+
+
 def log_action(
     request: HttpRequest,
     *,
@@ -31,16 +45,23 @@ def log_action(
         object_id = object_id or str(getattr(instance, "pk", ""))
         object_repr = object_repr or str(instance)
 
-    user = request.user if getattr(request, "user", None) and request.user.is_authenticated else None
+    fields = {
+        "action": action,
+        "app_label": app_label,
+        "model": model,
+        "object_id": object_id,
+        "object_repr": object_repr[:255],
+        **request_audit_fields(request),
+        "extra": extra or {},
+    }
+
+    # Dans une transaction, l'entrée doit suivre son sort (commit/rollback) :
+    # écriture synchrone sur la connexion courante.
+    if not getattr(settings, "AUDIT_ASYNC_ENABLED", False) or connection.in_atomic_block:
+        AuditLog.objects.create(**fields)
+        return
 
-    AuditLog.objects.create(
-        user=user,
-        action=action,
-        app_label=app_label,
-        model=model,
-        object_id=object_id,
-        object_repr=object_repr,
-        ip_address=_get_client_ip(request),
-        user_agent=(request.META.get("HTTP_USER_AGENT", "") or "")[:255],
-        extra=extra or {},
-    )
+    fields["created_at"] = timezone.now().isoformat()
+    # Les accès (ACCESS) restent en file ; les actions explicites forcent
+    # l'écriture de tout ce qui précède et attendent leur persistance.
+    get_writer().submit(fields, wait=action != AuditLog.ACTION_ACCESS)
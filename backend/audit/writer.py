@@ -0,0 +1,330 @@
+"""Écriture asynchrone et groupée des journaux d'audit.
+
+Les entrées sont placées dans une file en mémoire puis insérées par lots
+(``bulk_create``) par un thread de fond, dès que ``AUDIT_BATCH_SIZE`` entrées
+sont en attente ou au plus tard après ``AUDIT_FLUSH_INTERVAL_MS``.
+
+Un spool JSONL optionnel (``AUDIT_SPOOL_DIR``) conserve sur disque les entrées
+pas encore écrites en base : après un crash du processus, elles sont rejouées
+au démarrage du writer suivant.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class _Entry:
+    # fields=None correspond à une simple demande de flush.
+    fields: dict[str, Any] | None
+    done: threading.Event | None = field(default=None)
+
+
+def _build_logs(records: list[dict[str, Any]]) -> list:
+    from .models import AuditLog
+
+    logs = []
+    for fields in records:
+        values = dict(fields)
+        values["created_at"] = parse_datetime(values["created_at"])
+        logs.append(AuditLog(**values))
+    return logs
+
+
+def _database_available() -> bool:
+    try:
+        connections["default"].ensure_connection()
+    except Exception:
+        return False
+    return True
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class _Spool:
+    """Spool JSONL append-only propre à un processus.
+
+    Les lignes sont écrites dans l'ordre de la file ; le fichier ``.offset``
+    indique combien de lignes sont déjà en base. Le spool est vidé dès que
+    toutes les entrées sont écrites.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.path = directory / f"audit-{os.getpid()}.jsonl"
+        self.offset_path = self.path.with_suffix(".offset")
+        self._fh = None
+        self._written = 0
+        self._committed = 0
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+
+    def append(self, fields: dict[str, Any]) -> None:
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.write(json.dumps(fields, ensure_ascii=False) + "\n")
+            self._fh.flush()
+            self._written += 1
+
+    def commit(self, count: int) -> None:
+        with self._lock:
+            self._committed += count
+            if self._committed >= self._written:
+                self._fh.seek(0)
+                self._fh.truncate()
+                self._written = 0
+                self._committed = 0
+                self.offset_path.unlink(missing_ok=True)
+                return
+
+            tmp = self.offset_path.with_suffix(".offset.tmp")
+            tmp.write_text(str(self._committed), encoding="utf-8")
+            os.replace(tmp, self.offset_path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def pending_orphans(self) -> list[tuple[Path, list[dict[str, Any]]]]:
+        """Spools laissés par des processus terminés (ou un ancien processus de même pid)."""
+        if self._fh is None and self.path.exists():
+            # Spool d'un ancien processus qui avait le même pid : on le met de côté.
+            stale = self.directory / f"audit-{os.getpid()}.{time.time_ns()}.jsonl"
+            os.replace(self.path, stale)
+            if self.offset_path.exists():
+                os.replace(self.offset_path, stale.with_suffix(".offset"))
+
+        orphans = []
+        for path in sorted(self.directory.glob("audit-*.jsonl")):
+            try:
+                pid = int(path.stem.split("-", 1)[1].split(".")[0])
+            except ValueError:
+                continue
+            if path == self.path:
+                continue
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+
+            offset_path = path.with_suffix(".offset")
+            try:
+                offset = int(offset_path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                offset = 0
+
+            records = []
+            with open(path, encoding="utf-8") as fh:
+                for i, line in enumerate(fh):
+                    if i < offset or not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # Dernière ligne tronquée par le crash.
+                        logger.warning("Ligne de spool d'audit illisible ignorée: %s:%d", path, i + 1)
+            orphans.append((path, records))
+        return orphans
+
+
+class AuditLogWriter:
+    def __init__(self, *, batch_size: int, flush_interval_ms: int, spool_dir: str | os.PathLike | None = None):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(1, int(flush_interval_ms)) / 1000.0
+        self._spool = _Spool(Path(spool_dir)) if spool_dir else None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            orphans = []
+            if self._spool is not None:
+                orphans = self._spool.pending_orphans()
+                self._spool.open()
+            self._thread = threading.Thread(target=self._run, args=(orphans,), name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, fields: dict[str, Any], *, wait: bool = False, timeout: float | None = 5.0) -> None:
+        """Ajoute une entrée à la file.
+
+        Avec ``wait=True``, force l'écriture immédiate du lot courant et attend
+        qu'il soit en base : les entrées précédentes sont écrites avant celle-ci.
+        """
+        self.start()
+        entry = _Entry(fields, threading.Event() if wait else None)
+        with self._lock:
+            if self._spool is not None:
+                self._spool.append(fields)
+            self._queue.put(entry)
+        if entry.done is not None and not entry.done.wait(timeout):
+            logger.warning("Écriture d'audit toujours en attente après %ss", timeout)
+
+    def flush(self, timeout: float | None = 5.0) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            return
+        entry = _Entry(None, threading.Event())
+        self._queue.put(entry)
+        entry.done.wait(timeout)
+
+    def shutdown(self, timeout: float | None = 10.0) -> None:
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if self._spool is not None:
+            self._spool.close()
+
+    def _run(self, orphans: list[tuple[Path, list[dict[str, Any]]]]) -> None:
+        try:
+            self._replay(orphans)
+            self._loop()
+        finally:
+            connections.close_all()
+
+    def _replay(self, orphans: list[tuple[Path, list[dict[str, Any]]]]) -> None:
+        from .models import AuditLog
+
+        for path, records in orphans:
+            try:
+                if records:
+                    AuditLog.objects.bulk_create(_build_logs(records), batch_size=self.batch_size)
+            except Exception:
+                logger.exception("Rejeu du spool d'audit %s impossible", path)
+                continue
+            path.unlink(missing_ok=True)
+            path.with_suffix(".offset").unlink(missing_ok=True)
+            logger.info("Spool d'audit %s rejoué (%d entrées)", path, len(records))
+
+    def _loop(self) -> None:
+        batch: list[_Entry] = []
+        deadline = 0.0
+        while True:
+            timeout = None if not batch else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._write(batch)
+                return
+
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size and item.done is None:
+                    continue
+
+            batch = self._write(batch)
+            if batch:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch: list[_Entry]) -> list[_Entry]:
+        """Écrit le lot ; renvoie les entrées à réessayer en cas d'échec."""
+        from .models import AuditLog
+
+        records = [e.fields for e in batch if e.fields is not None]
+        failed: list[_Entry] = []
+        if records:
+            try:
+                AuditLog.objects.bulk_create(_build_logs(records), batch_size=self.batch_size)
+            except Exception:
+                logger.exception("Échec d'écriture groupée de %d entrées d'audit", len(records))
+                connections.close_all()
+                failed = [_Entry(fields) for fields in self._write_one_by_one(records)]
+
+            if not failed and self._spool is not None:
+                self._spool.commit(len(records))
+
+        for e in batch:
+            if e.done is not None:
+                e.done.set()
+        return failed
+
+    def _write_one_by_one(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Isole les entrées invalides ; renvoie tout le lot si la base est indisponible."""
+        written = 0
+        for fields in records:
+            try:
+                _build_logs([fields])[0].save(force_insert=True)
+            except Exception:
+                logger.error("Entrée d'audit rejetée: %r", fields, exc_info=True)
+                connections.close_all()
+            else:
+                written += 1
+
+        if written == 0 and not _database_available():
+            # On garde l'ordre : le lot sera retenté avant les entrées suivantes.
+            return records
+        return []
+
+
+_writer: AuditLogWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> AuditLogWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditLogWriter(
+                batch_size=getattr(settings, "AUDIT_BATCH_SIZE", 200),
+                flush_interval_ms=getattr(settings, "AUDIT_FLUSH_INTERVAL_MS", 500),
+                spool_dir=getattr(settings, "AUDIT_SPOOL_DIR", "") or None,
+            )
+            atexit.register(_writer.shutdown)
+        return _writer
+
+
+def flush(timeout: float | None = 5.0) -> None:
+    """Force l'écriture des entrées en attente (utile avant un traitement batch)."""
+    if _writer is not None:
+        _writer.flush(timeout)
+
+
+def _reset_after_fork() -> None:
+    # Le thread du parent n'existe pas dans l'enfant : on repart d'un writer neuf.
+    global _writer, _writer_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
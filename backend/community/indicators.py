@@ -3,26 +3,17 @@ from __future__ import annotations
 from datetime import timedelta
 from typing import Any
 
-from django.db.models import Count, Max, Q
+from django.db.models import Max, Q
 from django.utils import timezone
 
 from .models import DossierCommunautaire
 
 
 def get_pathologie_indicators() -> list[dict[str, Any]]:
-    qs = (
-        DossierCommunautaire.objects.select_related("pathologie")
-        .values("pathologie_id", "pathologie__code", "pathologie__nom")
-        .annotate(
-            total=Count("id"),
-            en_suivi=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_SUIVI)),
-            stables=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_STABLE)),
-            termines=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_TERMINE)),
-            deces=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_DECEDE)),
-        )
-        .order_by("pathologie__nom")
-    )
-    return list(qs)
+    # Lu depuis les agrégats journaliers (core/rollups.py)
+    from core.rollups import KpiReader
+
+    return KpiReader().pathologie_totals()
 
 
 def get_follow_up_rate() -> float:
@@ -30,11 +30,12 @@ class DossierCommunautaire(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="dossiers_communautaires")
     pathologie = models.ForeignKey(Pathologie, on_delete=models.PROTECT, related_name="dossiers")
 
-    date_diagnostic = models.DateField()
+    date_diagnostic = models.DateField(db_index=True)
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default=STATUT_SUIVI)
     notes = models.TextField(blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-date_diagnostic", "-id"]
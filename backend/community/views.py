@@ -165,28 +165,16 @@ def statistiques_pathologies(request):
 @login_required
 @role_required("ADMIN", "MEDECIN")
 def statistiques_zone(request):
-    dossiers = DossierCommunautaire.objects.select_related("patient")
-
-    from django.db.models import Count, Q
-
-    data = (
-        dossiers.values("patient__zone")
-        .annotate(
-            total=Count("id"),
-            en_suivi=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_SUIVI)),
-            stables=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_STABLE)),
-            termines=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_TERMINE)),
-            deces=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_DECEDE)),
-        )
-        .order_by("patient__zone")
-    )
+    from core.rollups import KpiReader
+
+    data = KpiReader().pathologie_totals(by="zone")
 
     zones = Patient._meta.get_field("zone").choices
     zone_labels = {code: label for code, label in zones}
 
     enriched = []
     for row in data:
-        code = row["patient__zone"]
+        code = row["zone"]
         enriched.append(
             {
                 "zone_code": code,
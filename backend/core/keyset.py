@@ -0,0 +1,118 @@
+"""Parcours par clé (keyset) : filtres « après cette ligne » sur un ordre composite.
+
+Avec MySQL, ``QuerySet.iterator()`` ne garantit pas une mémoire bornée (le
+pilote charge tout le résultat) ; ``iter_keyset`` lit donc des paquets de
+``chunk_size`` lignes, chacun repartant de la dernière clé vue.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Iterator, Sequence
+
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Q, QuerySet
+
+
+def keyset_filter(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    """Lignes strictement après ``values`` dans l'ordre ``ordering``."""
+    q = Q()
+    equal: dict[str, Any] = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        q |= Q(**equal, **{f"{name}__{lookup}": value})
+        equal[name] = value
+    return q
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Curseur opaque (JSON en base64 url) ; dates et heures sont écrites en ISO."""
+    raw = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False, default=_iso).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(raw: str | None, size: int, *, fields: Sequence[Field] | None = None) -> list[Any] | None:
+    """Valeurs d'un curseur de ``size`` éléments ; ``None`` si absent ou illisible.
+
+    Avec ``fields`` (voir ``ordering_fields``), chaque valeur est convertie par
+    ``field.to_python`` : un curseur forgé aux types incorrects est illisible
+    au lieu d'échouer dans la requête.
+    """
+    if not raw:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if fields is not None:
+        return cursor_values(values, fields)
+    return values
+
+
+def ordering_fields(queryset: QuerySet, ordering: Sequence[str]) -> list[Field]:
+    """Champs (ou annotations de ``queryset``) portant les clés de ``ordering``."""
+    meta = queryset.model._meta
+    fields = []
+    for name in (f.lstrip("-") for f in ordering):
+        if name in queryset.query.annotations:
+            fields.append(queryset.query.annotations[name].output_field)
+        else:
+            fields.append(meta.pk if name == "pk" else meta.get_field(name))
+    return fields
+
+
+def cursor_values(values: Sequence[Any], fields: Sequence[Field]) -> list[Any] | None:
+    """``values`` convertis selon ``fields`` ; ``None`` si l'une est nulle ou du mauvais type."""
+    if len(values) != len(fields):
+        return None
+    try:
+        converted = [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, ValueError, TypeError):
+        return None
+    if any(value is None for value in converted):
+        return None
+    return converted
+
+
+def parse_limit(raw: str | None, maximum: int) -> int | None:
+    """Taille de page demandée, bornée à ``1..maximum`` ; ``None`` (taille par défaut) si absente ou invalide."""
+    try:
+        limit = int(raw or 0)
+    except ValueError:
+        return None
+    return min(limit, maximum) if limit > 0 else None
+
+
+def _iso(value: Any) -> str:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} non sérialisable dans un curseur")
+
+
+def iter_keyset(
+    queryset,
+    ordering: Sequence[str],
+    fields: Sequence[str],
+    *,
+    chunk_size: int = 2000,
+) -> Iterator[tuple]:
+    """Renvoie les tuples ``fields`` de ``queryset`` dans l'ordre ``ordering`` (qui doit être unique)."""
+    names = [f.lstrip("-") for f in ordering]
+    columns = list(fields) + [n for n in names if n not in fields]
+    key_index = [columns.index(n) for n in names]
+    width = len(fields)
+
+    qs = queryset.order_by(*ordering).values_list(*columns)
+    last: list[Any] | None = None
+    while True:
+        page = qs.filter(keyset_filter(ordering, last)) if last is not None else qs
+        rows = list(page[:chunk_size])
+        for row in rows:
+            yield row[:width]
+        if len(rows) < chunk_size:
+            return
+        last = [rows[-1][i] for i in key_index]
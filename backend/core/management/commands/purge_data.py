@@ -22,6 +22,19 @@ class Command(BaseCommand):
             help="Inclure AuditLog dans la purge (par défaut: non)",
         )
 
+        parser.add_argument(
+            "--batch-size", type=int, default=None, help="Lignes supprimées par lot (défaut: PURGE_BATCH_SIZE)"
+        )
+        parser.add_argument(
+            "--pause", type=float, default=None, help="Pause entre deux lots, en secondes (défaut: PURGE_BATCH_PAUSE)"
+        )
+        parser.add_argument(
+            "--max-seconds",
+            type=float,
+            default=0,
+            help="Durée maximale par table (0 = illimitée) ; la purge reprend au lancement suivant",
+        )
+
     def handle(self, *args, **options):
         dry_run = bool(options["dry_run"])
 
@@ -33,37 +46,54 @@ class Command(BaseCommand):
 
         # Imports ici pour éviter tout problème de dépendance/cycle au chargement.
         from audit.models import AuditLog
+        from core.purge import purge_before
         from messaging.models import Notification
         from patients.models import SmsLog
 
-        def purge_queryset(qs, label: str) -> int:
-            count = qs.count()
-            if count == 0:
-                self.stdout.write(f"{label}: 0")
-                return 0
+        def purge(model, cutoff, label: str) -> int:
             if dry_run:
+                count = model._base_manager.filter(created_at__lt=cutoff).count()
                 self.stdout.write(f"{label}: {count} (dry-run)")
                 return count
-            deleted, _ = qs.delete()
-            self.stdout.write(f"{label}: {count} supprimés")
-            return deleted
+            result = purge_before(
+                model,
+                cutoff,
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+                max_seconds=options["max_seconds"],
+                progress=lambda r: self.stdout.write(
+                    f"  {label}: lot {r.batches}, {r.deleted} supprimés (pk <= {r.last_pk})"
+                ),
+            )
+            status = "" if result.complete else " (interrompu: relancer pour continuer)"
+            self.stdout.write(
+                f"{label}: {result.deleted} supprimés en {result.seconds:.1f}s ({result.rate:.0f}/s){status}"
+            )
+            return result.deleted
 
         if notifications_days > 0:
             cutoff = now - timedelta(days=notifications_days)
-            purge_queryset(Notification.objects.filter(created_at__lt=cutoff), f"Notifications > {notifications_days}j")
+            notifications = Notification.objects.filter(created_at__lt=cutoff)
+            # Utilisateurs dont des notifications non lues vont disparaître : compteur à recalculer
+            unread_users = set(notifications.filter(lu=False).values_list("user_id", flat=True).distinct())
+            purge(Notification, cutoff, f"Notifications > {notifications_days}j")
+            if unread_users and not dry_run:
+                from messaging.services import recount_unread
+
+                recount_unread(unread_users)
         else:
             self.stdout.write("Notifications: ignorées (notifications-days=0)")
 
         if sms_days > 0:
             cutoff = now - timedelta(days=sms_days)
-            purge_queryset(SmsLog.objects.filter(created_at__lt=cutoff), f"SmsLog > {sms_days}j")
+            purge(SmsLog, cutoff, f"SmsLog > {sms_days}j")
         else:
             self.stdout.write("SmsLog: ignorés (sms-days=0)")
 
         if options["include_audit"]:
             if audit_days > 0:
                 cutoff = now - timedelta(days=audit_days)
-                purge_queryset(AuditLog.objects.filter(created_at__lt=cutoff), f"AuditLog > {audit_days}j")
+                purge(AuditLog, cutoff, f"AuditLog > {audit_days}j")
             else:
                 self.stdout.write("AuditLog: ignorés (audit-days=0)")
         else:
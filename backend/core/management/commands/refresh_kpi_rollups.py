@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.rollups import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Met à jour les agrégats journaliers (tableaux de bord) pour les jours modifiés depuis le dernier passage. "
+        "Les suppressions ne sont pas détectées : utiliser --full pour tout reconstruire."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Reconstruit tous les jours")
+        parser.add_argument("--verbose-ranges", action="store_true", help="Affiche chaque plage recalculée")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        log = self.stdout.write if options["verbose_ranges"] else None
+        days = refresh(full=bool(options["full"]), log=log)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Agrégats à jour: {days} jour(s) recalculé(s) en {elapsed:.1f}s"))
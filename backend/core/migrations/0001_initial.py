@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('community', '0002_dossier_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyZoneKpi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('zone', models.CharField(max_length=50)),
+                ('patients', models.PositiveIntegerField(default=0)),
+                ('consultations', models.PositiveIntegerField(default=0)),
+                ('cpn1', models.PositiveIntegerField(default=0)),
+                ('cpn2', models.PositiveIntegerField(default=0)),
+                ('cpn3', models.PositiveIntegerField(default=0)),
+                ('cpn4', models.PositiveIntegerField(default=0)),
+                ('cas_vih', models.PositiveIntegerField(default=0)),
+                ('cas_tb', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['day', 'zone'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'zone'), name='uniq_daily_zone_kpi')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPathologieKpi',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('zone', models.CharField(max_length=50)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('en_suivi', models.PositiveIntegerField(default=0)),
+                ('stables', models.PositiveIntegerField(default=0)),
+                ('termines', models.PositiveIntegerField(default=0)),
+                ('deces', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pathologie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='community.pathologie')),
+            ],
+            options={
+                'ordering': ['day', 'zone', 'pathologie'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'zone', 'pathologie'), name='uniq_daily_pathologie_kpi')],
+            },
+        ),
+    ]
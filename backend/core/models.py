@@ -0,0 +1,70 @@
+from django.db import models
+
+
+class DailyZoneKpi(models.Model):
+    """Compteurs agrégés par jour et par zone (voir core/rollups.py)."""
+
+    day = models.DateField()
+    zone = models.CharField(max_length=50)
+
+    patients = models.PositiveIntegerField(default=0)
+    consultations = models.PositiveIntegerField(default=0)
+    cpn1 = models.PositiveIntegerField(default=0)
+    cpn2 = models.PositiveIntegerField(default=0)
+    cpn3 = models.PositiveIntegerField(default=0)
+    cpn4 = models.PositiveIntegerField(default=0)
+    cas_vih = models.PositiveIntegerField(default=0)
+    cas_tb = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day", "zone"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "zone"], name="uniq_daily_zone_kpi"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day:%Y-%m-%d} - {self.zone}"
+
+
+class DailyPathologieKpi(models.Model):
+    """Dossiers communautaires agrégés par jour de diagnostic, zone et pathologie."""
+
+    day = models.DateField()
+    zone = models.CharField(max_length=50)
+    pathologie = models.ForeignKey("community.Pathologie", on_delete=models.CASCADE, related_name="+")
+
+    total = models.PositiveIntegerField(default=0)
+    en_suivi = models.PositiveIntegerField(default=0)
+    stables = models.PositiveIntegerField(default=0)
+    termines = models.PositiveIntegerField(default=0)
+    deces = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["day", "zone", "pathologie"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "zone", "pathologie"], name="uniq_daily_pathologie_kpi"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day:%Y-%m-%d} - {self.zone} - {self.pathologie_id}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.value:%Y-%m-%d %H:%M}"
+
+
+class RollupDirtyDay(models.Model):
+    """Jour à recalculer au prochain rafraîchissement (date modifiée ou ligne supprimée)."""
+
+    day = models.DateField(unique=True)
+
+    def __str__(self) -> str:
+        return f"{self.day:%Y-%m-%d}"
@@ -0,0 +1,205 @@
+"""Service de rendu PDF : pool de processus borné et cache adressé par contenu.
+
+xhtml2pdf est coûteux en CPU ; le rendu se fait dans un ``ProcessPoolExecutor``
+(``PDF_RENDER_WORKERS`` processus, 0 = dans le thread appelant). Au-delà de
+``PDF_RENDER_QUEUE`` rendus en attente (refus immédiat), si le rendu dépasse
+``PDF_RENDER_TIMEOUT`` secondes ou si un processus du pool meurt (le pool est
+alors recréé), une erreur est levée au lieu de bloquer le worker web.
+
+Avec un espace de cache (ex. ``ordonnances/12``), le PDF est stocké sous
+``PDF_CACHE_DIR/<espace>/<sha256 du gabarit et du HTML>.pdf`` : un document
+identique est resservi sans nouveau rendu. Seule la dernière version d'un
+espace est conservée, et ``invalidate(espace)`` la supprime quand une donnée
+imprimée change (ordonnance, lignes ou identité du patient).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+
+logger = logging.getLogger(__name__)
+
+
+class PdfRenderError(Exception):
+    """Le PDF n'a pas pu être produit."""
+
+
+class PdfBusyError(PdfRenderError):
+    """File de rendu pleine."""
+
+
+class PdfTimeoutError(PdfRenderError):
+    """Rendu trop long."""
+
+
+def html_to_pdf(html: str) -> bytes | None:
+    """Convertit du HTML en PDF (exécuté dans un processus du pool)."""
+    from xhtml2pdf import pisa
+
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode("utf-8")), result)
+    if pdf.err:
+        return None
+    return result.getvalue()
+
+
+class PdfRenderer:
+    def __init__(self, *, workers: int, max_pending: int, timeout: float):
+        self.workers = int(workers)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + max(0, int(max_pending)))
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # forkserver : les processus de rendu ne héritent pas des threads du serveur web.
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        """Abandonne un pool cassé (processus tué) : un nouveau est créé au prochain appel."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, html: str) -> bytes:
+        if self.workers <= 0:
+            return self._check(html_to_pdf(html))
+
+        # File pleine : refus immédiat, le worker web ne reste pas bloqué.
+        if not self._slots.acquire(blocking=False):
+            raise PdfBusyError("Trop de PDF en cours de génération, réessayez dans un instant.")
+        pool = self._get_pool()
+        try:
+            future = pool.submit(html_to_pdf, html)
+        except Exception as exc:
+            self._slots.release()
+            self._discard(pool)
+            raise PdfRenderError("Service de rendu PDF indisponible, réessayez.") from exc
+        # La place n'est rendue qu'à la fin réelle du rendu, même après un délai dépassé.
+        future.add_done_callback(lambda _f: self._slots.release())
+        try:
+            return self._check(future.result(timeout=self.timeout))
+        except FutureTimeoutError as exc:
+            raise PdfTimeoutError("Génération du PDF trop longue.") from exc
+        except BrokenProcessPool as exc:
+            self._discard(pool)
+            raise PdfRenderError("Le processus de rendu PDF s'est arrêté, réessayez.") from exc
+
+    @staticmethod
+    def _check(content: bytes | None) -> bytes:
+        if content is None:
+            raise PdfRenderError("Erreur génération PDF")
+        return content
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class PdfCache:
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.directory / namespace / f"{key}.pdf"
+
+    def get(self, namespace: str, key: str) -> bytes | None:
+        try:
+            return self._path(namespace, key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, namespace: str, key: str, content: bytes) -> None:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        os.replace(tmp, path)
+        # Une seule version par document : les rendus précédents sont obsolètes.
+        for old in path.parent.glob("*.pdf"):
+            if old != path:
+                old.unlink(missing_ok=True)
+
+    def invalidate(self, namespace: str) -> None:
+        shutil.rmtree(self.directory / namespace, ignore_errors=True)
+
+
+_renderer: PdfRenderer | None = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PdfRenderer:
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer(
+                workers=getattr(settings, "PDF_RENDER_WORKERS", 2),
+                max_pending=getattr(settings, "PDF_RENDER_QUEUE", 8),
+                timeout=getattr(settings, "PDF_RENDER_TIMEOUT", 30),
+            )
+        return _renderer
+
+
+def get_cache() -> PdfCache | None:
+    directory = getattr(settings, "PDF_CACHE_DIR", "")
+    return PdfCache(directory) if directory else None
+
+
+def render_pdf(template_name: str, context: dict, *, cache_namespace: str | None = None) -> bytes:
+    """Rend ``template_name`` en PDF ; lève ``PdfRenderError`` en cas d'échec."""
+    html = get_template(template_name).render(context)
+    cache = get_cache() if cache_namespace else None
+    key = hashlib.sha256(f"{template_name}\0{html}".encode("utf-8")).hexdigest()
+
+    if cache is not None:
+        content = cache.get(cache_namespace, key)
+        if content is not None:
+            return content
+
+    content = get_renderer().render(html)
+
+    if cache is not None:
+        try:
+            cache.put(cache_namespace, key, content)
+        except OSError:
+            logger.exception("Écriture du cache PDF impossible (%s)", cache_namespace)
+    return content
+
+
+def invalidate(cache_namespace: str) -> None:
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(cache_namespace)
+
+
+def _reset_after_fork() -> None:
+    global _renderer, _renderer_lock
+    _renderer = None
+    _renderer_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,85 @@
+"""Purge par lots des données soumises à rétention (notifications, logs SMS, audit).
+
+Au lieu d'un ``COUNT`` puis d'un ``DELETE`` unique (verrous longs, binlog
+volumineux, objets liés chargés en Python), ``purge_before`` avance par clé
+primaire : chaque lot lit au plus ``batch_size`` clés éligibles puis supprime
+la plage ``pk`` correspondante (critère de date réappliqué) dans sa propre
+transaction. Quand le modèle n'a ni cascade ni signal de suppression, le
+``DELETE`` est émis directement (``_raw_delete``) sans collecte Python.
+
+Une pause (``PURGE_BATCH_PAUSE``) sépare les lots pour laisser passer le
+trafic. Chaque lot étant validé, une purge interrompue (ou bornée par
+``max_seconds``) reprend simplement au lancement suivant.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.deletion import Collector
+
+
+@dataclass
+class PurgeResult:
+    deleted: int = 0
+    batches: int = 0
+    last_pk: int | None = None
+    seconds: float = 0.0
+    complete: bool = True
+
+    @property
+    def rate(self) -> float:
+        return self.deleted / self.seconds if self.seconds else 0.0
+
+
+def _delete(qs) -> int:
+    collector = Collector(using=qs.db, origin=qs)
+    if collector.can_fast_delete(qs):
+        return qs._raw_delete(qs.db)
+    deleted, _ = qs.delete()
+    return deleted
+
+
+def purge_before(
+    model: type[Model],
+    cutoff: datetime,
+    *,
+    field: str = "created_at",
+    batch_size: int | None = None,
+    pause: float | None = None,
+    max_seconds: float = 0,
+    progress: Callable[[PurgeResult], None] | None = None,
+) -> PurgeResult:
+    """Supprime les lignes de ``model`` dont ``field`` est antérieur à ``cutoff``."""
+    batch_size = batch_size or int(getattr(settings, "PURGE_BATCH_SIZE", 5000))
+    pause = float(getattr(settings, "PURGE_BATCH_PAUSE", 0.1)) if pause is None else pause
+    eligible = model._base_manager.filter(**{f"{field}__lt": cutoff})
+    result = PurgeResult()
+    started = time.monotonic()
+    last = 0
+    while True:
+        ids = list(eligible.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            result.deleted += _delete(eligible.filter(pk__gte=ids[0], pk__lte=ids[-1]))
+        result.batches += 1
+        result.last_pk = last = ids[-1]
+        result.seconds = time.monotonic() - started
+        if progress:
+            progress(result)
+        if len(ids) < batch_size:
+            break
+        if max_seconds and result.seconds >= max_seconds:
+            result.complete = False
+            break
+        if pause:
+            time.sleep(pause)
+    result.seconds = time.monotonic() - started
+    return result
@@ -0,0 +1,356 @@
+"""Indicateurs matérialisés par jour et par zone.
+
+``refresh()`` recalcule uniquement les jours touchés depuis le dernier
+repère (``created_at``/``updated_at``), ainsi que les jours notés par
+``core.signals`` (suppressions, changements de date), et remplace leurs lignes dans
+``DailyZoneKpi``/``DailyPathologieKpi``. ``KpiReader`` lit ces tables ; les
+jours postérieurs au dernier rafraîchissement sont calculés en direct
+(``KPI_ROLLUP_LIVE_FALLBACK``), et tout est calculé en direct tant qu'aucun
+rafraîchissement n'a eu lieu.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from community.models import DossierCommunautaire
+from patients.models import CasSuivi, Consultation, Patient, SuiviCPN
+
+from .models import DailyPathologieKpi, DailyZoneKpi, RollupDirtyDay, RollupWatermark
+
+WATERMARK_NAME = "kpi_daily"
+
+ZONE_COLUMNS = ["patients", "consultations", "cpn1", "cpn2", "cpn3", "cpn4", "cas_vih", "cas_tb"]
+PATHOLOGIE_COLUMNS = ["total", "en_suivi", "stables", "termines", "deces"]
+
+# Les lignes modifiées pendant un rafraîchissement peuvent être validées après
+# notre lecture : le repère est reculé d'autant (le recalcul est idempotent).
+_SAFETY_MARGIN = timedelta(minutes=5)
+# Jours touchés regroupés en plages : écart et étendue maximum (en jours).
+_MAX_GAP = 7
+_MAX_SPAN = 31
+
+
+def _bounds(start: date | None, end: date | None) -> tuple[datetime | None, datetime | None]:
+    tz = timezone.get_current_timezone()
+    lo = datetime.combine(start, time.min, tzinfo=tz) if start else None
+    hi = datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz) if end else None
+    return lo, hi
+
+
+def _in_range(qs, field: str, start: date | None, end: date | None, *, is_datetime: bool):
+    if is_datetime:
+        lo, hi = _bounds(start, end)
+        if lo:
+            qs = qs.filter(**{f"{field}__gte": lo})
+        if hi:
+            qs = qs.filter(**{f"{field}__lt": hi})
+        return qs.annotate(day=TruncDate(field))
+
+    if start:
+        qs = qs.filter(**{f"{field}__gte": start})
+    if end:
+        qs = qs.filter(**{f"{field}__lte": end})
+    return qs.annotate(day=F(field))
+
+
+def _patients(start, end):
+    qs = _in_range(Patient.objects.order_by(), "created_at", start, end, is_datetime=True)
+    return qs.values("day", "zone").annotate(patients=Count("id"))
+
+
+def _consultations(start, end):
+    qs = _in_range(Consultation.objects.order_by(), "date_consultation", start, end, is_datetime=True)
+    return qs.values("day", zone=F("patient__zone")).annotate(consultations=Count("id"))
+
+
+def _cpn(start, end):
+    qs = _in_range(SuiviCPN.objects.order_by(), "date", start, end, is_datetime=False)
+    return qs.values("day", zone=F("patient__zone")).annotate(
+        **{f"cpn{n}": Count("id", filter=Q(numero=n)) for n in (1, 2, 3, 4)}
+    )
+
+
+def _cas(start, end):
+    qs = _in_range(CasSuivi.objects.order_by(), "created_at", start, end, is_datetime=True)
+    return qs.values("day", zone=F("patient__zone")).annotate(
+        cas_vih=Count("id", filter=Q(type_cas=CasSuivi.TYPE_VIH)),
+        cas_tb=Count("id", filter=Q(type_cas=CasSuivi.TYPE_TB)),
+    )
+
+
+# Source -> (colonnes produites, calcul groupé par (jour, zone)).
+_ZONE_SOURCES: dict[str, tuple[list[str], Callable]] = {
+    "patients": (["patients"], _patients),
+    "consultations": (["consultations"], _consultations),
+    "cpn": (["cpn1", "cpn2", "cpn3", "cpn4"], _cpn),
+    "cas": (["cas_vih", "cas_tb"], _cas),
+}
+
+
+def compute_zone_rows(
+    start: date | None, end: date | None, columns: Iterable[str] = ZONE_COLUMNS
+) -> dict[tuple[date, str], dict[str, int]]:
+    """Calcule en direct les compteurs par (jour, zone) sur la période."""
+    columns = set(columns)
+    rows: dict[tuple[date, str], dict[str, int]] = defaultdict(lambda: dict.fromkeys(ZONE_COLUMNS, 0))
+    for source_columns, compute in _ZONE_SOURCES.values():
+        if not columns.intersection(source_columns):
+            continue
+        for r in compute(start, end):
+            row = rows[(r["day"], r["zone"])]
+            for c in source_columns:
+                row[c] += r[c]
+    return dict(rows)
+
+
+def compute_pathologie_rows(start: date | None, end: date | None) -> dict[tuple[date, str, int], dict[str, Any]]:
+    qs = _in_range(DossierCommunautaire.objects.order_by(), "date_diagnostic", start, end, is_datetime=False)
+    rows = {}
+    for r in qs.values(
+        "day", "pathologie_id", "pathologie__code", "pathologie__nom", zone=F("patient__zone")
+    ).annotate(
+        total=Count("id"),
+        en_suivi=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_SUIVI)),
+        stables=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_STABLE)),
+        termines=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_TERMINE)),
+        deces=Count("id", filter=Q(statut=DossierCommunautaire.STATUT_DECEDE)),
+    ):
+        rows[(r["day"], r["zone"], r["pathologie_id"])] = r
+    return rows
+
+
+def _dates(qs, field: str, *, is_datetime: bool) -> set[date]:
+    if is_datetime:
+        return {d.date() for d in qs.datetimes(field, "day")}
+    return set(qs.dates(field, "day"))
+
+
+def touched_days(since: datetime | None) -> set[date]:
+    """Jours dont les compteurs ont pu changer depuis ``since`` (tous si None)."""
+    def changed(model, *fields: str):
+        if since is None:
+            return [model.objects.all()]
+        return [model.objects.filter(**{f"{f}__gte": since}) for f in fields]
+
+    days: set[date] = set()
+    for qs in changed(Patient, "created_at", "updated_at"):
+        days |= _dates(qs, "created_at", is_datetime=True)
+    for qs in changed(Consultation, "created_at", "updated_at"):
+        days |= _dates(qs, "date_consultation", is_datetime=True)
+    for qs in changed(SuiviCPN, "created_at", "updated_at"):
+        days |= _dates(qs, "date", is_datetime=False)
+    for qs in changed(CasSuivi, "created_at", "updated_at"):
+        days |= _dates(qs, "created_at", is_datetime=True)
+    for qs in changed(DossierCommunautaire, "created_at", "updated_at"):
+        days |= _dates(qs, "date_diagnostic", is_datetime=False)
+
+    if since is not None:
+        # Un patient modifié a pu changer de zone : ses activités sont à recompter.
+        moved = Q(patient__updated_at__gte=since)
+        days |= _dates(Consultation.objects.filter(moved), "date_consultation", is_datetime=True)
+        days |= _dates(SuiviCPN.objects.filter(moved), "date", is_datetime=False)
+        days |= _dates(CasSuivi.objects.filter(moved), "created_at", is_datetime=True)
+        days |= _dates(DossierCommunautaire.objects.filter(moved), "date_diagnostic", is_datetime=False)
+    return days
+
+
+def mark_dirty(values: Iterable[date | datetime]) -> None:
+    """Note des jours à recalculer (dates ou dates-heures, jour local)."""
+    days = {timezone.localdate(v) if isinstance(v, datetime) else v for v in values if v}
+    RollupDirtyDay.objects.bulk_create([RollupDirtyDay(day=d) for d in days], ignore_conflicts=True)
+
+
+def merge_ranges(days: Iterable[date]) -> list[tuple[date, date]]:
+    ranges: list[tuple[date, date]] = []
+    for d in sorted(days):
+        if ranges:
+            lo, hi = ranges[-1]
+            if (d - hi).days <= _MAX_GAP and (d - lo).days < _MAX_SPAN:
+                ranges[-1] = (lo, d)
+                continue
+        ranges.append((d, d))
+    return ranges
+
+
+def _rebuild_range(start: date, end: date) -> None:
+    zone_rows = compute_zone_rows(start, end)
+    pathologie_rows = compute_pathologie_rows(start, end)
+    with transaction.atomic():
+        DailyZoneKpi.objects.filter(day__range=(start, end)).delete()
+        DailyZoneKpi.objects.bulk_create(
+            [DailyZoneKpi(day=day, zone=zone, **values) for (day, zone), values in zone_rows.items()]
+        )
+        DailyPathologieKpi.objects.filter(day__range=(start, end)).delete()
+        DailyPathologieKpi.objects.bulk_create(
+            [
+                DailyPathologieKpi(day=day, zone=zone, pathologie_id=pathologie_id, **{c: r[c] for c in PATHOLOGIE_COLUMNS})
+                for (day, zone, pathologie_id), r in pathologie_rows.items()
+            ]
+        )
+
+
+def refresh(*, full: bool = False, log: Callable[[str], None] | None = None) -> int:
+    """Met à jour les tables d'agrégats ; renvoie le nombre de jours recalculés."""
+    started = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    dirty = dict(RollupDirtyDay.objects.values_list("pk", "day"))
+
+    if full or watermark is None:
+        days = touched_days(None)
+        ranges = []
+        if days:
+            first, last = min(days), max(days)
+            d = first
+            while d <= last:
+                hi = min(d + timedelta(days=_MAX_SPAN - 1), last)
+                ranges.append((d, hi))
+                d = hi + timedelta(days=1)
+            DailyZoneKpi.objects.exclude(day__range=(first, last)).delete()
+            DailyPathologieKpi.objects.exclude(day__range=(first, last)).delete()
+        else:
+            DailyZoneKpi.objects.all().delete()
+            DailyPathologieKpi.objects.all().delete()
+    else:
+        ranges = merge_ranges(touched_days(watermark.value) | set(dirty.values()))
+
+    recomputed = 0
+    for start, end in ranges:
+        _rebuild_range(start, end)
+        recomputed += (end - start).days + 1
+        if log:
+            log(f"{start:%Y-%m-%d} -> {end:%Y-%m-%d}")
+
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={"value": started - _SAFETY_MARGIN})
+    # Jours notés pendant le calcul : gardés pour le prochain passage.
+    RollupDirtyDay.objects.filter(pk__in=list(dirty)).delete()
+    return recomputed
+
+
+class KpiReader:
+    """Lecture des indicateurs : tables d'agrégats + calcul direct des jours récents."""
+
+    def __init__(self):
+        value = RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list("value", flat=True).first()
+        if value is None:
+            # Jamais rafraîchi : tout est calculé en direct.
+            self.live_from: date | None = date.min
+        elif getattr(settings, "KPI_ROLLUP_LIVE_FALLBACK", True):
+            self.live_from = timezone.localdate(value)
+        else:
+            self.live_from = None
+
+    def _stored(self, model, start: date | None, end: date | None, zone: str | None):
+        if self.live_from == date.min:
+            return None
+        qs = model.objects.order_by()
+        if self.live_from is not None:
+            qs = qs.filter(day__lt=self.live_from)
+        if start:
+            qs = qs.filter(day__gte=start)
+        if end:
+            qs = qs.filter(day__lte=end)
+        if zone:
+            qs = qs.filter(zone=zone)
+        return qs
+
+    def _live_start(self, start: date | None, end: date | None) -> tuple[bool, date | None]:
+        if self.live_from is None:
+            return False, None
+        lo = self.live_from if self.live_from != date.min else None
+        if start and (lo is None or start > lo):
+            lo = start
+        if lo and end and lo > end:
+            return False, None
+        return True, lo
+
+    def zone_rows(
+        self,
+        columns: Iterable[str] = ZONE_COLUMNS,
+        *,
+        start: date | None = None,
+        end: date | None = None,
+        zone: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Lignes (jour, zone) de la période, colonnes demandées uniquement."""
+        columns = list(columns)
+        rows: list[dict[str, Any]] = []
+
+        stored = self._stored(DailyZoneKpi, start, end, zone)
+        if stored is not None:
+            rows.extend(stored.values("day", "zone", *columns))
+
+        live, lo = self._live_start(start, end)
+        if live:
+            for (day, z), values in compute_zone_rows(lo, end, columns).items():
+                if zone and z != zone:
+                    continue
+                rows.append({"day": day, "zone": z, **{c: values[c] for c in columns}})
+        return rows
+
+    def zone_totals(
+        self,
+        columns: Iterable[str] = ZONE_COLUMNS,
+        *,
+        start: date | None = None,
+        end: date | None = None,
+        zone: str | None = None,
+    ) -> dict[str, int]:
+        columns = list(columns)
+        totals = dict.fromkeys(columns, 0)
+
+        stored = self._stored(DailyZoneKpi, start, end, zone)
+        if stored is not None:
+            sums = stored.aggregate(**{c: Sum(c) for c in columns})
+            for c in columns:
+                totals[c] += sums[c] or 0
+
+        live, lo = self._live_start(start, end)
+        if live:
+            for (_day, z), values in compute_zone_rows(lo, end, columns).items():
+                if zone and z != zone:
+                    continue
+                for c in columns:
+                    totals[c] += values[c]
+        return totals
+
+    def pathologie_totals(self, *, by: str = "pathologie") -> list[dict[str, Any]]:
+        """Dossiers par pathologie (``by="pathologie"``) ou par zone (``by="zone"``)."""
+        key = "pathologie_id" if by == "pathologie" else "zone"
+        totals: dict[Any, dict[str, Any]] = {}
+
+        def add(k, row, labels):
+            entry = totals.setdefault(k, {**labels, **dict.fromkeys(PATHOLOGIE_COLUMNS, 0)})
+            for c in PATHOLOGIE_COLUMNS:
+                entry[c] += row[c] or 0
+
+        def labels_of(row):
+            if by == "pathologie":
+                return {
+                    "pathologie_id": row["pathologie_id"],
+                    "pathologie__code": row["pathologie__code"],
+                    "pathologie__nom": row["pathologie__nom"],
+                }
+            return {"zone": row["zone"]}
+
+        stored = self._stored(DailyPathologieKpi, None, None, None)
+        if stored is not None:
+            group = ["pathologie_id", "pathologie__code", "pathologie__nom"] if by == "pathologie" else ["zone"]
+            for row in stored.values(*group).annotate(**{c: Sum(c) for c in PATHOLOGIE_COLUMNS}):
+                add(row[key], row, labels_of(row))
+
+        live, lo = self._live_start(None, None)
+        if live:
+            for row in compute_pathologie_rows(lo, None).values():
+                add(row[key], row, labels_of(row))
+
+        order = (lambda e: e["pathologie__nom"]) if by == "pathologie" else (lambda e: e["zone"])
+        return sorted(totals.values(), key=order)
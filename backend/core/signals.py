@@ -0,0 +1,50 @@
+"""Jours d'agrégats à recalculer que les repères ``created_at``/``updated_at`` ne voient pas.
+
+Une suppression ne laisse aucune ligne datée, et le changement de date d'une
+activité ne révèle que son nouveau jour (``save(update_fields=...)`` n'écrit
+pas même ``updated_at``) : ces jours (ancien et nouveau) sont donc notés ici
+(``RollupDirtyDay``), dans la transaction de l'écriture. Les autres
+modifications sont vues par ``updated_at`` (à inclure dans ``update_fields``).
+"""
+
+from django.db.models.signals import post_delete, pre_save
+
+from community.models import DossierCommunautaire
+from patients.models import CasSuivi, Consultation, Patient, SuiviCPN
+
+from .rollups import mark_dirty
+
+# Modèle -> champ qui fixe le jour de la ligne dans les agrégats.
+DAY_FIELDS = {
+    Patient: "created_at",
+    Consultation: "date_consultation",
+    SuiviCPN: "date",
+    CasSuivi: "created_at",
+    DossierCommunautaire: "date_diagnostic",
+}
+# Jour modifiable après création.
+_MOVABLE = (Consultation, SuiviCPN, DossierCommunautaire)
+
+
+def rollup_row_deleted(sender, instance, **kwargs):
+    mark_dirty([getattr(instance, DAY_FIELDS[sender])])
+
+
+def rollup_day_moved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None:
+        return
+    field = DAY_FIELDS[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    new = getattr(instance, field)
+    old = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if old is not None and old != new:
+        mark_dirty([old, new])
+
+
+# Récepteurs limités à ces modèles : un ``post_delete`` global empêcherait la
+# suppression directe (``_raw_delete``) de tous les autres modèles.
+for _model in DAY_FIELDS:
+    post_delete.connect(rollup_row_deleted, sender=_model, dispatch_uid=f"rollup_deleted_{_model.__name__}")
+for _model in _MOVABLE:
+    pre_save.connect(rollup_day_moved, sender=_model, dispatch_uid=f"rollup_moved_{_model.__name__}")
@@ -1,20 +1,22 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 
-from patients.models import CasSuivi, Consultation, Patient, SuiviCPN, RendezVous
+from patients.models import RendezVous
 from community.models import DossierCommunautaire
 
+from .rollups import KpiReader
+
 
 def home(request):
+    totals = KpiReader().zone_totals(["patients", "consultations", "cpn1", "cpn2", "cpn3", "cpn4", "cas_vih", "cas_tb"])
     context = {
-        "kpi_patients": Patient.objects.count(),
-        "kpi_consultations": Consultation.objects.count(),
-        "kpi_cpn": SuiviCPN.objects.count(),
-        "kpi_vih": CasSuivi.objects.filter(type_cas=CasSuivi.TYPE_VIH).count(),
-        "kpi_tb": CasSuivi.objects.filter(type_cas=CasSuivi.TYPE_TB).count(),
+        "kpi_patients": totals["patients"],
+        "kpi_consultations": totals["consultations"],
+        "kpi_cpn": totals["cpn1"] + totals["cpn2"] + totals["cpn3"] + totals["cpn4"],
+        "kpi_vih": totals["cas_vih"],
+        "kpi_tb": totals["cas_tb"],
     }
     return render(request, "core/home.html", context)
 
@@ -25,27 +27,36 @@ def dashboard(request):
     if profil and profil.role == "PATIENT":
         return redirect("patient-portal-home")
 
-    total_patients = Patient.objects.count()
-    total_consultations = Consultation.objects.count()
-    total_cpn = SuiviCPN.objects.count()
-
-    vih_cases = CasSuivi.objects.filter(type_cas=CasSuivi.TYPE_VIH).count()
-    tb_cases = CasSuivi.objects.filter(type_cas=CasSuivi.TYPE_TB).count()
+    kpis = KpiReader()
+    totals = kpis.zone_totals(["patients", "consultations", "cpn1", "cpn2", "cpn3", "cpn4", "cas_vih", "cas_tb"])
 
     today = timezone.now().date()
     rdv_today = RendezVous.objects.filter(date_heure__date=today).order_by("date_heure")
 
     last_week = today - timedelta(days=7)
-    recent_consultations = Consultation.objects.filter(date_consultation__gte=last_week).count()
-
-    comm_stats = DossierCommunautaire.objects.values("statut").annotate(count=Count("id"))
+    recent_consultations = kpis.zone_totals(["consultations"], start=last_week)["consultations"]
+
+    by_statut = {"en_suivi": 0, "stables": 0, "termines": 0, "deces": 0}
+    for row in kpis.pathologie_totals():
+        for k in by_statut:
+            by_statut[k] += row[k]
+    comm_stats = [
+        {"statut": statut, "count": by_statut[column]}
+        for statut, column in [
+            (DossierCommunautaire.STATUT_SUIVI, "en_suivi"),
+            (DossierCommunautaire.STATUT_STABLE, "stables"),
+            (DossierCommunautaire.STATUT_TERMINE, "termines"),
+            (DossierCommunautaire.STATUT_DECEDE, "deces"),
+        ]
+        if by_statut[column]
+    ]
 
     context = {
-        "kpi_patients": total_patients,
-        "kpi_consultations": total_consultations,
-        "kpi_cpn": total_cpn,
-        "kpi_vih": vih_cases,
-        "kpi_tb": tb_cases,
+        "kpi_patients": totals["patients"],
+        "kpi_consultations": totals["consultations"],
+        "kpi_cpn": totals["cpn1"] + totals["cpn2"] + totals["cpn3"] + totals["cpn4"],
+        "kpi_vih": totals["cas_vih"],
+        "kpi_tb": totals["cas_tb"],
         "rdv_today": rdv_today,
         "recent_consultations": recent_consultations,
         "comm_stats": comm_stats,
@@ -0,0 +1,168 @@
+"""Lecture XLSX en flux, sans openpyxl.
+
+Pour les gros fichiers d'import, openpyxl (même en ``read_only``) crée un objet
+par cellule ; ici la feuille est parcourue avec ``iterparse`` et chaque ligne
+est rendue sous forme de tuple de valeurs Python (texte, nombre, booléen,
+``datetime`` pour les cellules au format date), puis libérée.
+"""
+
+from __future__ import annotations
+
+import posixpath
+import re
+import zipfile
+from datetime import datetime, timedelta
+from typing import Any, Iterator
+from xml.etree.ElementTree import fromstring, iterparse
+
+_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Formats de date prédéfinis d'Excel (numFmtId)
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | set(range(27, 37)) | {45, 46, 47} | set(range(50, 59))
+_DATE_CODE = re.compile(r"[dmyhs]", re.IGNORECASE)
+_QUOTED = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.')
+_DIGITS = "0123456789"
+_T, _V, _IS = f"{_NS}t", f"{_NS}v", f"{_NS}is"
+
+
+def _column_index(letters: str) -> int:
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + (ord(ch) - 64)
+    return idx - 1
+
+
+def _text(node) -> str:
+    """Texte d'un ``<si>``/``<is>`` : ``<t>`` direct ou concaténation des ``<r><t>``."""
+    first = node.find(_T)
+    if first is not None:
+        return first.text or ""
+    return "".join(t.text or "" for t in node.iter(_T))
+
+
+class XlsxReader:
+    def __init__(self, path: str, sheet: str | None = None):
+        self._zip = zipfile.ZipFile(path)
+        try:
+            self._load(sheet)
+        except Exception:
+            self._zip.close()
+            raise
+
+    def __enter__(self) -> "XlsxReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def _read_xml(self, name: str):
+        try:
+            return fromstring(self._zip.read(name))
+        except KeyError:
+            return None
+
+    def _load(self, sheet: str | None) -> None:
+        workbook = self._read_xml("xl/workbook.xml")
+        if workbook is None:
+            raise ValueError("Fichier XLSX invalide (xl/workbook.xml absent).")
+        pr = workbook.find(f"{_NS}workbookPr")
+        self._epoch = datetime(1904, 1, 1) if pr is not None and pr.get("date1904") in ("1", "true") else datetime(1899, 12, 30)
+
+        sheets = [(s.get("name"), s.get(f"{_REL_NS}id")) for s in workbook.iter(f"{_NS}sheet")]
+        self.sheet_names = [name for name, _rid in sheets]
+        if not sheets:
+            raise ValueError("Le classeur ne contient aucune feuille.")
+        if sheet is None:
+            rid = sheets[0][1]
+        else:
+            matches = [rid for name, rid in sheets if name == sheet]
+            if not matches:
+                raise KeyError(f"Feuille introuvable: {sheet}")
+            rid = matches[0]
+
+        rels = self._read_xml("xl/_rels/workbook.xml.rels")
+        target = next(r.get("Target") for r in rels.iter(f"{_PKG_REL_NS}Relationship") if r.get("Id") == rid)
+        self._sheet_path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+
+        shared = self._read_xml("xl/sharedStrings.xml")
+        self._shared = [_text(si) for si in shared.iter(f"{_NS}si")] if shared is not None else []
+
+        self._columns: dict[str, int] = {}
+        self._date_styles: set[int] = set()
+        styles = self._read_xml("xl/styles.xml")
+        if styles is not None:
+            custom = {
+                int(f.get("numFmtId")): _DATE_CODE.search(_QUOTED.sub("", f.get("formatCode", ""))) is not None
+                for f in styles.iter(f"{_NS}numFmt")
+            }
+            cell_xfs = styles.find(f"{_NS}cellXfs")
+            for idx, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+                fmt = int(xf.get("numFmtId", "0"))
+                if fmt in _BUILTIN_DATE_FORMATS or custom.get(fmt):
+                    self._date_styles.add(idx)
+
+    def _value(self, cell) -> Any:
+        kind = cell.get("t", "n")
+        if kind == "inlineStr":
+            node = cell.find(_IS)
+            return _text(node) if node is not None else ""
+        v = cell.find(_V)
+        if v is None or v.text is None:
+            return None
+        raw = v.text
+        if kind == "s":
+            return self._shared[int(raw)]
+        if kind in ("str", "d"):
+            return raw
+        if kind == "b":
+            return raw == "1"
+        if kind == "e":
+            return None
+        number = float(raw)
+        style = cell.get("s")
+        if style is not None and int(style) in self._date_styles:
+            return self._epoch + timedelta(days=number)
+        return int(number) if number.is_integer() else number
+
+    def _row_values(self, row) -> tuple:
+        values: list[Any] = []
+        columns = self._columns
+        for cell in row:
+            ref = cell.get("r")
+            if ref:
+                letters = ref.rstrip(_DIGITS)
+                col = columns.get(letters)
+                if col is None:
+                    col = columns[letters] = _column_index(letters)
+                if col > len(values):
+                    values.extend([None] * (col - len(values)))
+            values.append(self._value(cell))
+        return tuple(values)
+
+    def _iter_row_elements(self, fh) -> Iterator:
+        row_tag, data_tag = f"{_NS}row", f"{_NS}sheetData"
+        sheet_data = None
+        for event, elem in iterparse(fh, events=("start", "end")):
+            if event == "start":
+                if elem.tag == data_tag:
+                    sheet_data = elem
+            elif elem.tag == row_tag:
+                yield elem
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+    def iter_rows(self, min_row: int = 1, max_row: int | None = None) -> Iterator[tuple[int, tuple]]:
+        """``(numéro de ligne, valeurs)`` des lignes présentes entre ``min_row`` et ``max_row``."""
+        with self._zip.open(self._sheet_path) as fh:
+            line = 0
+            for row in self._iter_row_elements(fh):
+                line = int(row.get("r") or line + 1)
+                if max_row is not None and line > max_row:
+                    return
+                if line >= min_row:
+                    yield line, self._row_values(row)
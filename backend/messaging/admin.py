@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Message, Notification, Thread
+from .services import recount_unread
 
 
 @admin.register(Thread)
@@ -21,3 +22,18 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "type", "lu", "created_at")
     search_fields = ("titre", "corps", "user__username")
     list_filter = ("type", "lu", "created_at")
+
+    def save_model(self, request, obj, form, change):
+        previous_user_id = form.initial.get("user") if change else None
+        super().save_model(request, obj, form, change)
+        recount_unread({obj.user_id, previous_user_id} - {None})
+
+    def delete_model(self, request, obj):
+        user_id = obj.user_id
+        super().delete_model(request, obj)
+        recount_unread([user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list("user_id", flat=True))
+        super().delete_queryset(request, queryset)
+        recount_unread(user_ids)
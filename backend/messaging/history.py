@@ -0,0 +1,44 @@
+"""Historique d'un fil par fenêtres : les N derniers messages, puis les précédents à la demande.
+
+Le curseur porte (``created_at``, ``id``) du plus ancien message affiché ; la
+fenêtre précédente est lue par un filtre keyset sur l'index
+``(thread, created_at, id)``, sans OFFSET ni chargement du fil complet.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+
+from core.keyset import decode_cursor, encode_cursor, keyset_filter, ordering_fields
+
+from .models import Message, Thread
+
+ORDERING = ("-created_at", "-id")
+
+
+def message_window(thread: Thread, *, before: str | None = None, limit: int | None = None) -> dict[str, Any]:
+    """Messages (du plus ancien au plus récent) précédant ``before`` ; ``earlier`` vaut ``None`` au début du fil."""
+    limit = limit or getattr(settings, "MESSAGE_WINDOW_SIZE", 50)
+    qs = Message.objects.filter(thread=thread).select_related("sender").order_by(*ORDERING)
+    cursor = decode_cursor(before, len(ORDERING), fields=ordering_fields(qs, ORDERING))
+    if cursor:
+        qs = qs.filter(keyset_filter(ORDERING, cursor))
+    rows = list(qs[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return {
+        "messages": rows,
+        "earlier": encode_cursor([rows[0].created_at, rows[0].pk]) if has_more else None,
+    }
+
+
+def serialize_message(message: Message) -> dict[str, Any]:
+    return {
+        "id": message.pk,
+        "sender": message.sender.get_username(),
+        "contenu": message.contenu,
+        "created_at": message.created_at.isoformat(),
+    }
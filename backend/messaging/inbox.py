@@ -0,0 +1,66 @@
+"""Boîte de réception : fils d'un utilisateur triés par dernière activité.
+
+Chaque fil est annoté en SQL (sous-requêtes corrélées) avec son dernier
+message, son auteur et le nombre de notifications non lues de l'utilisateur ;
+les participants sont préchargés pour la page seule. Une page coûte donc deux
+requêtes quel que soit le nombre de fils. La pagination est par curseur
+(``last_activity``, ``id``) via ``core.keyset``, au même format que les
+autres listes.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.contrib.auth import get_user_model
+from django.db.models import CharField, Count, F, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+
+from core.keyset import decode_cursor, encode_cursor, keyset_filter, ordering_fields
+
+from .models import Message, Notification, Thread
+
+ORDERING = ("-last_activity", "-id")
+
+
+def inbox_queryset(user):
+    last = Message.objects.filter(thread=OuterRef("pk")).order_by("-created_at", "-id")
+    unread = (
+        Notification.objects.filter(
+            user=user,
+            lu=False,
+            url=Concat(Value("/messages/"), Cast(OuterRef("pk"), CharField()), Value("/")),
+        )
+        .order_by()
+        .values("user_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    return (
+        Thread.objects.filter(participants=user)
+        .annotate(
+            last_message=Subquery(last.values("contenu")[:1]),
+            last_sender=Subquery(last.values("sender__username")[:1]),
+            last_activity=Coalesce(Subquery(last.values("created_at")[:1]), F("created_at")),
+            unread=Coalesce(Subquery(unread), Value(0)),
+        )
+        .prefetch_related(
+            Prefetch("participants", queryset=get_user_model().objects.only("id", "username").order_by("username"))
+        )
+        .order_by(*ORDERING)
+    )
+
+
+def inbox_page(user, *, cursor: str | None = None, page_size: int = 30) -> dict[str, Any]:
+    """Page de fils après ``cursor`` ; ``next_cursor`` vaut ``None`` sur la dernière page."""
+    qs = inbox_queryset(user)
+    after = decode_cursor(cursor, len(ORDERING), fields=ordering_fields(qs, ORDERING))
+    if after:
+        qs = qs.filter(keyset_filter(ORDERING, after))
+    threads = list(qs[: page_size + 1])
+    has_more = len(threads) > page_size
+    threads = threads[:page_size]
+    return {
+        "threads": threads,
+        "next_cursor": encode_cursor([threads[-1].last_activity, threads[-1].pk]) if has_more else None,
+    }
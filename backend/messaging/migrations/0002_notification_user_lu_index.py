@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'lu', 'created_at'], name='notif_user_lu_created_idx'),
+        ),
+    ]
@@ -24,6 +24,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["thread", "created_at", "id"], name="message_thread_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Message {self.pk}"
@@ -49,6 +52,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "lu", "created_at"], name="notif_user_lu_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Notif {self.user_id} - {self.type}"
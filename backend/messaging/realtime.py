@@ -0,0 +1,168 @@
+"""Diffusion en temps réel des notifications et messages (Server-Sent Events).
+
+Les vues publient un évènement par destinataire après le commit ; les
+connexions SSE ouvertes (``notifications_stream``, servi en ASGI) le
+reçoivent via un pub/sub en mémoire. ``REALTIME_BROKER=redis`` relaie les
+évènements entre processus par Redis (paquet ``redis`` requis) ; le pub/sub
+en mémoire ne couvre que le processus courant.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Iterable
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """File d'évènements d'une connexion, liée à la boucle asyncio qui la lit."""
+
+    def __init__(self, user_id: int, maxsize: int = 100):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def _put(self, event: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Client trop lent : on perd l'évènement, le compteur reste juste au prochain envoi.
+            pass
+
+    def deliver(self, event: dict[str, Any]) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Boucle fermée : connexion en cours de fermeture.
+            pass
+
+    async def get(self, timeout: float) -> dict[str, Any] | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Pub/sub en mémoire du processus ; ``publish`` peut être appelé depuis n'importe quel thread."""
+
+    def __init__(self):
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        sub = Subscription(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def publish(self, user_id: int, event: dict[str, Any]) -> None:
+        self.deliver_local(user_id, event)
+
+    def deliver_local(self, user_id: int, event: dict[str, Any]) -> None:
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            sub.deliver(event)
+
+
+class RedisBroker(LocalBroker):
+    """Relaie les évènements par Redis pour les déploiements à plusieurs processus."""
+
+    channel_prefix = "adjahi:realtime:"
+
+    def __init__(self, url: str):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured("REALTIME_BROKER=redis nécessite le paquet 'redis'") from exc
+        self._client = redis.Redis.from_url(url)
+        self._listener: threading.Thread | None = None
+
+    def subscribe(self, user_id: int) -> Subscription:
+        self._ensure_listening()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id: int, event: dict[str, Any]) -> None:
+        self._client.publish(f"{self.channel_prefix}{user_id}", json.dumps(event, default=str))
+
+    def _ensure_listening(self) -> None:
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name="realtime-redis", daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{self.channel_prefix}*")
+        for item in pubsub.listen():
+            try:
+                channel = item["channel"].decode() if isinstance(item["channel"], bytes) else item["channel"]
+                user_id = int(channel[len(self.channel_prefix):])
+                self.deliver_local(user_id, json.loads(item["data"]))
+            except (KeyError, ValueError):
+                logger.warning("Évènement temps réel ignoré: %r", item)
+
+
+_broker: LocalBroker | None = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> LocalBroker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if getattr(settings, "REALTIME_BROKER", "memory") == "redis":
+                _broker = RedisBroker(getattr(settings, "REALTIME_REDIS_URL", "redis://localhost:6379/0"))
+            else:
+                _broker = LocalBroker()
+        return _broker
+
+
+def publish(user_ids: Iterable[int], event: dict[str, Any]) -> None:
+    broker = get_broker()
+    for user_id in set(user_ids):
+        try:
+            broker.publish(user_id, event)
+        except Exception:
+            logger.exception("Publication temps réel impossible (utilisateur %s)", user_id)
+
+
+def publish_on_commit(user_ids: Iterable[int], event: dict[str, Any]) -> None:
+    """Publie après le commit : les clients ne reçoivent que des lignes visibles en base."""
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: publish(user_ids, event))
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+def _reset_after_fork() -> None:
+    global _broker, _broker_lock
+    _broker = None
+    _broker_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,113 @@
+"""Création des notifications et compteur de non-lues.
+
+Le nombre de notifications non lues est dénormalisé dans
+``Profil.notifications_non_lues`` et mis à jour dans la même transaction que
+les notifications (création groupée, lecture, « tout marquer comme lu »).
+Le badge lit le profil déjà chargé par la page, sans requête de comptage.
+
+Toute notification passe par ``notify`` : création groupée, incrément des
+compteurs et envoi en temps réel après le commit. Les écritures unitaires
+hors de ce module (admin, API, purge) resynchronisent avec ``recount_unread``.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from accounts.models import Profil
+
+from .models import Message, Notification
+from .realtime import publish_on_commit
+
+
+def unread_count(user_id: int) -> int:
+    """Lecture du compteur (une ligne par clé primaire)."""
+    count = Profil.objects.filter(user_id=user_id).values_list("notifications_non_lues", flat=True).first()
+    return count or 0
+
+
+def _adjust(deltas: dict[int, int]) -> None:
+    by_delta: dict[int, list[int]] = {}
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        if delta > 0:
+            value = F("notifications_non_lues") + delta
+        else:
+            # GREATEST(n, d) - d : jamais négatif, même en colonne non signée (MySQL).
+            value = Greatest(F("notifications_non_lues"), Value(-delta)) - Value(-delta)
+        Profil.objects.filter(user_id__in=user_ids).update(notifications_non_lues=value)
+
+
+def recount_unread(user_ids: Iterable[int]) -> None:
+    """Recalcule les compteurs à partir des notifications (index ``user, lu, created_at``)."""
+    unread = (
+        Notification.objects.filter(user_id=OuterRef("user_id"), lu=False)
+        .order_by()
+        .values("user_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Profil.objects.filter(user_id__in=set(user_ids)).update(
+        notifications_non_lues=Coalesce(Subquery(unread), Value(0))
+    )
+
+
+def notify(
+    users: Iterable,
+    *,
+    titre: str,
+    corps: str = "",
+    url: str = "",
+    type: str = Notification.TYPE_MESSAGE,
+) -> list[Notification]:
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            [Notification(user=u, type=type, titre=titre, corps=corps, url=url) for u in users]
+        )
+        deltas = Counter(n.user_id for n in notifications)
+        _adjust(deltas)
+    publish_on_commit(
+        deltas,
+        {"kind": "notification", "type": type, "titre": titre, "corps": corps, "url": url},
+    )
+    return notifications
+
+
+def publish_message(message: Message, recipient_ids: Iterable[int]) -> None:
+    publish_on_commit(
+        recipient_ids,
+        {
+            "kind": "message",
+            "id": message.pk,
+            "thread_id": message.thread_id,
+            "sender": message.sender.get_username(),
+            "contenu": message.contenu,
+            "created_at": message.created_at.isoformat(),
+        },
+    )
+
+
+def mark_read(user_id: int, **filters) -> int:
+    with transaction.atomic():
+        updated = Notification.objects.filter(user_id=user_id, lu=False, **filters).update(lu=True)
+        if updated:
+            _adjust({user_id: -updated})
+    if updated:
+        publish_on_commit([user_id], {"kind": "read"})
+    return updated
+
+
+def mark_all_read(user_id: int) -> int:
+    with transaction.atomic():
+        updated = Notification.objects.filter(user_id=user_id, lu=False).update(lu=True)
+        Profil.objects.filter(user_id=user_id).update(notifications_non_lues=0)
+    if updated:
+        publish_on_commit([user_id], {"kind": "read"})
+    return updated
@@ -1,10 +1,23 @@
 from django.urls import path
 
-from .views import notifications_list, thread_create, thread_detail, thread_list
+from .views import (
+    notifications_list,
+    notifications_mark_all_read,
+    notifications_stream,
+    notifications_unread_count,
+    thread_create,
+    thread_detail,
+    thread_list,
+    thread_messages,
+)
 
 urlpatterns = [
     path("messages/", thread_list, name="messaging-thread-list"),
     path("messages/nouveau/", thread_create, name="messaging-thread-create"),
     path("messages/<int:pk>/", thread_detail, name="messaging-thread-detail"),
+    path("messages/<int:pk>/historique/", thread_messages, name="messaging-thread-messages"),
     path("notifications/", notifications_list, name="messaging-notifications"),
+    path("notifications/tout-lire/", notifications_mark_all_read, name="messaging-notifications-mark-all-read"),
+    path("notifications/non-lues/", notifications_unread_count, name="messaging-notifications-unread"),
+    path("notifications/flux/", notifications_stream, name="messaging-notifications-stream"),
 ]
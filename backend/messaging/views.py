@@ -1,20 +1,29 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
 
 from audit.models import AuditLog
 from audit.utils import log_action
 from accounts.permissions import role_required
+from core.keyset import parse_limit
 
 from .forms import MessageForm, ThreadForm
-from .models import Message, Notification, Thread
+from .history import message_window, serialize_message
+from .inbox import inbox_page
+from .models import Notification, Thread
+from .realtime import format_sse, get_broker
+from .services import mark_all_read, mark_read, notify, publish_message, unread_count
 
 
 @login_required
 @role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE", "PSYCHOLOGUE")
 def thread_list(request):
-    threads = Thread.objects.filter(participants=request.user).order_by("-created_at")
-    return render(request, "messaging/thread_list.html", {"threads": threads})
+    page = inbox_page(request.user, cursor=request.GET.get("apres"), page_size=getattr(settings, "INBOX_PAGE_SIZE", 30))
+    return render(request, "messaging/thread_list.html", page)
 
 
 @login_required
@@ -29,17 +38,11 @@ def thread_create(request):
 
             log_action(request, action=AuditLog.ACTION_CREATE, instance=thread)
 
-            Notification.objects.bulk_create(
-                [
-                    Notification(
-                        user=u,
-                        type=Notification.TYPE_MESSAGE,
-                        titre="Nouvelle conversation",
-                        corps=thread.sujet or "Conversation",
-                        url=f"/messages/{thread.id}/",
-                    )
-                    for u in thread.participants.all()
-                ]
+            notify(
+                thread.participants.all(),
+                titre="Nouvelle conversation",
+                corps=thread.sujet or "Conversation",
+                url=f"/messages/{thread.id}/",
             )
             return redirect("messaging-thread-detail", pk=thread.pk)
     else:
@@ -50,8 +53,8 @@ def thread_create(request):
 @login_required
 @role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE", "PSYCHOLOGUE")
 def thread_detail(request, pk: int):
-    thread = get_object_or_404(Thread.objects.prefetch_related("participants", "messages"), pk=pk)
-    if not thread.participants.filter(pk=request.user.pk).exists():
+    thread = get_object_or_404(Thread.objects.prefetch_related("participants"), pk=pk)
+    if not any(p.pk == request.user.pk for p in thread.participants.all()):
         return redirect("messaging-thread-list")
 
     if request.method == "POST":
@@ -64,28 +67,33 @@ def thread_detail(request, pk: int):
 
             log_action(request, action=AuditLog.ACTION_CREATE, instance=msg, extra={"thread_id": thread.pk})
 
-            recipients = thread.participants.exclude(pk=request.user.pk)
-            Notification.objects.bulk_create(
-                [
-                    Notification(
-                        user=u,
-                        type=Notification.TYPE_MESSAGE,
-                        titre="Nouveau message",
-                        corps=msg.contenu[:180],
-                        url=f"/messages/{thread.id}/",
-                    )
-                    for u in recipients
-                ]
-            )
+            recipients = list(thread.participants.exclude(pk=request.user.pk))
+            notify(recipients, titre="Nouveau message", corps=msg.contenu[:180], url=f"/messages/{thread.id}/")
+            publish_message(msg, [u.pk for u in recipients])
 
             return redirect("messaging-thread-detail", pk=thread.pk)
     else:
         form = MessageForm()
 
     # Marque notifications liées à ce thread comme lues
-    Notification.objects.filter(user=request.user, url=f"/messages/{thread.id}/", lu=False).update(lu=True)
+    profil = getattr(request.user, "profil", None)
+    if profil is None or profil.notifications_non_lues:
+        mark_read(request.user.pk, url=f"/messages/{thread.id}/")
+
+    window = message_window(thread, before=request.GET.get("avant"))
+    return render(request, "messaging/thread_detail.html", {"thread": thread, "form": form, **window})
+
 
-    return render(request, "messaging/thread_detail.html", {"thread": thread, "form": form})
+@login_required
+@role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE", "PSYCHOLOGUE")
+def thread_messages(request, pk: int):
+    """Fenêtre de messages en JSON (chargement incrémental des messages précédents)."""
+    thread = get_object_or_404(Thread.objects.filter(participants=request.user), pk=pk)
+    limit = parse_limit(request.GET.get("limit"), 200)
+    window = message_window(thread, before=request.GET.get("avant"), limit=limit)
+    return JsonResponse(
+        {"messages": [serialize_message(m) for m in window["messages"]], "earlier": window["earlier"]}
+    )
 
 
 @login_required
@@ -93,3 +101,58 @@ def thread_detail(request, pk: int):
 def notifications_list(request):
     notifs = Notification.objects.filter(user=request.user).order_by("-created_at")
     return render(request, "messaging/notifications.html", {"notifications": notifs})
+
+
+@login_required
+@require_POST
+def notifications_mark_all_read(request):
+    updated = mark_all_read(request.user.pk)
+    if request.headers.get("Accept", "").startswith("application/json"):
+        return JsonResponse({"updated": updated, "count": 0})
+    return redirect("messaging-notifications")
+
+
+@login_required
+def notifications_unread_count(request):
+    return JsonResponse({"count": unread_count(request.user.pk)})
+
+
+async def notifications_stream(request):
+    """Flux SSE des notifications et messages de l'utilisateur connecté.
+
+    En ASGI la connexion reste ouverte (ping régulier). En WSGI, où une réponse
+    infinie bloquerait un worker, on renvoie l'état courant et le navigateur se
+    reconnecte après ``retry`` millisecondes.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    count = await sync_to_async(unread_count)(user.pk)
+    if not isinstance(request, ASGIRequest):
+        retry_ms = getattr(settings, "REALTIME_WSGI_RETRY_MS", 15000)
+        return HttpResponse(f"retry: {retry_ms}\n" + format_sse("unread", {"count": count}), content_type="text/event-stream")
+
+    heartbeat = getattr(settings, "REALTIME_HEARTBEAT_SECONDS", 20)
+
+    async def events():
+        sub = get_broker().subscribe(user.pk)
+        try:
+            yield "retry: 3000\n" + format_sse("unread", {"count": count})
+            while True:
+                event = await sub.get(heartbeat)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                if event["kind"] != "read":
+                    yield format_sse(event["kind"], event)
+                if event["kind"] in ("notification", "read"):
+                    yield format_sse("unread", {"count": await sync_to_async(unread_count)(user.pk)})
+        finally:
+            # Déconnexion du client : Django annule le générateur.
+            get_broker().unsubscribe(sub)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,167 @@
+"""Suivi coalescé des accès aux dossiers patients (``date_dernier_acces``).
+
+Les accès sont mémorisés en mémoire puis écrits périodiquement en une mise à
+jour groupée (``bulk_update``) au lieu d'un SELECT + UPDATE par page vue.
+Les accès répétés au même patient dans ``PATIENT_ACCESS_DEDUP_WINDOW``
+secondes sont ignorés. L'écriture finale (``atexit``) est sautée, avec un
+simple avertissement, si la base n'est plus disponible à l'arrêt (ex. base de
+test déjà détruite).
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections, router
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class AccessTracker:
+    def __init__(self, *, flush_interval: int, dedup_window: int):
+        self.flush_interval = int(flush_interval)
+        self.dedup_window = int(dedup_window)
+        self._pending: dict[int, datetime] = {}
+        self._last_seen: dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def record(self, patient_id: int, when: datetime | None = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_seen.get(patient_id)
+            if last is not None and now - last < self.dedup_window:
+                return
+            self._last_seen[patient_id] = now
+            self._pending[patient_id] = when or timezone.now()
+
+        if self.flush_interval <= 0:
+            self.flush()
+        else:
+            self._ensure_started()
+
+    def flush(self) -> int:
+        """Écrit les accès en attente ; renvoie le nombre de patients mis à jour."""
+        from .models import Patient
+
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                horizon = time.monotonic() - self.dedup_window
+                self._last_seen = {pk: t for pk, t in self._last_seen.items() if t >= horizon}
+
+            if not pending:
+                return 0
+
+            try:
+                Patient.objects.bulk_update(
+                    [Patient(pk=pk, date_dernier_acces=ts) for pk, ts in pending.items()],
+                    ["date_dernier_acces"],
+                    batch_size=500,
+                )
+            except Exception:
+                # On réinjecte les accès non écrits sans écraser de plus récents.
+                with self._lock:
+                    for pk, ts in pending.items():
+                        current = self._pending.get(pk)
+                        if current is None or current < ts:
+                            self._pending[pk] = ts
+                raise
+            return len(pending)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.flush_interval + 5)
+        with self._lock:
+            pending = len(self._pending)
+        if not pending:
+            return
+        if not _database_ready():
+            logger.warning("Base indisponible à l'arrêt : %d accès patients non écrits", pending)
+            return
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.warning("Écriture finale des accès patients impossible : %s", exc)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="patient-access-flush", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(self.flush_interval):
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("Écriture des accès patients impossible, nouvel essai au prochain intervalle")
+                    connections.close_all()
+        finally:
+            connections.close_all()
+
+
+def _database_ready() -> bool:
+    """Vrai si la table des patients est encore accessible."""
+    from .models import Patient
+
+    connection = connections[router.db_for_write(Patient)]
+    try:
+        with connection.cursor() as cursor:
+            return Patient._meta.db_table in connection.introspection.table_names(cursor)
+    except Exception:
+        return False
+
+
+_tracker: AccessTracker | None = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker() -> AccessTracker:
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = AccessTracker(
+                flush_interval=getattr(settings, "PATIENT_ACCESS_FLUSH_INTERVAL", 30),
+                dedup_window=getattr(settings, "PATIENT_ACCESS_DEDUP_WINDOW", 300),
+            )
+            atexit.register(_tracker.shutdown)
+        return _tracker
+
+
+def flush_pending_accesses(*, wait: bool = True) -> int:
+    """Écrit les accès en attente avant un traitement basé sur ``date_dernier_acces``.
+
+    Les accès des autres processus (workers web) sont écrits par leur propre
+    thread ; avec ``wait=True`` on attend un intervalle complet pour que leurs
+    valeurs soient en base.
+    """
+    flushed = get_tracker().flush()
+    interval = getattr(settings, "PATIENT_ACCESS_FLUSH_INTERVAL", 30)
+    if wait and interval > 0:
+        time.sleep(interval + 1)
+    return flushed
+
+
+def _reset_after_fork() -> None:
+    global _tracker, _tracker_lock
+    _tracker = None
+    _tracker_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
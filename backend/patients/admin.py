@@ -1,6 +1,23 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
-from .models import CasSuivi, Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SmsLog, SuiviCPN
+from audit.models import AuditLog
+from audit.utils import log_action
+
+from .export import iter_ndjson, iter_zip
+
+from .models import (
+    CasSuivi,
+    Consultation,
+    DoublonPotentiel,
+    LigneOrdonnance,
+    Ordonnance,
+    Patient,
+    RendezVous,
+    SmsLog,
+    SuiviCPN,
+)
 
 
 @admin.register(Patient)
@@ -8,6 +25,40 @@ class PatientAdmin(admin.ModelAdmin):
     list_display = ("code_patient", "nom", "prenoms", "sexe", "zone", "telephone")
     search_fields = ("code_patient", "nom", "prenoms", "telephone")
     list_filter = ("zone", "sexe")
+    actions = ("export_ndjson", "export_zip")
+
+    def _export(self, request, queryset, fmt: str, stream, content_type: str):
+        log_action(
+            request,
+            action=AuditLog.ACTION_EXPORT,
+            app_label="patients",
+            model="patient",
+            extra={"format": fmt, "patients": queryset.count()},
+        )
+        response = StreamingHttpResponse(
+            stream(queryset, exported_by=request.user.get_username()), content_type=content_type
+        )
+        filename = f"patients_{timezone.now():%Y%m%d_%H%M}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.action(description="Exporter (NDJSON)")
+    def export_ndjson(self, request, queryset):
+        return self._export(request, queryset, "ndjson", iter_ndjson, "application/x-ndjson")
+
+    @admin.action(description="Exporter (zip)")
+    def export_zip(self, request, queryset):
+        return self._export(request, queryset, "zip", iter_zip, "application/zip")
+
+
+@admin.register(DoublonPotentiel)
+class DoublonPotentielAdmin(admin.ModelAdmin):
+    list_display = ("patient_a", "patient_b", "score", "statut", "created_at")
+    list_select_related = ("patient_a", "patient_b")
+    search_fields = ("patient_a__code_patient", "patient_a__nom", "patient_b__code_patient", "patient_b__nom")
+    list_filter = ("statut",)
+    list_editable = ("statut",)
+    raw_id_fields = ("patient_a", "patient_b")
 
 
 @admin.register(Consultation)
@@ -26,9 +77,9 @@ class SuiviCPNAdmin(admin.ModelAdmin):
 
 @admin.register(RendezVous)
 class RendezVousAdmin(admin.ModelAdmin):
-    list_display = ("patient", "date_heure", "statut", "objet")
+    list_display = ("patient", "date_heure", "statut", "objet", "rappel_statut")
     search_fields = ("patient__code_patient", "patient__nom", "patient__prenoms", "objet")
-    list_filter = ("statut", "date_heure")
+    list_filter = ("statut", "rappel_statut", "date_heure")
 
 
 class LigneOrdonnanceInline(admin.TabularInline):
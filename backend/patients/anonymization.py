@@ -0,0 +1,131 @@
+"""Anonymisation des patients (RGPD), par paquets et en requêtes groupées.
+
+Un même moteur sert la vue d'anonymisation et les commandes
+``rgpd_cleanup`` / ``anonymize_patients``. Les patients sont parcourus par
+clé (``pk``) en paquets de ``ANONYMIZATION_CHUNK_SIZE`` ; chaque paquet est
+une transaction courte : un ``UPDATE`` unique (``Concat``/``Cast`` pour le
+marqueur), un ``bulk_update`` des comptes liés, un ``bulk_create`` du journal
+d'audit, la réindexation de la recherche et le retrait des paires de doublons
+à vérifier. Les PDF d'ordonnance en cache (qui impriment l'identité) sont
+supprimés après le commit. Les verrous ne portent ainsi que sur un paquet à
+la fois.
+
+Marqueur commun : ``nom = "ANONYMISE"``, ``prenoms = "PATIENT_<id>"``.
+L'ancien marqueur ``ANONYME_<id>`` de ``anonymize_patients`` reste reconnu.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import CharField, Q, QuerySet, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from audit.models import AuditLog
+
+from .models import DoublonPotentiel, Patient
+from .search import reindex_patients
+from .utils import invalidate_patient_pdfs
+
+ANONYMIZED_NOM = "ANONYMISE"
+ANONYMIZED_PRENOMS_PREFIX = "PATIENT_"
+_LEGACY_NOM_PREFIX = "ANONYME_"
+
+
+def anonymized_q() -> Q:
+    """Patients déjà anonymisés (marqueur actuel ou ancien)."""
+    return Q(nom=ANONYMIZED_NOM) | Q(nom__startswith=_LEGACY_NOM_PREFIX)
+
+
+def _chunk_size() -> int:
+    return int(getattr(settings, "ANONYMIZATION_CHUNK_SIZE", 500))
+
+
+def _anonymize_chunk(
+    rows: list[tuple[int, str, int | None]],
+    *,
+    audit: dict[str, Any],
+    extra: dict[str, Any],
+) -> None:
+    User = get_user_model()
+    ids = [pk for pk, _code, _user_id in rows]
+    now = timezone.now()
+    with transaction.atomic():
+        Patient.objects.filter(pk__in=ids).update(
+            nom=ANONYMIZED_NOM,
+            prenoms=Concat(Value(ANONYMIZED_PRENOMS_PREFIX), Cast("pk", CharField())),
+            telephone="",
+            adresse="",
+            antecedents="",
+            date_naissance=None,
+            date_dernier_acces=None,
+            # Un patient anonymisé n'entre plus dans la détection de doublons.
+            cle_phonetique="",
+            doublons_verifies=True,
+            updated_at=now,
+        )
+
+        owners = {user_id: pk for pk, _code, user_id in rows if user_id}
+        users = list(User.objects.filter(pk__in=owners))
+        for u in users:
+            u.is_active = False
+            # Nom unique pour respecter la contrainte sur ``username``.
+            u.username = f"anonyme_{owners[u.pk]}_{u.pk}"
+            u.email = ""
+            u.first_name = "ANONYME"
+            u.last_name = ""
+        User.objects.bulk_update(users, ["is_active", "username", "email", "first_name", "last_name"])
+
+        AuditLog.objects.bulk_create(
+            AuditLog(
+                action=AuditLog.ACTION_UPDATE,
+                app_label="patients",
+                model="patient",
+                object_id=str(pk),
+                object_repr=f"{code} - {ANONYMIZED_NOM} {ANONYMIZED_PRENOMS_PREFIX}{pk}"[:255],
+                extra={"anonymized": True, "previous_code_patient": code, **extra},
+                created_at=now,
+                **audit,
+            )
+            for pk, code, _user_id in rows
+        )
+        reindex_patients(ids)
+        DoublonPotentiel.objects.filter(
+            Q(patient_a_id__in=ids) | Q(patient_b_id__in=ids), statut=DoublonPotentiel.STATUT_A_VERIFIER
+        ).delete()
+        invalidate_patient_pdfs(ids)
+
+
+def anonymize_patients(
+    patients: QuerySet,
+    *,
+    audit: dict[str, Any] | None = None,
+    extra: dict[str, Any] | None = None,
+    chunk_size: int | None = None,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Anonymise ``patients`` (hors déjà anonymisés) ; renvoie le nombre traité.
+
+    ``audit`` complète chaque entrée du journal (``user_id``, ``ip_address``,
+    ``user_agent`` : voir ``audit.utils.request_audit_fields``) ; ``progress``
+    reçoit le cumul après chaque paquet.
+    """
+    chunk_size = chunk_size or _chunk_size()
+    base = patients.exclude(anonymized_q()).order_by("pk")
+    audit = audit or {}
+    extra = extra or {}
+    done = 0
+    last = 0
+    while True:
+        rows = list(base.filter(pk__gt=last).values_list("pk", "code_patient", "user_id")[:chunk_size])
+        if not rows:
+            return done
+        _anonymize_chunk(rows, audit=audit, extra=extra)
+        done += len(rows)
+        last = rows[-1][0]
+        if progress:
+            progress(done)
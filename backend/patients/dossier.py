@@ -0,0 +1,139 @@
+"""Dossier d'un patient : dernières entrées de chaque rubrique et totaux.
+
+``load_dossier`` lit le patient et le total de chaque rubrique en une requête
+(sous-requêtes ``COUNT`` corrélées, sans jointure qui multiplierait les
+lignes), puis les ``DOSSIER_SECTION_SIZE`` entrées les plus récentes de chaque
+rubrique par des ``Prefetch`` bornés (lignes d'ordonnance comprises). Le coût
+d'affichage ne dépend donc pas de l'ancienneté du dossier.
+
+``section_page`` sert la suite d'une rubrique (« Voir plus ») par curseur
+(``core.keyset``) sur l'ordre de la rubrique.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.keyset import decode_cursor, encode_cursor, keyset_filter, ordering_fields
+
+from .models import Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
+
+
+def _iso(value) -> str | None:
+    return value.isoformat() if value else None
+
+
+@dataclass(frozen=True)
+class Section:
+    model: type
+    related_name: str
+    ordering: tuple[str, ...]
+    serialize: Callable[[Any], dict[str, Any]]
+    prefetch: tuple[Any, ...] = ()
+
+    def queryset(self) -> QuerySet:
+        qs = self.model.objects.order_by(*self.ordering)
+        return qs.prefetch_related(*self.prefetch) if self.prefetch else qs
+
+
+SECTIONS: dict[str, Section] = {
+    "cpn": Section(
+        SuiviCPN,
+        "suivis_cpn",
+        ("numero", "id"),
+        lambda s: {"id": s.pk, "numero": s.numero, "date": _iso(s.date), "notes": s.notes},
+    ),
+    "rdv": Section(
+        RendezVous,
+        "rendez_vous",
+        ("-date_heure", "-id"),
+        lambda r: {
+            "id": r.pk,
+            "date_heure": _iso(r.date_heure),
+            "objet": r.objet,
+            "statut": r.statut,
+            "statut_display": r.get_statut_display(),
+        },
+    ),
+    "consultations": Section(
+        Consultation,
+        "consultations",
+        ("-date_consultation", "-id"),
+        lambda c: {
+            "id": c.pk,
+            "date_consultation": _iso(c.date_consultation),
+            "motif": c.motif,
+            "observation": c.observation,
+        },
+    ),
+    "ordonnances": Section(
+        Ordonnance,
+        "ordonnances",
+        ("-date", "-id"),
+        lambda o: {
+            "id": o.pk,
+            "date": _iso(o.date),
+            "diagnostic": o.diagnostic,
+            "lignes": [{"medicament": lg.medicament, "posologie": lg.posologie} for lg in o.lignes.all()],
+        },
+        prefetch=(Prefetch("lignes", queryset=LigneOrdonnance.objects.order_by("id")),),
+    ),
+}
+
+
+def _cursor(section: Section, obj) -> str:
+    return encode_cursor([getattr(obj, f.lstrip("-")) for f in section.ordering])
+
+
+def load_dossier(pk: int, *, size: int | None = None) -> Patient | None:
+    """Patient avec ``<rubrique>_total`` et ``recent_<rubrique>`` (listes bornées) ; ``None`` s'il n'existe pas."""
+    size = size or getattr(settings, "DOSSIER_SECTION_SIZE", 10)
+    totals = {}
+    prefetches = []
+    for name, section in SECTIONS.items():
+        count = (
+            section.model.objects.filter(patient=OuterRef("pk"))
+            .order_by()
+            .values("patient")
+            .annotate(n=Count("id"))
+            .values("n")
+        )
+        totals[f"{name}_total"] = Coalesce(Subquery(count, output_field=IntegerField()), Value(0))
+        # Une entrée de plus que la taille affichée : indique s'il reste des entrées.
+        prefetches.append(
+            Prefetch(section.related_name, queryset=section.queryset()[: size + 1], to_attr=f"recent_{name}")
+        )
+    patient = Patient.objects.annotate(**totals).prefetch_related(*prefetches).filter(pk=pk).first()
+    if patient is None:
+        return None
+    patient.more = {}
+    for name, section in SECTIONS.items():
+        rows = getattr(patient, f"recent_{name}")
+        has_more = len(rows) > size
+        del rows[size:]
+        patient.more[name] = _cursor(section, rows[-1]) if has_more else None
+    return patient
+
+
+def section_page(patient: Patient, name: str, *, cursor: str | None = None, limit: int | None = None) -> dict[str, Any]:
+    """Entrées de la rubrique ``name`` après ``cursor`` (JSON prêt à renvoyer) ; ``ValueError`` si le curseur est illisible."""
+    section = SECTIONS[name]
+    limit = limit or getattr(settings, "DOSSIER_SECTION_SIZE", 10)
+    qs = section.queryset().filter(patient=patient)
+    after = decode_cursor(cursor, len(section.ordering), fields=ordering_fields(qs, section.ordering))
+    if cursor and after is None:
+        raise ValueError("curseur invalide")
+    if after:
+        qs = qs.filter(keyset_filter(section.ordering, after))
+    rows = list(qs[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [section.serialize(obj) for obj in rows],
+        "next": _cursor(section, rows[-1]) if has_more else None,
+    }
@@ -0,0 +1,172 @@
+"""Détection des doublons de patients (orthographes variantes saisies sur le terrain).
+
+Chaque patient porte une clé de blocage ``cle_phonetique`` : clé phonétique du
+nom adaptée aux noms français et ivoiriens (« KOUASSI » et « Kwassi » donnent
+``KWS``), année de naissance et zone. Seuls les patients de même clé sont
+comparés, par similarité des noms et prénoms (``difflib``) complétée par la date
+de naissance et le téléphone ; les paires au-dessus de ``DUPLICATE_MIN_SCORE``
+sont enregistrées dans ``DoublonPotentiel`` pour vérification.
+
+La détection est incrémentale : la clé est recalculée à l'enregistrement
+(signal ``pre_save``, et par l'import Excel pour ses écritures groupées) et
+remet ``doublons_verifies`` à faux quand elle change ; ``detect_duplicates``
+ne traite que ces patients, par lots, chacun contre son seul bloc.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+
+from core.keyset import keyset_filter
+
+from .search import fold, normalize_phone
+
+KEY_MAX_LENGTH = 8
+BLOCKING_FIELDS = frozenset({"nom", "date_naissance", "zone"})
+_FIELDS = ("pk", "nom", "prenoms", "date_naissance", "telephone", "cle_phonetique")
+_VOWELS = "aeiou"
+# Graphies équivalentes, appliquées dans l'ordre sur le nom sans accents.
+_RULES = [
+    (re.compile(r"tch"), "x"),
+    (re.compile(r"ch|sh"), "x"),
+    (re.compile(r"d[jz]"), "j"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"gn"), "n"),
+    (re.compile(r"gu(?=[eiy])"), "g"),
+    (re.compile(r"qu|ck|q"), "k"),
+    (re.compile(r"c(?=[eiy])"), "s"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"ou(?=[aeio])"), "w"),
+    (re.compile(r"ou"), "u"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+# Finales muettes (« Traoré », « Diarrassouba » / « Diarassoubat »).
+_SILENT_END = re.compile(r"(?<=..)[estdx]$")
+
+
+def normalize_name(text: str | None) -> str:
+    """Nom réécrit selon les équivalences phonétiques, voyelles conservées."""
+    words = []
+    # « N'Guessan » et « Nguessan » : l'apostrophe ne coupe pas le mot.
+    for word in re.findall(r"[a-z]+", fold(text).replace("'", "")):
+        for pattern, repl in _RULES:
+            word = pattern.sub(repl, word)
+        words.append(_SILENT_END.sub("", word))
+    return " ".join(w for w in words if w)
+
+
+def phonetic_key(text: str | None) -> str:
+    """Squelette consonantique du premier mot : première lettre puis consonnes distinctes."""
+    words = normalize_name(text).split()
+    if not words:
+        return ""
+    word = words[0]
+    key = word[0] + re.sub(f"[{_VOWELS}]", "", word[1:])
+    key = re.sub(r"(.)\1+", r"\1", key)
+    return key.upper()[:KEY_MAX_LENGTH]
+
+
+def blocking_key(nom: str | None, date_naissance, zone: str | None) -> str:
+    """Clé ``phonétique:année:zone`` ; vide (jamais comparé) pour un patient anonymisé."""
+    if fold(nom).startswith("anonym"):
+        return ""
+    year = date_naissance.year if date_naissance else 0
+    return f"{phonetic_key(nom)}:{year}:{zone or ''}"
+
+
+def apply_blocking_key(patient) -> bool:
+    """Met à jour la clé d'un patient (sans l'enregistrer) ; ``True`` si elle a changé."""
+    key = blocking_key(patient.nom, patient.date_naissance, patient.zone)
+    if key == patient.cle_phonetique:
+        return False
+    patient.cle_phonetique = key
+    patient.doublons_verifies = False
+    return True
+
+
+def _prepare(row: dict[str, Any]) -> dict[str, Any]:
+    # Noms normalisés (ordre des mots ignoré) et téléphone calculés une fois par patient.
+    row["_name"] = " ".join(sorted(normalize_name(f"{row['nom']} {row['prenoms']}").split()))
+    row["_phone"] = normalize_phone(row["telephone"])
+    return row
+
+
+def similarity(a: dict[str, Any], b: dict[str, Any], min_score: float = 0.0) -> float:
+    """Score 0..1 : noms et prénoms, bonus date de naissance et téléphone.
+
+    Renvoie 0 dès que le score ne peut plus atteindre ``min_score`` (bornes rapides de difflib).
+    """
+    a = a if "_name" in a else _prepare(dict(a))
+    b = b if "_name" in b else _prepare(dict(b))
+    bonus = 0.0
+    if a["date_naissance"] and a["date_naissance"] == b["date_naissance"]:
+        bonus += 0.1
+    if a["_phone"] and a["_phone"] == b["_phone"]:
+        bonus += 0.1
+    matcher = SequenceMatcher(None, a["_name"], b["_name"])
+    if matcher.real_quick_ratio() + bonus < min_score or matcher.quick_ratio() + bonus < min_score:
+        return 0.0
+    return min(matcher.ratio() + bonus, 1.0)
+
+
+@dataclass
+class DuplicateStats:
+    patients: int = 0
+    comparisons: int = 0
+    pairs: int = 0
+
+
+def detect_duplicates(*, batch_size: int = 1000, min_score: float | None = None) -> DuplicateStats:
+    """Compare les patients non vérifiés à leur bloc et enregistre les paires probables."""
+    from .models import DoublonPotentiel, Patient
+
+    min_score = getattr(settings, "DUPLICATE_MIN_SCORE", 0.85) if min_score is None else min_score
+    stats = DuplicateStats()
+    # Lots triés par clé : chaque bloc n'est chargé qu'une fois, même s'il est gros.
+    ordering = ("cle_phonetique", "pk")
+    last = None
+    while True:
+        pending_qs = Patient.objects.filter(doublons_verifies=False)
+        if last is not None:
+            pending_qs = pending_qs.filter(keyset_filter(ordering, last))
+        pending = list(pending_qs.order_by(*ordering).values(*_FIELDS)[:batch_size])
+        if not pending:
+            return stats
+        last = (pending[-1]["cle_phonetique"], pending[-1]["pk"])
+
+        blocks: dict[str, list[dict[str, Any]]] = {}
+        keys = {p["cle_phonetique"] for p in pending if p["cle_phonetique"]}
+        for row in Patient.objects.filter(cle_phonetique__in=keys).order_by().values(*_FIELDS).iterator(chunk_size=2000):
+            blocks.setdefault(row["cle_phonetique"], []).append(_prepare(row))
+
+        seen: set[tuple[int, int]] = set()
+        pairs: dict[tuple[int, int], float] = {}
+        for patient in map(_prepare, pending):
+            for other in blocks.get(patient["cle_phonetique"], ()):
+                pair = (min(patient["pk"], other["pk"]), max(patient["pk"], other["pk"]))
+                if other["pk"] == patient["pk"] or pair in seen:
+                    continue
+                seen.add(pair)
+                stats.comparisons += 1
+                score = similarity(patient, other, min_score)
+                if score >= min_score:
+                    pairs[pair] = score
+
+        with transaction.atomic():
+            DoublonPotentiel.objects.bulk_create(
+                [DoublonPotentiel(patient_a_id=a, patient_b_id=b, score=round(s, 3)) for (a, b), s in pairs.items()],
+                batch_size=500,
+                ignore_conflicts=True,
+            )
+            Patient.objects.filter(pk__in=[p["pk"] for p in pending]).update(doublons_verifies=True)
+        stats.patients += len(pending)
+        stats.pairs += len(pairs)
@@ -0,0 +1,244 @@
+"""Export JSON des dossiers patients (portabilité RGPD, transmission de données).
+
+``iter_patient_json`` produit le document d'un patient en flux : chaque
+rubrique est lue par paquets (``iterator``) et écrite au fur et à mesure,
+sans construire le dictionnaire complet en mémoire.
+
+Pour l'export groupé, ``iter_patient_documents`` parcourt les patients par
+paquets de clés (``EXPORT_CHUNK_SIZE``) et charge les rubriques de tout le
+paquet par ``Prefetch`` : une requête par rubrique et par paquet, quel que
+soit le nombre de patients. ``iter_ndjson`` (un document par ligne) et
+``iter_zip`` (un fichier JSON par patient, archive écrite en flux) s'appuient
+dessus.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from typing import Any, Iterable, Iterator
+
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+from django.utils import timezone
+
+from community.models import DossierCommunautaire, SuiviCommunautaire
+from .models import Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
+
+
+def _default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+
+def dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_default)
+
+
+def patient_dict(p: Patient) -> dict[str, Any]:
+    return {
+        "id": p.id,
+        "code_patient": p.code_patient,
+        "nom": p.nom,
+        "prenoms": p.prenoms,
+        "date_naissance": p.date_naissance,
+        "sexe": p.sexe,
+        "telephone": p.telephone,
+        "adresse": p.adresse,
+        "zone": p.zone,
+        "antecedents": p.antecedents,
+        "created_at": p.created_at,
+        "updated_at": p.updated_at,
+    }
+
+
+def cpn_dict(s: SuiviCPN) -> dict[str, Any]:
+    return {"id": s.id, "numero": s.numero, "date": s.date, "notes": s.notes, "created_at": s.created_at}
+
+
+def rdv_dict(r: RendezVous) -> dict[str, Any]:
+    return {"id": r.id, "date_heure": r.date_heure, "objet": r.objet, "statut": r.statut, "created_at": r.created_at}
+
+
+def consultation_dict(c: Consultation) -> dict[str, Any]:
+    return {
+        "id": c.id,
+        "date_consultation": c.date_consultation,
+        "motif": c.motif,
+        "observation": c.observation,
+        "created_at": c.created_at,
+    }
+
+
+def ordonnance_dict(o: Ordonnance) -> dict[str, Any]:
+    return {
+        "id": o.id,
+        "date": o.date,
+        "diagnostic": o.diagnostic,
+        "instructions": o.instructions,
+        "created_at": o.created_at,
+        "lignes": [
+            {
+                "id": l.id,
+                "medicament": l.medicament,
+                "posologie": l.posologie,
+                "duree": l.duree,
+                "commentaire": l.commentaire,
+            }
+            for l in o.lignes.all()
+        ],
+    }
+
+
+def dossier_dict(d: DossierCommunautaire) -> dict[str, Any]:
+    return {
+        "id": d.id,
+        "pathologie": {"id": d.pathologie_id, "code": d.pathologie.code, "nom": d.pathologie.nom},
+        "date_diagnostic": d.date_diagnostic,
+        "statut": d.statut,
+        "notes": d.notes,
+        "created_at": d.created_at,
+        "suivis": [
+            {
+                "id": s.id,
+                "date": s.date,
+                "traitement": s.traitement,
+                "observation": s.observation,
+                "created_at": s.created_at,
+            }
+            for s in d.suivis.all()
+        ],
+    }
+
+
+def _lignes() -> Prefetch:
+    return Prefetch("lignes", queryset=LigneOrdonnance.objects.order_by("id"))
+
+
+def _suivis() -> Prefetch:
+    return Prefetch("suivis", queryset=SuiviCommunautaire.objects.order_by("-date", "-id"))
+
+
+# Rubriques du document : (clé JSON, relation, requête ordonnée, sérialisation)
+SECTIONS = [
+    ("cpn", "suivis_cpn", lambda: SuiviCPN.objects.order_by("numero"), cpn_dict),
+    ("rendez_vous", "rendez_vous", lambda: RendezVous.objects.order_by("-date_heure", "-id"), rdv_dict),
+    (
+        "consultations",
+        "consultations",
+        lambda: Consultation.objects.order_by("-date_consultation", "-id"),
+        consultation_dict,
+    ),
+    (
+        "ordonnances",
+        "ordonnances",
+        lambda: Ordonnance.objects.prefetch_related(_lignes()).order_by("-date", "-id"),
+        ordonnance_dict,
+    ),
+    (
+        "community",
+        "dossiers_communautaires",
+        lambda: DossierCommunautaire.objects.select_related("pathologie")
+        .prefetch_related(_suivis())
+        .order_by("-date_diagnostic", "-id"),
+        dossier_dict,
+    ),
+]
+
+
+def _chunk_size() -> int:
+    return int(getattr(settings, "EXPORT_CHUNK_SIZE", 2000))
+
+
+def export_meta(exported_by: str | None, fmt: str) -> dict[str, Any]:
+    return {"exported_at": timezone.now(), "exported_by": exported_by, "format": fmt}
+
+
+def iter_patient_json(patient: Patient, *, exported_by: str | None = None) -> Iterator[str]:
+    """Document JSON d'un patient, rubrique par rubrique (mêmes clés que l'export historique)."""
+    yield '{"patient": ' + dumps(patient_dict(patient))
+    for key, _relation, queryset, serialize in SECTIONS:
+        yield f', "{key}": ['
+        rows = queryset().filter(patient=patient).iterator(chunk_size=500)
+        for i, obj in enumerate(rows):
+            yield ("" if i == 0 else ", ") + dumps(serialize(obj))
+        yield "]"
+    yield ', "export": ' + dumps(export_meta(exported_by, "json")) + "}"
+
+
+def _document(patient: Patient, meta: dict[str, Any]) -> dict[str, Any]:
+    doc = {"patient": patient_dict(patient)}
+    for key, relation, _queryset, serialize in SECTIONS:
+        doc[key] = [serialize(obj) for obj in getattr(patient, relation).all()]
+    doc["export"] = meta
+    return doc
+
+
+def iter_patient_documents(
+    patients: QuerySet | None = None,
+    *,
+    exported_by: str | None = None,
+    fmt: str = "ndjson",
+    chunk_size: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Documents des patients de ``patients`` (tous par défaut), dans l'ordre des ids."""
+    chunk_size = chunk_size or _chunk_size()
+    base = (Patient.objects.all() if patients is None else patients).order_by("pk")
+    prefetches = [Prefetch(relation, queryset=queryset()) for _key, relation, queryset, _serialize in SECTIONS]
+    meta = export_meta(exported_by, fmt)
+    last = None
+    while True:
+        qs = base.filter(pk__gt=last) if last is not None else base
+        chunk = list(qs.prefetch_related(*prefetches)[:chunk_size])
+        for patient in chunk:
+            yield _document(patient, meta)
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1].pk
+
+
+def iter_ndjson(patients: QuerySet | None = None, **kwargs) -> Iterator[bytes]:
+    for doc in iter_patient_documents(patients, fmt="ndjson", **kwargs):
+        yield (dumps(doc) + "\n").encode("utf-8")
+
+
+class _Sink(io.RawIOBase):
+    """Flux en écriture seule : ``zipfile`` y écrit, ``iter_zip`` en vide le contenu au fil de l'eau."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        return len(data)
+
+    def take(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def iter_zip(patients: QuerySet | None = None, **kwargs) -> Iterator[bytes]:
+    """Archive zip (un ``patient_<code>.json`` par patient) produite en flux."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for doc in iter_patient_documents(patients, fmt="zip", **kwargs):
+            name = doc["patient"]["code_patient"].replace("/", "_")
+            archive.writestr(f"patient_{name}.json", dumps(doc))
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    yield sink.take()
+
+
+def write_stream(chunks: Iterable[bytes], fh) -> int:
+    written = 0
+    for chunk in chunks:
+        fh.write(chunk)
+        written += len(chunk)
+    return written
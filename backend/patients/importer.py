@@ -0,0 +1,472 @@
+"""Import de patients depuis Excel par lots (lecture en flux, écritures groupées).
+
+Les lignes sont lues en flux (``core.xlsx_reader``) et traitées par paquets de
+``chunk_size`` : une requête ``IN`` récupère les ``code_patient`` déjà en base,
+puis ``bulk_create`` écrit les nouveaux patients et un upsert groupé
+(``bulk_create(update_conflicts=True)``) les mises à jour. Chaque paquet est
+protégé par un point de sauvegarde ; si l'écriture groupée est rejetée
+(contrainte, donnée invalide), le paquet est rejoué ligne par ligne pour
+identifier les lignes fautives. Les erreurs de base transitoires (verrou,
+deadlock) ne sont pas imputées aux lignes : elles interrompent le paquet.
+
+Les erreurs sont remontées avec leur numéro de ligne Excel.
+
+Mode parallèle (``--workers``) : le fichier est lu une seule fois et découpé en
+plages de lignes fixes, importées chacune par un processus du pool dans sa
+propre transaction ; les plages validées sont notées dans un point de reprise
+(``ImportCheckpoint``) pour relancer un import interrompu sans doublon.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from django.db import DataError, IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.xlsx_reader import XlsxReader
+
+from .duplicates import apply_blocking_key
+from .listing import invalidate_zone_counts
+from .models import Patient
+from .search import reindex_patients
+from .utils import invalidate_patient_pdfs
+
+# Champs Patient -> en-têtes normalisés acceptés
+DEFAULT_HEADERS = {
+    "code_patient": ["code_patient", "code", "codepat", "id", "identifiant"],
+    "nom": ["nom", "name"],
+    "prenoms": ["prenoms", "prenom", "prenoms", "firstname"],
+    "telephone": ["telephone", "tel", "phone", "mobile"],
+    "adresse": ["adresse", "address"],
+    "zone": ["zone", "localite", "commune"],
+    "sexe": ["sexe", "genre", "sex"],
+    "date_naissance": ["date_naissance", "datenaissance", "dob", "naissance"],
+    "antecedents": ["antecedents", "antecedant", "antecedentsmedicaux"],
+}
+REQUIRED = ["nom", "prenoms"]
+# Champs toujours écrits ; sexe/zone/date_naissance seulement si renseignés
+_ALWAYS = ["nom", "prenoms", "telephone", "adresse", "antecedents"]
+_OPTIONAL = ["sexe", "zone", "date_naissance"]
+# Seule contrainte non garantie par le parsing (sexe/zone/date sont normalisés)
+_MAX_LENGTHS = {f.name: f.max_length for f in Patient._meta.get_fields() if getattr(f, "max_length", None)}
+
+
+def _norm(s: str) -> str:
+    # Sans accents : « Prénoms » -> prenoms
+    s = unicodedata.normalize("NFKD", (s or "").strip().lower()).encode("ascii", "ignore").decode("ascii")
+    s = re.sub(r"\s+", "_", s)
+    s = re.sub(r"[^a-z0-9_]+", "", s)
+    return s
+
+
+def _to_str(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, str):
+        return v.strip()
+    return str(v).strip()
+
+
+def _to_date(v):
+    if v is None or v == "":
+        return None
+    if isinstance(v, datetime):
+        return v.date()
+    if hasattr(v, "isoformat") and not isinstance(v, str):
+        return v
+    s = _to_str(v)
+    d = parse_date(s)
+    if d is None:
+        raise ValueError(f"date_naissance: date invalide « {s} »")
+    return d
+
+
+def _map_sexe(v: str | None):
+    s = _norm(_to_str(v))
+    if s in ("f", "femme"):
+        return "F"
+    if s in ("m", "homme"):
+        return "M"
+    return None
+
+
+def _map_zone(v: str | None):
+    s = _norm(_to_str(v))
+    if s in ("grandbassam", "grand_bassam", "bassam"):
+        return "GRAND_BASSAM"
+    if s in ("bonoua",):
+        return "BONOUA"
+    return None
+
+
+def build_code_patient(nom: str, prenoms: str, row_num: int) -> str:
+    base = _norm(nom)[:6] + _norm(prenoms)[:6]
+    base = (base or "patient")[:12]
+    return f"{base}_{row_num}"
+
+
+def resolve_columns(header: Iterable[Any], overrides: dict[str, str] | None = None) -> dict[str, int]:
+    """Index de colonne de chaque champ Patient ; lève ``ValueError`` si un champ obligatoire manque.
+
+    ``overrides`` : champ -> en-tête Excel (options ``--map``).
+    """
+    overrides = {_norm(k): _norm(v) for k, v in (overrides or {}).items()}
+    header_index = {}
+    for idx, h in enumerate(header or ()):
+        h = _norm(_to_str(h))
+        if h and h not in header_index:
+            header_index[h] = idx
+
+    field_to_col: dict[str, int] = {}
+    for name, candidates in DEFAULT_HEADERS.items():
+        if name in overrides:
+            if overrides[name] in header_index:
+                field_to_col[name] = header_index[overrides[name]]
+            continue
+        for cand in candidates:
+            if cand in header_index:
+                field_to_col[name] = header_index[cand]
+                break
+
+    missing = [f for f in REQUIRED if f not in field_to_col]
+    if missing:
+        raise ValueError("Colonnes obligatoires introuvables: " + ", ".join(missing))
+    return field_to_col
+
+
+@dataclass
+class RowError:
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"Ligne {self.line}: {self.message}"
+
+
+@dataclass
+class ImportStats:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    errors: list[RowError] = field(default_factory=list)
+
+    def merge(self, other: "ImportStats") -> None:
+        self.created += other.created
+        self.updated += other.updated
+        self.skipped += other.skipped
+        self.errors.extend(other.errors)
+
+
+class PatientImporter:
+    def __init__(
+        self,
+        field_to_col: dict[str, int],
+        *,
+        update_existing: bool = False,
+        dry_run: bool = False,
+        chunk_size: int = 1000,
+    ):
+        self.field_to_col = field_to_col
+        self.update_existing = update_existing
+        self.dry_run = dry_run
+        self.chunk_size = max(1, chunk_size)
+        # En dry-run rien n'est écrit : on mémorise les codes « créés » pour les doublons entre paquets.
+        self._dry_run_codes: set[str] = set()
+
+    def _cell(self, name: str, row: tuple):
+        idx = self.field_to_col.get(name)
+        if idx is None or idx >= len(row):
+            return None
+        return row[idx]
+
+    def parse_row(self, line: int, row: tuple) -> dict[str, Any] | None:
+        """Valeurs Patient d'une ligne ; ``None`` si la ligne est à ignorer, ``ValueError`` si invalide."""
+        nom = _to_str(self._cell("nom", row))
+        prenoms = _to_str(self._cell("prenoms", row))
+        if not nom or not prenoms:
+            return None
+
+        values: dict[str, Any] = {
+            "code_patient": _to_str(self._cell("code_patient", row)) or build_code_patient(nom, prenoms, line),
+            "nom": nom,
+            "prenoms": prenoms,
+            "telephone": _to_str(self._cell("telephone", row)),
+            "adresse": _to_str(self._cell("adresse", row)),
+            "antecedents": _to_str(self._cell("antecedents", row)),
+        }
+        sexe = _map_sexe(self._cell("sexe", row))
+        zone = _map_zone(self._cell("zone", row))
+        date_naissance = _to_date(self._cell("date_naissance", row))
+        if sexe is not None:
+            values["sexe"] = sexe
+        if zone is not None:
+            values["zone"] = zone
+        if date_naissance is not None:
+            values["date_naissance"] = date_naissance
+
+        for name, max_length in _MAX_LENGTHS.items():
+            if name in values and len(values[name]) > max_length:
+                raise ValueError(f"{name}: {len(values[name])} caractères (maximum {max_length})")
+        return values
+
+    def run(self, rows: Iterable[tuple[int, tuple]]) -> ImportStats:
+        """Importe des ``(numéro de ligne, valeurs)`` ; renvoie les compteurs et erreurs."""
+        stats = ImportStats()
+        for chunk in _chunks(rows, self.chunk_size):
+            stats.merge(self.import_chunk(chunk))
+        return stats
+
+    def import_chunk(self, chunk: list[tuple[int, tuple]]) -> ImportStats:
+        stats = ImportStats()
+        parsed: list[tuple[int, dict[str, Any]]] = []
+        for line, row in chunk:
+            try:
+                values = self.parse_row(line, row)
+            except ValueError as exc:
+                stats.errors.append(RowError(line, str(exc)))
+                continue
+            if values is None:
+                stats.skipped += 1
+            else:
+                parsed.append((line, values))
+        if not parsed:
+            return stats
+
+        codes = {values["code_patient"] for _line, values in parsed}
+        existing_qs = Patient.objects.filter(code_patient__in=codes)
+        if not self.update_existing:
+            existing_qs = existing_qs.only("id", "code_patient")
+        existing = {p.code_patient: p for p in existing_qs}
+        if self.dry_run:
+            existing.update({c: Patient(code_patient=c) for c in codes & self._dry_run_codes})
+
+        to_create: dict[str, tuple[int, Patient]] = {}
+        to_update: dict[str, tuple[int, Patient]] = {}
+        update_fields: set[str] = set(_ALWAYS)
+        for line, values in parsed:
+            code = values["code_patient"]
+            if code in existing or code in to_create:
+                if not self.update_existing:
+                    stats.skipped += 1
+                    continue
+                if code in to_create:
+                    # Doublon dans le même paquet : la dernière ligne l'emporte.
+                    _first_line, patient = to_create[code]
+                    for k, v in values.items():
+                        setattr(patient, k, v)
+                else:
+                    patient = existing[code]
+                    for k, v in values.items():
+                        setattr(patient, k, v)
+                    update_fields.update(k for k in _OPTIONAL if k in values)
+                    if code not in to_update:
+                        stats.updated += 1
+                    to_update[code] = (line, patient)
+                continue
+            to_create[code] = (line, Patient(**values))
+            stats.created += 1
+
+        if self.dry_run:
+            self._dry_run_codes.update(to_create)
+            return stats
+
+        now = timezone.now()
+        for _line, patient in to_update.values():
+            patient.updated_at = now
+        # Écritures groupées sans signal : clé de doublons calculée ici.
+        for _line, patient in [*to_create.values(), *to_update.values()]:
+            apply_blocking_key(patient)
+        fields = sorted(update_fields) + ["updated_at", "cle_phonetique", "doublons_verifies"]
+        try:
+            with transaction.atomic():
+                Patient.objects.bulk_create([p for _l, p in to_create.values()], batch_size=500)
+                if to_update:
+                    # bulk_update (un CASE WHEN par champ) est très lent sur de gros lots : on passe
+                    # par un upsert (INSERT ... ON DUPLICATE KEY UPDATE) sur code_patient.
+                    Patient.objects.bulk_create(
+                        [_upsert_copy(p, fields) for _l, p in to_update.values()],
+                        batch_size=500,
+                        update_conflicts=True,
+                        # MySQL n'accepte pas de cible : ON DUPLICATE KEY porte sur toute clé unique.
+                        unique_fields=["code_patient"] if connection.features.supports_update_conflicts_with_target else None,
+                        update_fields=fields,
+                    )
+                # Index de recherche et PDF en cache mis à jour ici pour la même raison.
+                reindex_patients(
+                    Patient.objects.filter(code_patient__in=[*to_create, *to_update]).values_list("pk", flat=True)
+                )
+                if to_update:
+                    invalidate_patient_pdfs(
+                        Patient.objects.filter(code_patient__in=list(to_update)).values_list("pk", flat=True)
+                    )
+                invalidate_zone_counts()
+        except (IntegrityError, DataError):
+            return self._import_one_by_one(stats, to_create, to_update, fields)
+        return stats
+
+    def _import_one_by_one(self, stats, to_create, to_update, fields) -> ImportStats:
+        """Rejoue un paquet ligne par ligne pour isoler les lignes rejetées par la base."""
+        stats.created = stats.updated = 0
+        for line, patient in to_create.values():
+            patient.pk = None
+            try:
+                with transaction.atomic():
+                    patient.save(force_insert=True)
+                stats.created += 1
+            except (IntegrityError, DataError) as exc:
+                stats.errors.append(RowError(line, f"rejetée par la base: {exc}"))
+        for line, patient in to_update.values():
+            try:
+                with transaction.atomic():
+                    patient.save(update_fields=fields)
+                stats.updated += 1
+            except (IntegrityError, DataError) as exc:
+                stats.errors.append(RowError(line, f"rejetée par la base: {exc}"))
+        return stats
+
+
+def _upsert_copy(patient: Patient, fields: list[str]) -> Patient:
+    """Copie sans pk : le conflit doit porter sur ``code_patient``, pas sur l'id."""
+    copy = Patient(code_patient=patient.code_patient)
+    for name in fields:
+        setattr(copy, name, getattr(patient, name))
+    return copy
+
+
+def _chunks(rows: Iterable[tuple[int, tuple]], size: int) -> Iterator[list[tuple[int, tuple]]]:
+    chunk: list[tuple[int, tuple]] = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_data_rows(reader: XlsxReader, min_row: int = 2, max_row: int | None = None) -> Iterator[tuple[int, tuple]]:
+    """``(numéro de ligne Excel, valeurs)`` des lignes de données, sans les lignes vides."""
+    for line, row in reader.iter_rows(min_row=min_row, max_row=max_row):
+        if any(v not in (None, "") for v in row):
+            yield line, row
+
+
+RANGE_ATTEMPTS = 3
+
+
+def import_range(
+    field_to_col: dict[str, int],
+    rows: list[tuple[int, tuple]],
+    *,
+    update_existing: bool = False,
+    chunk_size: int = 1000,
+) -> ImportStats:
+    """Importe une plage de lignes dans sa propre transaction (utilisé par ``--workers``)."""
+    attempt = 1
+    while True:
+        importer = PatientImporter(field_to_col, update_existing=update_existing, chunk_size=chunk_size)
+        try:
+            with transaction.atomic():
+                return importer.run(rows)
+        except OperationalError:
+            # Verrou ou deadlock avec une autre plage : la transaction est rejouée en entier.
+            if attempt >= RANGE_ATTEMPTS:
+                raise
+            time.sleep(attempt)
+            attempt += 1
+
+
+def init_worker() -> None:
+    """Initialisation d'un processus d'import.
+
+    Avec ``fork`` (défaut sous Linux), Django est déjà chargé dans le processus ;
+    avec ``spawn`` (macOS, Windows), il faut l'initialiser. Le parent ferme ses
+    connexions avant de créer le pool : chaque processus ouvre la sienne.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+class ImportCheckpoint:
+    """Plages de lignes déjà validées en base, pour reprendre un import interrompu (``--resume``)."""
+
+    def __init__(self, path: Path, fingerprint: dict[str, Any]):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.done: set[tuple[int, int]] = set()
+        self.stats = ImportStats()
+
+    @classmethod
+    def for_file(cls, excel_path: str, *, sheet: str | None, range_size: int, update_existing: bool) -> "ImportCheckpoint":
+        st = os.stat(excel_path)
+        fingerprint = {
+            "file": os.path.abspath(excel_path),
+            "size": st.st_size,
+            "mtime": int(st.st_mtime),
+            "sheet": sheet,
+            "range_size": range_size,
+            "update_existing": update_existing,
+        }
+        return cls(Path(f"{excel_path}.import-checkpoint.json"), fingerprint)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> None:
+        """Charge l'état ; lève ``ValueError`` si le point de reprise concerne un autre fichier ou d'autres options."""
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("fingerprint") != self.fingerprint:
+            raise ValueError("le point de reprise ne correspond pas à ce fichier ou à ces options")
+        self.done = {tuple(r) for r in data.get("done", [])}
+        s = data.get("stats", {})
+        self.stats = ImportStats(created=s.get("created", 0), updated=s.get("updated", 0), skipped=s.get("skipped", 0))
+        self.stats.errors = [RowError(line, msg) for line, msg in s.get("errors", [])]
+
+    def mark_done(self, line_range: tuple[int, int], stats: ImportStats) -> None:
+        self.done.add(line_range)
+        self.stats.merge(stats)
+        payload = {
+            "fingerprint": self.fingerprint,
+            "done": sorted(self.done),
+            "stats": {
+                "created": self.stats.created,
+                "updated": self.stats.updated,
+                "skipped": self.stats.skipped,
+                "errors": [[e.line, e.message] for e in self.stats.errors],
+            },
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def delete(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def iter_ranges(rows: Iterable[tuple[int, tuple]], range_size: int) -> Iterator[tuple[tuple[int, int], list[tuple[int, tuple]]]]:
+    """Regroupe les lignes par plages fixes ``[2, 1+n]``, ``[2+n, 1+2n]``… (bornes stables d'une exécution à l'autre)."""
+    current: tuple[int, int] | None = None
+    batch: list[tuple[int, tuple]] = []
+    for line, row in rows:
+        start = 2 + ((line - 2) // range_size) * range_size
+        line_range = (start, start + range_size - 1)
+        if line_range != current:
+            if batch:
+                yield current, batch
+            current, batch = line_range, []
+        batch.append((line, row))
+    if batch:
+        yield current, batch
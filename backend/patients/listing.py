@@ -0,0 +1,64 @@
+"""Liste des patients : pages par curseur et compteurs par zone en cache.
+
+La liste est parcourue par clé (``nom, prenoms, id``, précédé du rang de
+pertinence pour une recherche) via ``core.keyset`` : chaque page est une
+requête ``LIMIT`` servie par les index ``zone/sexe/nom/prenoms``, quelle que
+soit sa position. Le curseur encode les valeurs de tri de la dernière ligne.
+
+Les compteurs par zone sont une seule requête groupée, gardée en cache
+(``PATIENT_KPI_CACHE_SECONDS``) et invalidée après le commit de toute création,
+modification de zone ou suppression de patient. Le cache par défaut est propre
+au processus : avec plusieurs workers, un cache partagé (``CACHE_BACKEND``)
+propage l'invalidation, sinon la durée du cache borne l'écart.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, QuerySet
+
+from core.keyset import decode_cursor, encode_cursor, keyset_filter, ordering_fields
+
+from .models import Patient
+
+ORDERING = ("nom", "prenoms", "id")
+SEARCH_ORDERING = ("-search_rank", *ORDERING)
+ZONE_COUNTS_KEY = "patients:zone_counts"
+
+
+def patient_page(qs: QuerySet, *, cursor: str | None = None, page_size: int = 50, ranked: bool = False) -> dict[str, Any]:
+    """Page de patients après ``cursor`` ; ``next_cursor`` vaut ``None`` sur la dernière page.
+
+    Un curseur illisible (ou aux valeurs mal typées) ramène à la première page.
+    """
+    ordering = SEARCH_ORDERING if ranked else ORDERING
+    names = [f.lstrip("-") for f in ordering]
+    after = decode_cursor(cursor, len(ordering), fields=ordering_fields(qs, ordering))
+    if after:
+        qs = qs.filter(keyset_filter(ordering, after))
+    patients = list(qs.order_by(*ordering)[: page_size + 1])
+    has_more = len(patients) > page_size
+    patients = patients[:page_size]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor([getattr(patients[-1], n) for n in names])
+    return {"patients": patients, "next_cursor": next_cursor}
+
+
+def zone_counts() -> dict[str, int]:
+    """Nombre de patients par zone (toutes les zones déclarées, même vides)."""
+    counts = cache.get(ZONE_COUNTS_KEY)
+    if counts is None:
+        counts = {zone: 0 for zone, _label in Patient._meta.get_field("zone").choices}
+        for row in Patient.objects.order_by().values("zone").annotate(n=Count("id")):
+            counts[row["zone"]] = row["n"]
+        cache.set(ZONE_COUNTS_KEY, counts, getattr(settings, "PATIENT_KPI_CACHE_SECONDS", 300))
+    return counts
+
+
+def invalidate_zone_counts() -> None:
+    transaction.on_commit(lambda: cache.delete(ZONE_COUNTS_KEY))
@@ -4,11 +4,11 @@ from datetime import timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db.models import Q
-from django.contrib.auth import get_user_model
 
+from patients.access_tracking import flush_pending_accesses
+from patients.anonymization import anonymize_patients, anonymized_q
 from patients.models import Patient
 
-User = get_user_model()
 
 class Command(BaseCommand):
     help = "Anonymise les patients inactifs depuis une certaine période (RGPD - Droit à l'oubli)."
@@ -25,6 +25,17 @@ class Command(BaseCommand):
             action="store_true",
             help="Affiche les patients à anonymiser sans effectuer l'action",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Patients anonymisés par transaction (défaut: ANONYMIZATION_CHUNK_SIZE)",
+        )
+        parser.add_argument(
+            "--no-wait",
+            action="store_true",
+            help="N'attend pas l'intervalle de flush des autres processus (workers web).",
+        )
 
     def handle(self, *args, **options):
         years = options["years"]
@@ -35,7 +46,12 @@ class Command(BaseCommand):
         patients = Patient.objects.filter(
             Q(date_dernier_acces__lt=cutoff_date) | 
             Q(date_dernier_acces__isnull=True, updated_at__lt=cutoff_date)
-        ).exclude(nom__startswith="ANONYME") # Éviter de ré-anonymiser
+        ).exclude(anonymized_q()) # Éviter de ré-anonymiser
+
+        # Les dates de dernier accès doivent être à jour avant de filtrer. L'attente des
+        # autres workers n'est utile qu'avant une écriture (pas en dry-run, ni sans candidat).
+        wait = not (options["no_wait"] or dry_run) and patients.exists()
+        flush_pending_accesses(wait=wait)
 
         count = patients.count()
 
@@ -46,36 +62,17 @@ class Command(BaseCommand):
         self.stdout.write(f"Patients inactifs trouvés (> {years} ans): {count}")
 
         if dry_run:
-            for p in patients:
-                self.stdout.write(f" - [Dry-Run] {p.nom} {p.prenoms} (Dernier accès: {p.date_dernier_acces or p.updated_at})")
+            rows = patients.order_by("pk").values_list("nom", "prenoms", "date_dernier_acces", "updated_at")
+            for nom, prenoms, dernier_acces, updated_at in rows.iterator(chunk_size=2000):
+                self.stdout.write(f" - [Dry-Run] {nom} {prenoms} (Dernier accès: {dernier_acces or updated_at})")
             return
 
-        anonymized_count = 0
-        for p in patients:
-            try:
-                original_name = f"{p.nom} {p.prenoms}"
-                
-                # Anonymisation Patient
-                p.nom = f"ANONYME_{p.id}"
-                p.prenoms = "Inconnu"
-                p.telephone = ""
-                p.adresse = ""
-                p.antecedents = "DONNÉES ANONYMISÉES"
-                p.save()
-
-                # Désactivation User lié
-                if p.user:
-                    u = p.user
-                    u.is_active = False
-                    u.username = f"anonyme_{p.id}_{u.id}" # Pour éviter contrainte unique
-                    u.email = ""
-                    u.first_name = "ANONYME"
-                    u.last_name = ""
-                    u.save()
-
-                anonymized_count += 1
-                self.stdout.write(f"Anonymisé: {original_name} -> {p.nom}")
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f"Erreur anonymisation patient {p.id}: {e}"))
+        anonymized_count = anonymize_patients(
+            patients,
+            audit={"user_agent": "anonymize_patients"},
+            extra={"source": "anonymize_patients", "cutoff": cutoff_date.isoformat()},
+            chunk_size=options["chunk_size"],
+            progress=lambda done: self.stdout.write(f"Anonymisés: {done}/{count}"),
+        )
 
         self.stdout.write(self.style.SUCCESS(f"Terminé. {anonymized_count} patients anonymisés."))
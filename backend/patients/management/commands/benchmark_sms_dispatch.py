@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from patients.sms_dispatch import SmsDispatcher, SmsJob
+from patients.sms_provider import FakeSmsProvider
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit du dispatcher SMS avec un provider factice (aucun envoi, aucune écriture en base)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10000, help="Nombre de rappels simulés (défaut: 10000).")
+        parser.add_argument("--latency", type=float, default=0.2, help="Latence simulée par SMS en secondes (défaut: 0.2).")
+        parser.add_argument("--concurrency", type=int, default=50, help="Envois simultanés (défaut: 50).")
+        parser.add_argument("--rate", type=float, default=0, help="SMS par seconde, 0 = illimité (défaut: 0).")
+        parser.add_argument("--failure-rate", type=float, default=0.0, help="Proportion d'échecs temporaires simulés.")
+        parser.add_argument("--backoff", type=float, default=0.5, help="Délai initial avant nouvel essai (défaut: 0.5).")
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        provider = FakeSmsProvider(latency=options["latency"], failure_rate=options["failure_rate"], seed=42)
+        dispatcher = SmsDispatcher(
+            provider,
+            concurrency=options["concurrency"],
+            rate=options["rate"],
+            backoff=options["backoff"],
+        )
+        jobs = (SmsJob(rendez_vous_id=i, phone=f"+2290100{i:06d}", message=f"Rappel ADJAHI #{i}") for i in range(count))
+
+        started = time.perf_counter()
+        stats = dispatcher.dispatch(jobs, log=False)
+        elapsed = time.perf_counter() - started
+
+        serial = count * options["latency"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats.total} SMS en {elapsed:.1f}s ({stats.total / max(elapsed, 1e-9):.0f}/s) | "
+                f"succès: {stats.success} | échecs: {stats.failed} | nouvelles tentatives: {stats.retries} | "
+                f"envoi séquentiel estimé: {serial:.0f}s"
+            )
+        )
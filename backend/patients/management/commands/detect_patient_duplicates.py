@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from patients.duplicates import detect_duplicates
+from patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = (
+        "Détecte les doublons probables parmi les patients nouveaux ou modifiés "
+        "(blocage par clé phonétique, année de naissance et zone)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Patients traités par lot (défaut: 1000).",
+        )
+        parser.add_argument(
+            "--min-score",
+            type=float,
+            default=None,
+            help="Score minimal d'une paire, entre 0 et 1 (défaut: DUPLICATE_MIN_SCORE).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Revérifie tous les patients (après un changement de seuil ou de règles).",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            Patient.objects.filter(doublons_verifies=True).update(doublons_verifies=False)
+        stats = detect_duplicates(batch_size=max(1, options["batch_size"]), min_score=options["min_score"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Patients vérifiés: {stats.patients} | comparaisons: {stats.comparisons}"
+                f" | doublons potentiels: {stats.pairs}"
+            )
+        )
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients.export import iter_ndjson, iter_zip, write_stream
+from patients.models import Patient
+
+
+class Command(BaseCommand):
+    help = "Exporte les dossiers patients en NDJSON (un document par ligne) ou en archive zip."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=("ndjson", "zip"), default="ndjson")
+        parser.add_argument("--output", required=True, help="Fichier de sortie.")
+        parser.add_argument("--zone", default="", help="Limiter à une zone.")
+        parser.add_argument("--ids", default="", help="Identifiants séparés par des virgules.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Patients chargés par paquet (défaut: EXPORT_CHUNK_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        patients = Patient.objects.all()
+        if options["zone"]:
+            patients = patients.filter(zone=options["zone"])
+        if options["ids"]:
+            try:
+                ids = [int(x) for x in options["ids"].split(",") if x.strip()]
+            except ValueError as exc:
+                raise CommandError("--ids attend des entiers séparés par des virgules.") from exc
+            patients = patients.filter(pk__in=ids)
+
+        stream = iter_zip if options["format"] == "zip" else iter_ndjson
+        chunk_size = max(1, options["chunk_size"]) if options["chunk_size"] else None
+        with open(options["output"], "wb") as fh:
+            written = write_stream(stream(patients, exported_by="export_patients", chunk_size=chunk_size), fh)
+        self.stdout.write(
+            self.style.SUCCESS(f"Patients exportés: {patients.count()} | octets: {written} | fichier: {options['output']}")
+        )
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from patients.access_tracking import flush_pending_accesses
+
+
+class Command(BaseCommand):
+    help = "Force l'écriture des dates de dernier accès patients en attente."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-wait",
+            action="store_true",
+            help="N'attend pas l'intervalle de flush des autres processus (workers web).",
+        )
+
+    def handle(self, *args, **options):
+        flushed = flush_pending_accesses(wait=not options["no_wait"])
+        self.stdout.write(self.style.SUCCESS(f"Accès patients écrits: {flushed}"))
@@ -1,72 +1,37 @@
 from __future__ import annotations
 
-import re
-from dataclasses import dataclass
-from datetime import datetime
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
-from django.utils.dateparse import parse_date
+from django.db import connections, transaction
 
+from core.xlsx_reader import XlsxReader
+from patients.importer import (
+    ImportCheckpoint,
+    ImportStats,
+    PatientImporter,
+    import_range,
+    init_worker,
+    iter_data_rows,
+    iter_ranges,
+    resolve_columns,
+)
 
-def _norm(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = re.sub(r"\s+", "_", s)
-    s = re.sub(r"[^a-z0-9_]+", "", s)
-    return s
 
-
-def _to_str(v) -> str:
-    if v is None:
-        return ""
-    if isinstance(v, str):
-        return v.strip()
-    return str(v).strip()
-
-
-def _to_date(v):
-    if v is None or v == "":
-        return None
-    if hasattr(v, "date") and not isinstance(v, str):
-        try:
-            return v.date()
-        except Exception:
-            pass
-    if isinstance(v, datetime):
-        return v.date()
-    s = _to_str(v)
-    d = parse_date(s)
-    return d
-
-
-def _map_sexe(v: str | None):
-    s = _norm(_to_str(v))
-    if s in ("f", "femme"):
-        return "F"
-    if s in ("m", "homme"):
-        return "M"
-    return None
-
-
-def _map_zone(v: str | None):
-    s = _norm(_to_str(v))
-    if s in ("grandbassam", "grand_bassam", "bassam"):
-        return "GRAND_BASSAM"
-    if s in ("bonoua",):
-        return "BONOUA"
-    return None
-
-
-@dataclass
-class ImportStats:
-    created: int = 0
-    updated: int = 0
-    skipped: int = 0
-    errors: int = 0
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    # Les processus ne doivent pas hériter des connexions du parent : chacun ouvre la sienne.
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
 
 
 class Command(BaseCommand):
-    help = "Import patients depuis un fichier Excel (.xlsx)."
+    help = (
+        "Import patients depuis un fichier Excel (.xlsx), par lots. "
+        "Avec --workers, import par plages de lignes en parallèle, chacune validée séparément "
+        "et reprenable avec --resume."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("excel_path", help="Chemin vers le fichier Excel (.xlsx)")
@@ -83,148 +48,146 @@ class Command(BaseCommand):
             default=[],
             help="Mapping colonnes Excel -> champs. Ex: --map nom=Nom --map prenoms=Prenoms",
         )
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Lignes traitées par lot")
+        parser.add_argument("--max-errors", type=int, default=50, help="Nombre d'erreurs détaillées affichées")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Import par plages en N processus (une transaction par plage, point de reprise)",
+        )
+        parser.add_argument("--range-size", type=int, default=5000, help="Lignes par plage en mode --workers")
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Reprend un import par plages interrompu (ignore les plages déjà validées)",
+        )
 
     def handle(self, *args, **options):
-        try:
-            from openpyxl import load_workbook
-        except ModuleNotFoundError as exc:
-            raise CommandError("openpyxl manquant. Installe: pip install -r requirements.txt") from exc
-
-        from patients.models import Patient
-
-        excel_path = options["excel_path"]
-        sheet_name = options["sheet"]
-        dry_run = bool(options["dry_run"])
-        update_existing = bool(options["update_existing"])
-
-        # Mapping par défaut: clés = champs Patient, valeurs = header normalisé attendu
-        default_expected_headers = {
-            "code_patient": ["code_patient", "code", "codepat", "id", "identifiant"],
-            "nom": ["nom", "name"],
-            "prenoms": ["prenoms", "prenom", "prenoms", "firstname"],
-            "telephone": ["telephone", "tel", "phone", "mobile"],
-            "adresse": ["adresse", "address"],
-            "zone": ["zone", "localite", "commune"],
-            "sexe": ["sexe", "genre", "sex"],
-            "date_naissance": ["date_naissance", "datenaissance", "dob", "naissance"],
-            "antecedents": ["antecedents", "antecedant", "antecedentsmedicaux"],
-        }
-
         # Surcharges mapping via --map champ=ColonneExcel
         overrides: dict[str, str] = {}
         for item in options["map"]:
             if "=" not in item:
                 raise CommandError("Format attendu pour --map: champ=ColonneExcel")
             k, v = item.split("=", 1)
-            overrides[_norm(k)] = _norm(v)
-
-        wb = load_workbook(excel_path, data_only=True)
-        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
-
-        rows = list(ws.iter_rows(values_only=True))
-        if not rows:
-            raise CommandError("Fichier Excel vide.")
-
-        header_row = [
-            _norm(_to_str(h))
-            for h in (rows[0] or [])
-        ]
-
-        header_index = {h: idx for idx, h in enumerate(header_row) if h}
-
-        # Résout index de colonne pour chaque champ
-        field_to_col: dict[str, int] = {}
-        for field, candidates in default_expected_headers.items():
-            if field in overrides:
-                h = overrides[field]
-                if h in header_index:
-                    field_to_col[field] = header_index[h]
-                continue
-
-            for cand in candidates:
-                if cand in header_index:
-                    field_to_col[field] = header_index[cand]
-                    break
-
-        required = ["nom", "prenoms"]
-        missing_required = [f for f in required if f not in field_to_col]
-        if missing_required:
-            raise CommandError(
-                "Colonnes obligatoires introuvables: " + ", ".join(missing_required) +
-                ". Utilise --map pour préciser."
-            )
-
-        stats = ImportStats()
-
-        def cell(field: str, row: tuple):
-            idx = field_to_col.get(field)
-            if idx is None:
-                return None
-            if idx >= len(row):
-                return None
-            return row[idx]
-
-        def build_code_patient(nom: str, prenoms: str, row_num: int) -> str:
-            base = _norm(nom)[:6] + _norm(prenoms)[:6]
-            base = (base or "patient")[:12]
-            return f"{base}_{row_num}"
+            overrides[k] = v
 
-        # Import sous transaction. En mode dry-run, on force un rollback.
-        with transaction.atomic():
-            for i, row in enumerate(rows[1:], start=2):
-                try:
-                    nom = _to_str(cell("nom", row))
-                    prenoms = _to_str(cell("prenoms", row))
-                    if not nom or not prenoms:
-                        stats.skipped += 1
-                        continue
-
-                    code_patient = _to_str(cell("code_patient", row))
-                    if not code_patient:
-                        code_patient = build_code_patient(nom, prenoms, i)
-
-                    sexe = _map_sexe(cell("sexe", row))
-                    zone = _map_zone(cell("zone", row))
-                    date_naissance = _to_date(cell("date_naissance", row))
-
-                    defaults = {
-                        "nom": nom,
-                        "prenoms": prenoms,
-                        "telephone": _to_str(cell("telephone", row)),
-                        "adresse": _to_str(cell("adresse", row)),
-                        "antecedents": _to_str(cell("antecedents", row)),
-                    }
-                    if sexe is not None:
-                        defaults["sexe"] = sexe
-                    if zone is not None:
-                        defaults["zone"] = zone
-                    if date_naissance is not None:
-                        defaults["date_naissance"] = date_naissance
-
-                    existing = Patient.objects.filter(code_patient=code_patient).first()
-                    if existing:
-                        if not update_existing:
-                            stats.skipped += 1
-                            continue
-                        for k, v in defaults.items():
-                            setattr(existing, k, v)
-                        if not dry_run:
-                            existing.save()
-                        stats.updated += 1
-                        continue
-
-                    if not dry_run:
-                        Patient.objects.create(code_patient=code_patient, **defaults)
-                    stats.created += 1
-
-                except Exception:
-                    stats.errors += 1
-
-            if dry_run:
-                transaction.set_rollback(True)
+        ranged = options["workers"] is not None or options["resume"]
+        if ranged and options["dry_run"]:
+            raise CommandError("--dry-run n'est pas compatible avec --workers/--resume.")
+        if options["range_size"] < 1:
+            raise CommandError("--range-size doit être >= 1")
 
+        started = time.monotonic()
+        try:
+            reader = XlsxReader(options["excel_path"], options["sheet"])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as exc:
+            raise CommandError(f"Lecture du fichier Excel impossible: {exc}") from exc
+        with reader:
+            header = next(reader.iter_rows(max_row=1), (1, ()))[1]
+            if not header:
+                raise CommandError("Fichier Excel vide.")
+            try:
+                field_to_col = resolve_columns(header, overrides)
+            except ValueError as exc:
+                raise CommandError(f"{exc}. Utilise --map pour préciser.") from exc
+
+            if ranged:
+                stats = self._import_ranges(reader, field_to_col, options)
+            else:
+                importer = PatientImporter(
+                    field_to_col,
+                    update_existing=bool(options["update_existing"]),
+                    dry_run=bool(options["dry_run"]),
+                    chunk_size=options["chunk_size"],
+                )
+                # Tout ou rien, comme avant : chaque lot est un point de sauvegarde dans la transaction.
+                with transaction.atomic():
+                    stats = importer.run(iter_data_rows(reader))
+
+        max_errors = max(0, options["max_errors"])
+        for error in sorted(stats.errors, key=lambda e: e.line)[:max_errors]:
+            self.stderr.write(str(error))
+        if len(stats.errors) > max_errors:
+            self.stderr.write(f"... {len(stats.errors) - max_errors} autre(s) erreur(s)")
+
+        elapsed = time.monotonic() - started
         self.stdout.write(
             self.style.SUCCESS(
-                f"Import terminé. created={stats.created} updated={stats.updated} skipped={stats.skipped} errors={stats.errors}"
+                f"Import terminé en {elapsed:.1f}s. created={stats.created} updated={stats.updated} "
+                f"skipped={stats.skipped} errors={len(stats.errors)}"
             )
         )
+
+    def _import_ranges(self, reader: XlsxReader, field_to_col: dict[str, int], options) -> ImportStats:
+        workers = max(1, options["workers"] or 1)
+        update_existing = bool(options["update_existing"])
+        checkpoint = ImportCheckpoint.for_file(
+            options["excel_path"],
+            sheet=options["sheet"],
+            range_size=options["range_size"],
+            update_existing=update_existing,
+        )
+        if options["resume"]:
+            if checkpoint.exists():
+                try:
+                    checkpoint.load()
+                except ValueError as exc:
+                    raise CommandError(f"Reprise impossible: {exc} ({checkpoint.path}).") from exc
+                self.stdout.write(f"Reprise: {len(checkpoint.done)} plage(s) déjà importée(s)")
+        elif checkpoint.exists():
+            raise CommandError(
+                f"Un import précédent n'est pas terminé ({checkpoint.path}). "
+                "Relancer avec --resume, ou supprimer ce fichier pour tout reprendre."
+            )
+
+        kwargs = {"update_existing": update_existing, "chunk_size": options["chunk_size"]}
+        ranges = (
+            (line_range, rows)
+            for line_range, rows in iter_ranges(iter_data_rows(reader), options["range_size"])
+            if line_range not in checkpoint.done
+        )
+
+        def record(line_range, stats: ImportStats) -> None:
+            checkpoint.mark_done(line_range, stats)
+            if options["verbosity"] >= 2:
+                self.stdout.write(
+                    f"Lignes {line_range[0]}-{line_range[1]}: created={stats.created} "
+                    f"updated={stats.updated} skipped={stats.skipped} errors={len(stats.errors)}"
+                )
+
+        if workers == 1:
+            for line_range, rows in ranges:
+                record(line_range, import_range(field_to_col, rows, **kwargs))
+        else:
+            pending = {}
+            errors: list[BaseException] = []
+
+            def collect(futures) -> None:
+                # Chaque plage validée est notée dès sa fin, même si une autre a échoué :
+                # une reprise ne la rejoue pas (statistiques exactes).
+                for future in futures:
+                    line_range = pending.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        errors.append(exc)
+                    else:
+                        record(line_range, future.result())
+
+            with process_pool(workers) as pool:
+                for line_range, rows in ranges:
+                    # Au plus 2 plages en attente par processus : la lecture ne prend pas d'avance en mémoire.
+                    while len(pending) >= workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    if errors:
+                        # Plus de nouvelle plage ; celles en cours sont attendues et notées.
+                        break
+                    pending[pool.submit(import_range, field_to_col, rows, **kwargs)] = line_range
+                collect(as_completed(list(pending)))
+            if errors:
+                raise errors[0]
+
+        stats = checkpoint.stats
+        checkpoint.delete()
+        return stats
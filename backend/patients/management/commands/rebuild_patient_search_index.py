@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from patients.models import Patient
+from patients.search import reindex_patients
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des patients (jetons normalisés)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Patients réindexés par transaction (défaut: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        patients = tokens = 0
+        last_pk = 0
+        while True:
+            ids = list(
+                Patient.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                tokens += reindex_patients(ids, batch_size=batch_size)
+            patients += len(ids)
+            last_pk = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Patients indexés: {patients} | jetons: {tokens}"))
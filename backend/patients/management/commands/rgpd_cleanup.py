@@ -6,7 +6,8 @@ from django.core.management.base import BaseCommand
 from django.db.models import Q
 from django.utils import timezone
 
-from audit.models import AuditLog
+from patients.access_tracking import flush_pending_accesses
+from patients.anonymization import anonymize_patients, anonymized_q
 from patients.models import Patient
 
 
@@ -20,6 +21,17 @@ class Command(BaseCommand):
             default=3,
             help="Nombre d'années d'inactivité avant anonymisation (défaut: 3).",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Patients anonymisés par transaction (défaut: ANONYMIZATION_CHUNK_SIZE).",
+        )
+        parser.add_argument(
+            "--no-wait",
+            action="store_true",
+            help="N'attend pas l'intervalle de flush des autres processus (workers web).",
+        )
 
     def handle(self, *args, **options):
         years = int(options["years"])
@@ -29,56 +41,23 @@ class Command(BaseCommand):
         qs = Patient.objects.filter(
             Q(date_dernier_acces__lt=cutoff)
             | (Q(date_dernier_acces__isnull=True) & Q(created_at__lt=cutoff))
-        ).exclude(nom="ANONYMISE")
-
-        total = qs.count()
-        anonymised = 0
+        ).exclude(anonymized_q())
 
-        for patient in qs.iterator():
-            original_code = patient.code_patient
+        # Les dates de dernier accès doivent être à jour avant d'anonymiser ; l'attente
+        # des autres workers n'a lieu que s'il y a des candidats (un accès ne peut qu'en retirer).
+        flush_pending_accesses(wait=not options["no_wait"] and qs.exists())
 
-            patient.nom = "ANONYMISE"
-            patient.prenoms = f"PATIENT_{patient.pk}"
-            patient.telephone = ""
-            patient.adresse = ""
-            patient.antecedents = ""
-            patient.date_naissance = None
-            patient.date_dernier_acces = None
-            patient.save(
-                update_fields=[
-                    "nom",
-                    "prenoms",
-                    "telephone",
-                    "adresse",
-                    "antecedents",
-                    "date_naissance",
-                    "date_dernier_acces",
-                    "updated_at",
-                ]
-            )
-
-            AuditLog.objects.create(
-                user=None,
-                action=AuditLog.ACTION_UPDATE,
-                app_label="patients",
-                model="patient",
-                object_id=str(patient.pk),
-                object_repr=str(patient),
-                ip_address="",
-                user_agent="rgpd_cleanup",
-                extra={
-                    "anonymized": True,
-                    "previous_code_patient": original_code,
-                    "source": "rgpd_cleanup",
-                    "cutoff": cutoff.isoformat(),
-                },
-            )
-
-            anonymised += 1
+        total = qs.count()
+        anonymised = anonymize_patients(
+            qs,
+            audit={"user_agent": "rgpd_cleanup"},
+            extra={"source": "rgpd_cleanup", "cutoff": cutoff.isoformat()},
+            chunk_size=options["chunk_size"],
+            progress=lambda done: self.stdout.write(f"  {done}/{total}"),
+        )
 
         self.stdout.write(
             self.style.SUCCESS(
                 f"Patients ciblés: {total} | Patients anonymisés: {anonymised}"
             )
         )
-
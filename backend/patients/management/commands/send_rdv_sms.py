@@ -1,17 +1,17 @@
 from __future__ import annotations
 
-from datetime import timedelta
-
 from django.core.management.base import BaseCommand
-from django.db.models import Exists, OuterRef
-from django.utils import timezone
 
-from patients.models import RendezVous, SmsLog
-from patients.sms_provider import SmsProvider
+from patients.reminders import send_due_reminders
+from patients.sms_dispatch import SmsDispatcher
+from patients.sms_provider import get_sms_provider
 
 
 class Command(BaseCommand):
-    help = "Envoie des SMS de rappel pour les rendez-vous à venir et enregistre les logs."
+    help = (
+        "Envoie des SMS de rappel pour les rendez-vous à venir et enregistre les logs. "
+        "Plusieurs instances peuvent tourner en parallèle (réservation des rappels par lots)."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -20,57 +20,32 @@ class Command(BaseCommand):
             default=24,
             help="Fenêtre de rappel (en heures) pour les rendez-vous à venir (défaut: 24).",
         )
-
-    def handle(self, *args, **options):
-        hours = int(options["hours"])
-        now = timezone.now()
-        end = now + timedelta(hours=hours)
-
-        provider = SmsProvider()
-
-        already_sent = SmsLog.objects.filter(rendez_vous=OuterRef("pk"), statut=SmsLog.STATUT_SUCCES)
-
-        rdvs = (
-            RendezVous.objects.select_related("patient")
-            .annotate(sent_ok=Exists(already_sent))
-            .filter(statut="PLANIFIE", date_heure__gte=now, date_heure__lte=end, sent_ok=False)
-            .order_by("date_heure")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Envois simultanés (défaut: SMS_CONCURRENCY).",
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="SMS par seconde vers le provider, 0 = illimité (défaut: SMS_RATE_PER_SECOND).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Rappels réservés par lot (défaut: SMS_REMINDER_BATCH).",
         )
 
-        total = 0
-        success = 0
-        failed = 0
+    def handle(self, *args, **options):
+        dispatcher = SmsDispatcher(get_sms_provider(), concurrency=options["concurrency"], rate=options["rate"])
+        stats = send_due_reminders(dispatcher, hours=int(options["hours"]), batch_size=options["batch_size"])
 
-        for rdv in rdvs:
-            total += 1
-            phone = (rdv.patient.telephone or "").strip()
-            message = (
-                f"Rappel ADJAHI: RDV le {rdv.date_heure:%d/%m/%Y à %H:%M}. "
-                f"Patient: {rdv.patient.nom} {rdv.patient.prenoms}."
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"RDV ciblés: {stats.total} | SMS succès: {stats.success} | échecs: {stats.failed}"
+                f" | nouvelles tentatives: {stats.retries}"
             )
-
-            result = provider.send_sms(phone=phone, message=message)
-
-            if result.success:
-                success += 1
-                SmsLog.objects.create(
-                    rendez_vous=rdv,
-                    telephone=phone,
-                    message=message,
-                    statut=SmsLog.STATUT_SUCCES,
-                    provider=result.provider,
-                    provider_message_id=result.message_id,
-                )
-            else:
-                failed += 1
-                SmsLog.objects.create(
-                    rendez_vous=rdv,
-                    telephone=phone,
-                    message=message,
-                    statut=SmsLog.STATUT_ECHEC,
-                    provider=result.provider,
-                    provider_message_id=result.message_id,
-                    error_message=result.error,
-                )
-
-        self.stdout.write(self.style.SUCCESS(f"RDV ciblés: {total} | SMS succès: {success} | échecs: {failed}"))
+        )
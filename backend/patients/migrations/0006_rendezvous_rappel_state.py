@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:18
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_already_sent(apps, schema_editor):
+    # Rappels déjà envoyés avant l'introduction des états (SmsLog en succès).
+    RendezVous = apps.get_model("patients", "RendezVous")
+    SmsLog = apps.get_model("patients", "SmsLog")
+    sent = SmsLog.objects.filter(rendez_vous=OuterRef("pk"), statut="SUCCES")
+    RendezVous.objects.filter(Exists(sent)).update(rappel_statut="SENT")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0005_kpi_rollup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rendezvous',
+            name='rappel_bail_expire',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rendezvous',
+            name='rappel_jeton',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='rendezvous',
+            name='rappel_statut',
+            field=models.CharField(choices=[('PENDING', 'À envoyer'), ('CLAIMED', "En cours d'envoi"), ('SENT', 'Envoyé'), ('FAILED', 'Échec')], default='PENDING', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='rendezvous',
+            name='rappel_tentatives',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['rappel_statut', 'date_heure'], name='rdv_rappel_due_idx'),
+        ),
+        migrations.RunPython(mark_already_sent, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_index(apps, schema_editor):
+    from patients.search import patient_tokens
+
+    Patient = apps.get_model("patients", "Patient")
+    PatientSearchToken = apps.get_model("patients", "PatientSearchToken")
+    rows = Patient.objects.order_by("pk").values_list("pk", "code_patient", "nom", "prenoms", "telephone")
+    batch = []
+    for pk, code, nom, prenoms, telephone in rows.iterator(chunk_size=2000):
+        batch.extend(
+            PatientSearchToken(patient_id=pk, token=t)
+            for t in patient_tokens(code_patient=code, nom=nom, prenoms=prenoms, telephone=telephone)
+        )
+        if len(batch) >= 5000:
+            PatientSearchToken.objects.bulk_create(batch)
+            batch = []
+    PatientSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0006_rendezvous_rappel_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='patients.patient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'patient'], name='patient_search_token_idx')],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def compute_keys(apps, schema_editor):
+    from patients.duplicates import blocking_key
+
+    Patient = apps.get_model("patients", "Patient")
+    batch = []
+    for patient in Patient.objects.only("pk", "nom", "date_naissance", "zone").order_by("pk").iterator(chunk_size=2000):
+        patient.cle_phonetique = blocking_key(patient.nom, patient.date_naissance, patient.zone)
+        batch.append(patient)
+        if len(batch) >= 1000:
+            Patient.objects.bulk_update(batch, ["cle_phonetique"])
+            batch = []
+    Patient.objects.bulk_update(batch, ["cle_phonetique"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0007_patient_search_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='cle_phonetique',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='doublons_verifies',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='DoublonPotentiel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('statut', models.CharField(choices=[('A_VERIFIER', 'À vérifier'), ('CONFIRME', 'Doublon confirmé'), ('REJETE', 'Pas un doublon')], default='A_VERIFIER', max_length=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('patient_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.patient')),
+                ('patient_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='patients.patient')),
+            ],
+            options={
+                'ordering': ['-score', 'id'],
+                'constraints': [models.UniqueConstraint(fields=('patient_a', 'patient_b'), name='doublon_paire_unique')],
+            },
+        ),
+        migrations.RunPython(compute_keys, migrations.RunPython.noop),
+    ]
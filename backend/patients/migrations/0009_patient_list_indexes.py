@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0008_patient_duplicates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['nom', 'prenoms'], name='patient_nom_prenoms_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['zone', 'nom', 'prenoms'], name='patient_zone_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['sexe', 'nom', 'prenoms'], name='patient_sexe_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['zone', 'sexe', 'nom', 'prenoms'], name='patient_zone_sexe_nom_idx'),
+        ),
+    ]
@@ -34,24 +34,80 @@ class Patient(models.Model):
     # Informations médicales (phase 1 : simplifié)
     antecedents = models.TextField(blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     date_dernier_acces = models.DateTimeField(null=True, blank=True)
 
+    # Détection des doublons (voir patients/duplicates.py)
+    cle_phonetique = models.CharField(max_length=64, blank=True, default="", db_index=True, editable=False)
+    doublons_verifies = models.BooleanField(default=False, db_index=True, editable=False)
+
     class Meta:
         ordering = ["nom", "prenoms"]
+        # Liste paginée sur (nom, prenoms, id) avec ou sans filtres zone/sexe ;
+        # InnoDB ajoute la clé primaire à chaque index secondaire.
+        indexes = [
+            models.Index(fields=["nom", "prenoms"], name="patient_nom_prenoms_idx"),
+            models.Index(fields=["zone", "nom", "prenoms"], name="patient_zone_nom_idx"),
+            models.Index(fields=["sexe", "nom", "prenoms"], name="patient_sexe_nom_idx"),
+            models.Index(fields=["zone", "sexe", "nom", "prenoms"], name="patient_zone_sexe_nom_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.code_patient} - {self.nom} {self.prenoms}"
 
 
+class PatientSearchToken(models.Model):
+    """Jeton de recherche d'un patient (voir ``patients.search``)."""
+
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="search_tokens")
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [models.Index(fields=["token", "patient"], name="patient_search_token_idx")]
+
+    def __str__(self) -> str:
+        return self.token
+
+
+class DoublonPotentiel(models.Model):
+    STATUT_A_VERIFIER = "A_VERIFIER"
+    STATUT_CONFIRME = "CONFIRME"
+    STATUT_REJETE = "REJETE"
+
+    # patient_a.pk < patient_b.pk : une seule ligne par paire.
+    patient_a = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="+")
+    patient_b = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    statut = models.CharField(
+        max_length=12,
+        choices=[
+            (STATUT_A_VERIFIER, "À vérifier"),
+            (STATUT_CONFIRME, "Doublon confirmé"),
+            (STATUT_REJETE, "Pas un doublon"),
+        ],
+        default=STATUT_A_VERIFIER,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-score", "id"]
+        constraints = [
+            models.UniqueConstraint(fields=["patient_a", "patient_b"], name="doublon_paire_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.patient_a_id} ~ {self.patient_b_id} ({self.score:.2f})"
+
+
 class Consultation(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="consultations")
-    date_consultation = models.DateTimeField()
+    date_consultation = models.DateTimeField(db_index=True)
     motif = models.CharField(max_length=255, blank=True)
     observation = models.TextField(blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-date_consultation"]
@@ -65,10 +121,11 @@ class SuiviCPN(models.Model):
     numero = models.PositiveSmallIntegerField(
         choices=[(1, "CPN1"), (2, "CPN2"), (3, "CPN3"), (4, "CPN4")]
     )
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     notes = models.TextField(blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ("patient", "numero")
@@ -79,6 +136,19 @@ class SuiviCPN(models.Model):
 
 
 class RendezVous(models.Model):
+    # Cycle du SMS de rappel (voir patients/reminders.py)
+    RAPPEL_PENDING = "PENDING"
+    RAPPEL_CLAIMED = "CLAIMED"
+    RAPPEL_SENT = "SENT"
+    RAPPEL_FAILED = "FAILED"
+
+    RAPPEL_CHOICES = [
+        (RAPPEL_PENDING, "À envoyer"),
+        (RAPPEL_CLAIMED, "En cours d'envoi"),
+        (RAPPEL_SENT, "Envoyé"),
+        (RAPPEL_FAILED, "Échec"),
+    ]
+
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="rendez_vous")
     date_heure = models.DateTimeField()
     objet = models.CharField(max_length=255, blank=True)
@@ -88,10 +158,19 @@ class RendezVous(models.Model):
         default="PLANIFIE",
     )
 
+    rappel_statut = models.CharField(max_length=10, choices=RAPPEL_CHOICES, default=RAPPEL_PENDING)
+    # Bail du worker qui envoie le rappel : passé ce délai, un autre worker peut le reprendre
+    rappel_bail_expire = models.DateTimeField(null=True, blank=True)
+    rappel_jeton = models.CharField(max_length=32, blank=True, default="")
+    rappel_tentatives = models.PositiveSmallIntegerField(default=0)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-date_heure"]
+        indexes = [
+            models.Index(fields=["rappel_statut", "date_heure"], name="rdv_rappel_due_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"RDV {self.patient.code_patient} - {self.date_heure:%Y-%m-%d %H:%M}"
@@ -153,8 +232,8 @@ class CasSuivi(models.Model):
     date_signalement = models.DateField(null=True, blank=True)
     notes = models.TextField(blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-created_at"]
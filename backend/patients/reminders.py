@@ -0,0 +1,141 @@
+"""Planification des SMS de rappel, sûre avec plusieurs workers en parallèle.
+
+Chaque rendez-vous porte l'état de son rappel (``rappel_statut``). Un worker
+réserve un lot de rappels dus avec ``SELECT ... FOR UPDATE SKIP LOCKED`` : les
+lignes verrouillées par un autre worker sont sautées au lieu d'être attendues.
+La réservation pose un jeton et un bail (``SMS_REMINDER_LEASE_SECONDS``) ; un
+rappel dont le bail a expiré (worker arrêté en cours d'envoi) redevient
+réservable. Les résultats ne sont enregistrés que si le jeton est toujours le
+bon, donc un worker en retard n'écrase pas le travail d'un autre.
+
+Un échec temporaire remet le rappel en attente, réservable à nouveau après un
+bail complet, jusqu'à ``SMS_REMINDER_MAX_CLAIMS`` réservations ; ensuite il
+passe en échec.
+"""
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import RendezVous
+from .sms_dispatch import DispatchStats, SmsDispatcher, SmsJob
+from .sms_provider import SmsSendResult
+
+
+def rdv_message(rdv: RendezVous) -> str:
+    return (
+        f"Rappel ADJAHI: RDV le {rdv.date_heure:%d/%m/%Y à %H:%M}. "
+        f"Patient: {rdv.patient.nom} {rdv.patient.prenoms}."
+    )
+
+
+def _claimable(start: datetime, end: datetime, now: datetime) -> Q:
+    return Q(
+        statut="PLANIFIE",
+        date_heure__gte=start,
+        date_heure__lte=end,
+        rappel_statut__in=[RendezVous.RAPPEL_PENDING, RendezVous.RAPPEL_CLAIMED],
+    ) & (Q(rappel_bail_expire__isnull=True) | Q(rappel_bail_expire__lt=now))
+
+
+def claim_batch(
+    start: datetime,
+    end: datetime,
+    *,
+    limit: int | None = None,
+    lease_seconds: int | None = None,
+) -> tuple[str, list[RendezVous]]:
+    """Réserve jusqu'à ``limit`` rappels dus entre ``start`` et ``end``.
+
+    Renvoie le jeton de la réservation et les rendez-vous réservés (patient chargé).
+    """
+    limit = limit or getattr(settings, "SMS_REMINDER_BATCH", 500)
+    lease_seconds = lease_seconds or getattr(settings, "SMS_REMINDER_LEASE_SECONDS", 300)
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    claimable = _claimable(start, end, now)
+
+    with transaction.atomic():
+        ids = list(
+            RendezVous.objects.select_for_update(skip_locked=True)
+            .filter(claimable)
+            .order_by("date_heure", "id")
+            .values_list("id", flat=True)[:limit]
+        )
+        if not ids:
+            return token, []
+        # Mise à jour conditionnelle : protège aussi les bases sans SELECT ... FOR UPDATE.
+        RendezVous.objects.filter(claimable, pk__in=ids).update(
+            rappel_statut=RendezVous.RAPPEL_CLAIMED,
+            rappel_jeton=token,
+            rappel_bail_expire=now + timedelta(seconds=lease_seconds),
+            rappel_tentatives=F("rappel_tentatives") + 1,
+        )
+
+    rdvs = list(
+        RendezVous.objects.select_related("patient")
+        .filter(rappel_jeton=token, rappel_statut=RendezVous.RAPPEL_CLAIMED)
+        .order_by("date_heure", "id")
+    )
+    return token, rdvs
+
+
+def complete_batch(token: str, results: dict[int, SmsSendResult]) -> None:
+    """Enregistre l'issue des rappels réservés avec ``token`` (ignorée si le bail a été repris)."""
+    max_claims = getattr(settings, "SMS_REMINDER_MAX_CLAIMS", 3)
+    sent = [pk for pk, r in results.items() if r.success]
+    failed = [pk for pk, r in results.items() if not r.success and not r.retryable]
+    retry = [pk for pk, r in results.items() if not r.success and r.retryable]
+
+    owned = RendezVous.objects.filter(rappel_jeton=token, rappel_statut=RendezVous.RAPPEL_CLAIMED)
+    done = {"rappel_jeton": "", "rappel_bail_expire": None}
+    with transaction.atomic():
+        if sent:
+            owned.filter(pk__in=sent).update(rappel_statut=RendezVous.RAPPEL_SENT, **done)
+        if retry:
+            retry_at = timezone.now() + timedelta(seconds=getattr(settings, "SMS_REMINDER_LEASE_SECONDS", 300))
+            owned.filter(pk__in=retry, rappel_tentatives__lt=max_claims).update(
+                rappel_statut=RendezVous.RAPPEL_PENDING, rappel_jeton="", rappel_bail_expire=retry_at
+            )
+            failed += retry
+        if failed:
+            owned.filter(pk__in=failed).update(rappel_statut=RendezVous.RAPPEL_FAILED, **done)
+
+
+def send_due_reminders(
+    dispatcher: SmsDispatcher,
+    *,
+    hours: int = 24,
+    batch_size: int | None = None,
+) -> DispatchStats:
+    """Envoie les rappels des rendez-vous des ``hours`` prochaines heures, lot par lot."""
+    now = timezone.now()
+    end = now + timedelta(hours=hours)
+    total = DispatchStats()
+
+    while True:
+        token, rdvs = claim_batch(now, end, limit=batch_size)
+        if not rdvs:
+            return total
+
+        results: dict[int, SmsSendResult] = {}
+        jobs = [
+            SmsJob(rendez_vous_id=rdv.pk, phone=(rdv.patient.telephone or "").strip(), message=rdv_message(rdv))
+            for rdv in rdvs
+        ]
+        try:
+            stats = dispatcher.dispatch(jobs, on_result=lambda job, result: results.__setitem__(job.rendez_vous_id, result))
+        finally:
+            # Les rappels sans résultat (interruption) restent réservés jusqu'à la fin du bail.
+            complete_batch(token, results)
+
+        total.total += stats.total
+        total.success += stats.success
+        total.failed += stats.failed
+        total.retries += stats.retries
@@ -0,0 +1,122 @@
+"""Recherche de patients par table de jetons normalisés.
+
+Chaque patient est indexé dans ``PatientSearchToken`` : mots du nom et des
+prénoms sans accents ni majuscules, code patient (entier et par morceaux),
+téléphone en chiffres E.164 et au format national. Une recherche découpe la
+requête de la même façon et exige que chaque terme soit le préfixe d'un jeton
+du patient (``LIKE 'terme%'`` sur l'index ``token, patient``) ; les patients
+dont les termes correspondent exactement passent devant.
+
+La table reste portable (MySQL en production, SQLite en test) au lieu d'un
+index FULLTEXT propre au moteur. Elle est tenue à jour par le signal
+``post_save`` de ``Patient`` et, pour les écritures groupées de l'import, par
+``reindex_patients`` ; ``rebuild_patient_search_index`` reconstruit tout.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+TOKEN_MAX_LENGTH = 64
+SEARCH_FIELDS = frozenset({"code_patient", "nom", "prenoms", "telephone"})
+_WORD = re.compile(r"[a-z0-9]+")
+_PHONE_QUERY = re.compile(r"^\+?[\d\s().-]{6,}$")
+
+
+def fold(text: str | None) -> str:
+    """Minuscules sans accents : « Kouassi Adjé » -> ``kouassi adje``."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return text.lower()
+
+
+def normalize_phone(raw: str | None, country_code: str | None = None) -> str:
+    """Chiffres E.164 sans « + » ; un numéro national reçoit l'indicatif par défaut."""
+    country_code = country_code or getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "225")
+    raw = (raw or "").strip()
+    digits = re.sub(r"\D", "", raw)
+    if not digits:
+        return ""
+    if raw.startswith("+"):
+        return digits
+    if digits.startswith("00"):
+        return digits[2:]
+    return country_code + digits
+
+
+def patient_tokens(*, code_patient: str = "", nom: str = "", prenoms: str = "", telephone: str = "") -> set[str]:
+    """Jetons d'un patient (fonction pure, utilisée aussi par la migration)."""
+    tokens = set(_WORD.findall(fold(f"{nom} {prenoms}")))
+    code_parts = _WORD.findall(fold(code_patient))
+    if code_parts:
+        tokens.add("".join(code_parts))
+        tokens.update(p for p in code_parts if len(p) > 1)
+    digits = re.sub(r"\D", "", telephone or "")
+    if digits:
+        tokens.add(digits)
+        tokens.add(normalize_phone(telephone))
+    return {t[:TOKEN_MAX_LENGTH] for t in tokens if t}
+
+
+def query_terms(q: str) -> list[list[str]]:
+    """Termes de la requête ; chaque terme est une liste d'alternatives (préfixes)."""
+    q = (q or "").strip()
+    if _PHONE_QUERY.match(q) and sum(c.isdigit() for c in q) >= 6:
+        digits = re.sub(r"\D", "", q)
+        return [sorted({digits, normalize_phone(q)})]
+    return [[t[:TOKEN_MAX_LENGTH]] for t in dict.fromkeys(_WORD.findall(fold(q)))]
+
+
+def _iter_ids(ids: Iterable[int], size: int) -> Iterator[list[int]]:
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
+
+def reindex_patients(patient_ids: Iterable[int], *, batch_size: int = 1000) -> int:
+    """Recalcule les jetons des patients donnés ; renvoie le nombre de jetons écrits."""
+    from .models import Patient, PatientSearchToken
+
+    written = 0
+    for ids in _iter_ids(patient_ids, batch_size):
+        PatientSearchToken.objects.filter(patient_id__in=ids).delete()
+        rows = Patient.objects.filter(pk__in=ids).values_list("pk", "code_patient", "nom", "prenoms", "telephone")
+        objs = [
+            PatientSearchToken(patient_id=pk, token=token)
+            for pk, code, nom, prenoms, telephone in rows
+            for token in patient_tokens(code_patient=code, nom=nom, prenoms=prenoms, telephone=telephone)
+        ]
+        PatientSearchToken.objects.bulk_create(objs, batch_size=batch_size)
+        written += len(objs)
+    return written
+
+
+def search_patients(q: str, queryset: QuerySet | None = None) -> QuerySet:
+    """Patients correspondant à ``q``, annotés ``search_rank`` et triés par pertinence."""
+    from .models import Patient, PatientSearchToken
+
+    qs = Patient.objects.all() if queryset is None else queryset
+    terms = query_terms(q)
+    if not terms:
+        return qs
+    for alternatives in terms:
+        match = Q()
+        for prefix in alternatives:
+            match |= Q(token__istartswith=prefix)
+        qs = qs.filter(pk__in=PatientSearchToken.objects.filter(match).values("patient_id"))
+
+    exact = (
+        PatientSearchToken.objects.filter(patient=OuterRef("pk"), token__in=[t for alt in terms for t in alt])
+        .order_by()
+        .values("patient_id")
+        .annotate(n=Count("token"))
+        .values("n")
+    )
+    return qs.annotate(
+        search_rank=Coalesce(Subquery(exact, output_field=IntegerField()), Value(0))
+    ).order_by("-search_rank", "nom", "prenoms", "id")
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.pdf import invalidate
+
+from .models import LigneOrdonnance, Ordonnance, Patient
+from .duplicates import BLOCKING_FIELDS, apply_blocking_key
+from .listing import invalidate_zone_counts
+from .search import SEARCH_FIELDS, reindex_patients
+from .utils import PDF_PATIENT_FIELDS, invalidate_patient_pdfs
+
+
+def _invalidate_ordonnance_pdf(ordonnance_id) -> None:
+    if ordonnance_id:
+        transaction.on_commit(lambda: invalidate(f"ordonnances/{ordonnance_id}"))
+
+
+@receiver(post_save, sender=Ordonnance)
+@receiver(post_delete, sender=Ordonnance)
+def ordonnance_changed(sender, instance: Ordonnance, **kwargs):
+    _invalidate_ordonnance_pdf(instance.pk)
+
+
+@receiver(post_save, sender=LigneOrdonnance)
+@receiver(post_delete, sender=LigneOrdonnance)
+def ligne_ordonnance_changed(sender, instance: LigneOrdonnance, **kwargs):
+    _invalidate_ordonnance_pdf(instance.ordonnance_id)
+
+
+@receiver(post_delete, sender=Patient)
+def patient_deleted(sender, instance: Patient, **kwargs):
+    invalidate_zone_counts()
+
+
+@receiver(pre_save, sender=Patient)
+def patient_blocking_key(sender, instance: Patient, raw=False, update_fields=None, **kwargs):
+    # Clé de blocage des doublons : un changement remet le patient dans la file de détection.
+    if not raw and update_fields is None:
+        apply_blocking_key(instance)
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance: Patient, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is None or "zone" in update_fields:
+        invalidate_zone_counts()
+    # Index de recherche mis à jour dans la même transaction que le patient.
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        reindex_patients([instance.pk])
+    # Les ordonnances en cache impriment l'identité du patient.
+    if not kwargs.get("created") and (update_fields is None or PDF_PATIENT_FIELDS & set(update_fields)):
+        invalidate_patient_pdfs([instance.pk])
+    # Enregistrement partiel : la clé n'a pas pu être écrite avec le patient.
+    if update_fields is not None and BLOCKING_FIELDS & set(update_fields):
+        if apply_blocking_key(instance):
+            Patient.objects.filter(pk=instance.pk).update(cle_phonetique=instance.cle_phonetique, doublons_verifies=False)
@@ -0,0 +1,296 @@
+"""Envoi concurrent des SMS avec limitation de débit et nouvelles tentatives.
+
+Les envois passent par un pool de threads (``SMS_CONCURRENCY``) ; un seau à
+jetons par provider (``SMS_RATE_PER_SECOND``) borne le débit vers la passerelle.
+Un échec temporaire est retenté jusqu'à ``SMS_MAX_ATTEMPTS`` fois avec un délai
+exponentiel (``SMS_RETRY_BACKOFF`` x 2^n, plus une part aléatoire).
+
+Les ``SmsLog`` sont écrits par le thread appelant, par lots (``bulk_create``).
+Les SMS ponctuels émis par les vues (``send_sms_async``) partent après le
+commit via un thread de fond, sans bloquer la requête.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import SmsLog
+from .sms_provider import SmsMessage, SmsSendResult, get_sms_provider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SmsJob:
+    rendez_vous_id: int
+    phone: str
+    message: str
+
+
+@dataclass
+class DispatchStats:
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+    retries: int = 0
+
+
+class TokenBucket:
+    """Seau à jetons : ``rate`` envois par seconde, rafale de ``capacity`` (``rate <= 0`` : illimité)."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+def _batched(jobs: Iterable[SmsJob], size: int) -> Iterator[list[SmsJob]]:
+    it = iter(jobs)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(provider_name: str, rate: float, capacity: float | None = None) -> TokenBucket:
+    """Seau partagé par tous les envois d'un même provider dans le processus."""
+    with _buckets_lock:
+        bucket = _buckets.get(provider_name)
+        if bucket is None or bucket.rate != rate:
+            bucket = _buckets[provider_name] = TokenBucket(rate, capacity)
+        return bucket
+
+
+class SmsDispatcher:
+    def __init__(
+        self,
+        provider,
+        *,
+        concurrency: int | None = None,
+        rate: float | None = None,
+        max_attempts: int | None = None,
+        backoff: float | None = None,
+        max_backoff: float = 60.0,
+        batch_size: int | None = None,
+        log_batch_size: int = 200,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.provider = provider
+        self.provider_name = getattr(provider, "name", provider.__class__.__name__)
+        self.batch_size = max(1, batch_size or getattr(provider, "batch_size", 1))
+        self.concurrency = max(1, concurrency or getattr(settings, "SMS_CONCURRENCY", 10))
+        rate = getattr(settings, "SMS_RATE_PER_SECOND", 20) if rate is None else rate
+        self.bucket = get_bucket(self.provider_name, rate)
+        self.max_attempts = max(1, max_attempts or getattr(settings, "SMS_MAX_ATTEMPTS", 3))
+        self.backoff = getattr(settings, "SMS_RETRY_BACKOFF", 1.0) if backoff is None else backoff
+        self.max_backoff = max_backoff
+        self.log_batch_size = log_batch_size
+        self._sleep = sleep
+
+    def send(self, jobs: list[SmsJob]) -> list[tuple[SmsSendResult, int]]:
+        """Envoie un lot avec nouvelles tentatives des échecs temporaires.
+
+        Renvoie, pour chaque message, le dernier résultat et le nombre d'essais.
+        """
+        outcomes: list[tuple[SmsSendResult, int]] = [None] * len(jobs)  # type: ignore[list-item]
+        todo = list(range(len(jobs)))
+        attempt = 0
+        while todo:
+            attempt += 1
+            for _ in todo:
+                self.bucket.acquire()
+            messages = [SmsMessage(phone=jobs[i].phone, message=jobs[i].message) for i in todo]
+            try:
+                results = list(self.provider.send_batch(messages))
+            except Exception as exc:
+                error = str(exc) or exc.__class__.__name__
+                results = [SmsSendResult(success=False, provider=self.provider_name, error=error) for _ in todo]
+            if len(results) != len(todo):
+                # Réponse incomplète : les messages sans résultat sont traités comme un échec temporaire.
+                logger.warning(
+                    "Provider SMS %s : %d résultats pour %d messages", self.provider_name, len(results), len(todo)
+                )
+                missing = SmsSendResult(success=False, provider=self.provider_name, error="Résultat manquant")
+                results = results[: len(todo)] + [missing] * (len(todo) - len(results))
+            retry = []
+            for i, result in zip(todo, results):
+                outcomes[i] = (result, attempt)
+                if not result.success and result.retryable and attempt < self.max_attempts:
+                    retry.append(i)
+            todo = retry
+            if todo:
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                self._sleep(delay + random.uniform(0, delay / 4))
+        return outcomes
+
+    def dispatch(
+        self,
+        jobs: Iterable[SmsJob],
+        *,
+        log: bool = True,
+        on_result: Callable[[SmsJob, SmsSendResult], None] | None = None,
+    ) -> DispatchStats:
+        """Envoie ``jobs`` ; ``on_result`` est appelé dans le thread appelant pour chaque message."""
+        stats = DispatchStats()
+        pending_logs: list[SmsLog] = []
+
+        def collect(job: SmsJob, result: SmsSendResult, attempts: int) -> None:
+            stats.total += 1
+            stats.retries += attempts - 1
+            if result.success:
+                stats.success += 1
+            else:
+                stats.failed += 1
+            if on_result is not None:
+                on_result(job, result)
+            if log:
+                pending_logs.append(
+                    SmsLog(
+                        rendez_vous_id=job.rendez_vous_id,
+                        telephone=job.phone[:30],
+                        message=job.message,
+                        statut=SmsLog.STATUT_SUCCES if result.success else SmsLog.STATUT_ECHEC,
+                        provider=result.provider,
+                        provider_message_id=result.message_id,
+                        error_message=result.error,
+                    )
+                )
+                if len(pending_logs) >= self.log_batch_size:
+                    SmsLog.objects.bulk_create(pending_logs)
+                    pending_logs.clear()
+            elif not result.success:
+                logger.warning("SMS non envoyé (RDV %s): %s", job.rendez_vous_id, result.error)
+
+        def collect_done(futures) -> None:
+            for future in futures:
+                for job, outcome in zip(in_flight.pop(future), future.result()):
+                    collect(job, *outcome)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sms") as pool:
+            in_flight: dict = {}
+            try:
+                # Fenêtre bornée : les rendez-vous sont lus au rythme des envois.
+                for batch in _batched(jobs, self.batch_size):
+                    while len(in_flight) >= self.concurrency * 4:
+                        collect_done(wait(in_flight, return_when=FIRST_COMPLETED).done)
+                    in_flight[pool.submit(self.send, batch)] = batch
+                collect_done(wait(in_flight).done)
+            finally:
+                # Les SMS partis sont tracés même si la boucle est interrompue.
+                if pending_logs:
+                    SmsLog.objects.bulk_create(pending_logs)
+        return stats
+
+
+class BackgroundSmsSender:
+    """Thread de fond qui envoie les SMS soumis par les vues, par lots."""
+
+    def __init__(self, batch_size: int = 50):
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, job: SmsJob) -> None:
+        self._ensure_started()
+        self._queue.put(job)
+
+    def shutdown(self, timeout: float = 10) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="sms-sender", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stop = True
+                batch = [job for job in batch if job is not None]
+            if not batch:
+                continue
+            try:
+                SmsDispatcher(get_sms_provider()).dispatch(batch, log=False)
+            except Exception:
+                logger.exception("Envoi SMS en tâche de fond impossible (%d messages)", len(batch))
+            finally:
+                connections.close_all()
+
+
+_sender: BackgroundSmsSender | None = None
+_sender_lock = threading.Lock()
+
+
+def get_background_sender() -> BackgroundSmsSender:
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = BackgroundSmsSender()
+            atexit.register(_sender.shutdown)
+        return _sender
+
+
+def send_sms_async(job: SmsJob) -> None:
+    """Envoie ``job`` après le commit de la transaction courante, sans bloquer l'appelant.
+
+    Avec ``SMS_ASYNC_ENABLED=0`` l'envoi est fait dans le processus, à la fin du commit.
+    """
+    if getattr(settings, "SMS_ASYNC_ENABLED", True):
+        transaction.on_commit(lambda: get_background_sender().submit(job))
+    else:
+        transaction.on_commit(lambda: SmsDispatcher(get_sms_provider()).dispatch([job], log=False))
+
+
+def _reset_after_fork() -> None:
+    global _sender, _sender_lock, _buckets_lock
+    _sender = None
+    _sender_lock = threading.Lock()
+    _buckets.clear()
+    _buckets_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
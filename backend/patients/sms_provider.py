@@ -1,6 +1,28 @@
+"""Providers SMS interchangeables, choisis par ``SMS_BACKEND``.
+
+Chaque provider garde ses ressources entre deux envois (pool de connexions
+HTTP, fichier ouvert une seule fois) ; ``get_sms_provider()`` renvoie
+l'instance partagée du processus, fermée à l'arrêt.
+"""
+
 from __future__ import annotations
 
+import atexit
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
 from dataclasses import dataclass
+from typing import Sequence
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
 
 
 @dataclass
@@ -9,32 +31,232 @@ class SmsSendResult:
     provider: str = "stub"
     message_id: str = ""
     error: str = ""
+    # False pour les erreurs définitives (numéro manquant/invalide) : pas de nouvel essai
+    retryable: bool = True
+
+
+@dataclass
+class SmsMessage:
+    phone: str
+    message: str
+
+
+def _missing_phone(provider: str) -> SmsSendResult:
+    return SmsSendResult(success=False, provider=provider, error="Téléphone manquant", retryable=False)
 
 
 class SmsProvider:
-    """Provider SMS (simulation locale).
+    """Interface commune : ``send_sms`` pour un message, ``send_batch`` pour un lot.
+
+    ``batch_size`` indique au dispatcher la taille de lot adaptée au provider.
+    """
+
+    name = "base"
+    batch_size = 1
+
+    @classmethod
+    def from_settings(cls) -> "SmsProvider":
+        return cls()
+
+    def send_sms(self, phone: str, message: str) -> SmsSendResult:
+        raise NotImplementedError
+
+    def send_batch(self, messages: Sequence[SmsMessage]) -> list[SmsSendResult]:
+        """Un résultat par message, dans l'ordre."""
+        return [self.send_sms(phone=m.phone, message=m.message) for m in messages]
+
+    def close(self) -> None:
+        pass
+
+
+class LocalFileSmsProvider(SmsProvider):
+    """Simulation locale : les SMS sont écrits dans un fichier pour vérification (dev)."""
+
+    name = "local_file"
+    batch_size = 100
+
+    def __init__(self, path: str = "logs/sms_outbox.log"):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "LocalFileSmsProvider":
+        return cls(path=getattr(settings, "SMS_OUTBOX_PATH", "logs/sms_outbox.log"))
+
+    def send_sms(self, phone: str, message: str) -> SmsSendResult:
+        return self.send_batch([SmsMessage(phone=phone, message=message)])[0]
+
+    def send_batch(self, messages: Sequence[SmsMessage]) -> list[SmsSendResult]:
+        timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+        results: list[SmsSendResult] = []
+        lines: list[str] = []
+        for m in messages:
+            if not m.phone:
+                results.append(_missing_phone(self.name))
+                continue
+            lines.append(f"[{timestamp}] TO: {m.phone} | MSG: {m.message}\n")
+            results.append(SmsSendResult(success=True, provider=self.name, message_id=f"local-{uuid.uuid4().hex[:12]}"))
+        if not lines:
+            return results
+
+        try:
+            with self._lock:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+                # Une écriture et un flush par lot, le fichier reste ouvert.
+                self._file.write("".join(lines))
+                self._file.flush()
+        except OSError as exc:
+            return [r if not r.success else SmsSendResult(success=False, provider=self.name, error=str(exc)) for r in results]
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class HttpSmsProvider(SmsProvider):
+    """Passerelle HTTP générique (POST JSON ``{"to", "message", "sender"}``).
 
-    En dev, écrit les SMS dans un fichier local pour vérification.
-    En prod, remplacer par l'intégration d'un fournisseur (Twilio, Orange, MTN, etc.).
+    Les connexions keep-alive sont conservées dans un pool et réutilisées par
+    les threads du dispatcher. Réponse 2xx : succès (``id`` ou ``message_id``
+    du JSON) ; 429 et 5xx : nouvel essai ; autres 4xx : échec définitif.
     """
 
+    name = "http"
+
+    def __init__(self, url: str, *, token: str = "", sender: str = "", timeout: float = 10, pool_size: int = 10):
+        if not url:
+            raise ValueError("SMS_HTTP_URL est requis pour le provider http")
+        parts = urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._host = parts.hostname
+        self._port = parts.port
+        self._path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.sender = sender
+        self.timeout = timeout
+        self._headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if token:
+            self._headers["Authorization"] = f"Bearer {token}"
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=max(1, pool_size))
+
+    @classmethod
+    def from_settings(cls) -> "HttpSmsProvider":
+        return cls(
+            getattr(settings, "SMS_HTTP_URL", ""),
+            token=getattr(settings, "SMS_HTTP_TOKEN", ""),
+            sender=getattr(settings, "SMS_HTTP_SENDER", ""),
+            timeout=getattr(settings, "SMS_HTTP_TIMEOUT", 10),
+            pool_size=getattr(settings, "SMS_CONCURRENCY", 10),
+        )
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connection_class(self._host, self._port, timeout=self.timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
     def send_sms(self, phone: str, message: str) -> SmsSendResult:
         if not phone:
-            return SmsSendResult(success=False, error="Téléphone manquant")
-        
-        # Simulation d'envoi en écrivant dans un fichier log
+            return _missing_phone(self.name)
+        body = json.dumps({"to": phone, "message": message, "sender": self.sender}).encode("utf-8")
+
+        conn = self._acquire()
         try:
-            import os
-            from django.utils import timezone
-            
-            log_dir = "logs"
-            if not os.path.exists(log_dir):
-                os.makedirs(log_dir)
-                
-            timestamp = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-            with open(os.path.join(log_dir, "sms_outbox.log"), "a", encoding="utf-8") as f:
-                f.write(f"[{timestamp}] TO: {phone} | MSG: {message}\n")
-                
-            return SmsSendResult(success=True, provider="local_file", message_id=f"local-{timezone.now().timestamp()}")
-        except Exception as e:
-            return SmsSendResult(success=False, error=str(e))
+            conn.request("POST", self._path, body=body, headers=self._headers)
+            response = conn.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            return SmsSendResult(success=False, provider=self.name, error=str(exc) or exc.__class__.__name__)
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        if 200 <= response.status < 300:
+            try:
+                data = json.loads(payload or b"{}")
+            except ValueError:
+                data = {}
+            message_id = str(data.get("id") or data.get("message_id") or "") if isinstance(data, dict) else ""
+            return SmsSendResult(success=True, provider=self.name, message_id=message_id[:100])
+        return SmsSendResult(
+            success=False,
+            provider=self.name,
+            error=f"HTTP {response.status}: {payload[:200].decode('utf-8', 'replace')}",
+            retryable=response.status == 429 or response.status >= 500,
+        )
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class FakeSmsProvider(SmsProvider):
+    """Provider factice pour les mesures : latence simulée et échecs aléatoires, aucun envoi."""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, seed: int | None = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    def send_sms(self, phone: str, message: str) -> SmsSendResult:
+        if not phone:
+            return _missing_phone(self.name)
+        time.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            return SmsSendResult(success=False, provider=self.name, error="Passerelle indisponible (simulé)")
+        return SmsSendResult(success=True, provider=self.name, message_id=f"fake-{uuid.uuid4().hex[:12]}")
+
+
+SMS_BACKENDS = {
+    "local_file": LocalFileSmsProvider,
+    "http": HttpSmsProvider,
+    "fake": FakeSmsProvider,
+}
+
+
+def load_sms_provider(backend: str | None = None) -> SmsProvider:
+    """Instancie le provider ``backend`` (alias de ``SMS_BACKENDS`` ou chemin pointé)."""
+    backend = backend or getattr(settings, "SMS_BACKEND", "local_file")
+    cls = SMS_BACKENDS.get(backend) or import_string(backend)
+    return cls.from_settings()
+
+
+_provider: SmsProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_sms_provider() -> SmsProvider:
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = load_sms_provider()
+            atexit.register(_provider.close)
+        return _provider
+
+
+def _reset_after_fork() -> None:
+    global _provider, _provider_lock
+    _provider = None
+    _provider_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
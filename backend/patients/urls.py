@@ -9,6 +9,7 @@ from .views import (
     patient_anonymize,
     patient_create,
     patient_detail,
+    patient_dossier_section,
     patient_export_json,
     patient_list,
     patient_portal_home,
@@ -21,6 +22,7 @@ urlpatterns = [
     path("patients/nouveau/", patient_create, name="patient-create"),
     path("patients/<int:pk>/", patient_detail, name="patient-detail"),
     path("patients/<int:pk>/modifier/", patient_update, name="patient-update"),
+    path("patients/<int:pk>/dossier/<slug:section>/", patient_dossier_section, name="patient-dossier-section"),
     path("patients/<int:pk>/export.json", patient_export_json, name="patient-export-json"),
     path("patients/<int:pk>/anonymiser/", patient_anonymize, name="patient-anonymize"),
     path("patients/<int:pk>/cpn/nouveau/", cpn_create, name="cpn-create"),
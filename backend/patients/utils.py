@@ -1,19 +1,46 @@
-from io import BytesIO
+from typing import Iterable
 
+from django.db import transaction
 from django.http import HttpResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
 
+from core.pdf import PdfBusyError, PdfRenderError, PdfTimeoutError, get_cache, invalidate, render_pdf
 
-def render_to_pdf(template_name: str, context: dict, filename: str) -> HttpResponse:
-    template = get_template(template_name)
-    html = template.render(context)
+# Champs du patient imprimés sur l'ordonnance PDF.
+PDF_PATIENT_FIELDS = frozenset({"code_patient", "nom", "prenoms"})
 
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("utf-8")), result)
-    if pdf.err:
+
+def invalidate_patient_pdfs(patient_ids: Iterable[int]) -> None:
+    """Supprime (après commit) les PDF en cache des ordonnances de ces patients.
+
+    À appeler par les écritures groupées (``update``, upsert) qui ne déclenchent
+    pas les signaux ; un enregistrement unitaire est couvert par ``post_save``.
+    """
+    if get_cache() is None:
+        return
+    from .models import Ordonnance
+
+    ids = list(Ordonnance.objects.filter(patient_id__in=list(patient_ids)).values_list("pk", flat=True))
+
+    def drop() -> None:
+        for pk in ids:
+            invalidate(f"ordonnances/{pk}")
+
+    if ids:
+        transaction.on_commit(drop)
+
+
+def render_to_pdf(template_name: str, context: dict, filename: str, *, cache_namespace: str | None = None) -> HttpResponse:
+    try:
+        content = render_pdf(template_name, context, cache_namespace=cache_namespace)
+    except PdfBusyError:
+        response = HttpResponse("Génération PDF saturée, réessayez dans un instant", status=503)
+        response["Retry-After"] = "5"
+        return response
+    except PdfTimeoutError:
+        return HttpResponse("Génération PDF trop longue", status=504)
+    except PdfRenderError:
         return HttpResponse("Erreur génération PDF", status=500)
 
-    response = HttpResponse(result.getvalue(), content_type="application/pdf")
+    response = HttpResponse(content, content_type="application/pdf")
     response["Content-Disposition"] = f'inline; filename="{filename}"'
     return response
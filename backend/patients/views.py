@@ -1,16 +1,19 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
 
 from django.forms import inlineformset_factory
 
 from accounts.permissions import role_required
 
 from audit.models import AuditLog
-from audit.utils import log_action
+from audit.utils import log_action, request_audit_fields
+from core.keyset import parse_limit
 
+from .anonymization import anonymize_patients
+from .dossier import SECTIONS, load_dossier, section_page
+from .export import iter_patient_json
 from .forms import (
     ConsultationForm,
     LigneOrdonnanceForm,
@@ -19,18 +22,13 @@ from .forms import (
     RendezVousForm,
     SuiviCPNForm,
 )
+from .listing import patient_page, zone_counts
 from .models import LigneOrdonnance, Ordonnance, Patient
+from .search import search_patients
+from .sms_dispatch import SmsJob, send_sms_async
 from .utils import render_to_pdf
 
 
-def _json_safe(value):
-    if value is None:
-        return None
-    if hasattr(value, "isoformat"):
-        return value.isoformat()
-    return value
-
-
 @login_required
 @role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE", "PSYCHOLOGUE")
 def patient_list(request):
@@ -39,25 +37,43 @@ def patient_list(request):
     sexe = (request.GET.get("sexe") or "").strip()
 
     qs = Patient.objects.all()
-    if q:
-        qs = qs.filter(
-            Q(code_patient__icontains=q)
-            | Q(nom__icontains=q)
-            | Q(prenoms__icontains=q)
-            | Q(telephone__icontains=q)
-        )
     if zone:
         qs = qs.filter(zone=zone)
     if sexe:
         qs = qs.filter(sexe=sexe)
+    if q:
+        qs = search_patients(q, qs)
+
+    counts = zone_counts()
+    kpi_total = sum(counts.values())
+    if q or sexe:
+        kpi_results = qs.count()
+    else:
+        kpi_results = counts.get(zone, 0) if zone else kpi_total
+
+    page = patient_page(
+        qs,
+        cursor=request.GET.get("apres"),
+        page_size=getattr(settings, "PATIENT_PAGE_SIZE", 50),
+        ranked=bool(q),
+    )
+    params = request.GET.copy()
+    params.pop("apres", None)
+    first_query = params.urlencode() if "apres" in request.GET else None
+    next_query = None
+    if page["next_cursor"]:
+        params["apres"] = page["next_cursor"]
+        next_query = params.urlencode()
 
     context = {
-        "patients": qs,
+        "patients": page["patients"],
+        "next_query": next_query,
+        "first_query": first_query,
+        "zone_choices": Patient._meta.get_field("zone").choices,
         "filters": {"q": q, "zone": zone, "sexe": sexe},
-        "kpi_total": Patient.objects.count(),
-        "kpi_results": qs.count(),
-        "kpi_gb": Patient.objects.filter(zone="GRAND_BASSAM").count(),
-        "kpi_bon": Patient.objects.filter(zone="BONOUA").count(),
+        "kpi_total": kpi_total,
+        "kpi_results": kpi_results,
+        "kpi_zones": [(label, counts.get(code, 0)) for code, label in Patient._meta.get_field("zone").choices],
     }
     return render(request, "patients/patient_list.html", context)
 
@@ -65,10 +81,27 @@ def patient_list(request):
 @login_required
 @role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE", "PSYCHOLOGUE")
 def patient_detail(request, pk: int):
-    patient = get_object_or_404(Patient, pk=pk)
+    patient = load_dossier(pk)
+    if patient is None:
+        raise Http404
     return render(request, "patients/patient_detail.html", {"patient": patient})
 
 
+@login_required
+@role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE", "PSYCHOLOGUE")
+def patient_dossier_section(request, pk: int, section: str):
+    """Suite d'une rubrique du dossier en JSON (bouton « Voir plus »)."""
+    if section not in SECTIONS:
+        raise Http404
+    patient = get_object_or_404(Patient.objects.only("id"), pk=pk)
+    limit = parse_limit(request.GET.get("limit"), 100)
+    try:
+        page = section_page(patient, section, cursor=request.GET.get("apres"), limit=limit)
+    except ValueError:
+        raise Http404("Curseur invalide.")
+    return JsonResponse(page)
+
+
 @login_required
 def patient_portal_home(request):
     patient = get_object_or_404(Patient.objects.select_related("user"), user=request.user)
@@ -147,7 +180,7 @@ def cpn_create(request, pk: int):
     return render(request, "patients/cpn_form.html", {"form": form, "patient": patient})
 
 
-from messaging.models import Notification
+from messaging.services import notify
 
 @login_required
 @role_required("ADMIN", "MEDECIN", "SAGE_FEMME", "AGENT_COMMUNAUTAIRE")
@@ -163,15 +196,20 @@ def rdv_create(request, pk: int):
 
             # Notification au patient si compte lié
             if patient.user:
-                Notification.objects.create(
-                    user=patient.user,
-                    type=Notification.TYPE_MESSAGE,
+                notify(
+                    [patient.user],
                     titre="Nouveau rendez-vous",
                     corps=f"Rendez-vous planifié le {rdv.date_heure:%d/%m/%Y à %H:%M} pour : {rdv.objet}",
-                    url="/mon-espace/"
+                    url="/mon-espace/",
+                )
+                # SMS de confirmation, envoyé en tâche de fond après le commit
+                send_sms_async(
+                    SmsJob(
+                        rendez_vous_id=rdv.pk,
+                        phone=(patient.telephone or "").strip(),
+                        message=f"RDV le {rdv.date_heure:%d/%m/%Y à %H:%M} - ADJAHI",
+                    )
                 )
-                # Simulation SMS
-                print(f"[SMS SIMULATION] To: {patient.telephone} | Msg: RDV le {rdv.date_heure:%d/%m/%Y à %H:%M} - ADJAHI")
 
             return redirect("patient-detail", pk=patient.pk)
     else:
@@ -258,6 +296,7 @@ def ordonnance_pdf(request, pk: int, ordonnance_id: int):
         "patients/ordonnance_pdf.html",
         {"patient": patient, "ordonnance": ordonnance},
         filename=filename,
+        cache_namespace=f"ordonnances/{ordonnance.pk}",
     )
 
 
@@ -266,116 +305,6 @@ def ordonnance_pdf(request, pk: int, ordonnance_id: int):
 def patient_export_json(request, pk: int):
     patient = get_object_or_404(Patient, pk=pk)
 
-    ordonnances = (
-        patient.ordonnances.prefetch_related("lignes")
-        .all()
-        .order_by("-date", "-id")
-    )
-
-    community_dossiers = (
-        patient.dossiers_communautaires.select_related("pathologie")
-        .prefetch_related("suivis")
-        .all()
-        .order_by("-date_diagnostic", "-id")
-    )
-
-    payload = {
-        "patient": {
-            "id": patient.id,
-            "code_patient": patient.code_patient,
-            "nom": patient.nom,
-            "prenoms": patient.prenoms,
-            "date_naissance": _json_safe(patient.date_naissance),
-            "sexe": patient.sexe,
-            "telephone": patient.telephone,
-            "adresse": patient.adresse,
-            "zone": patient.zone,
-            "antecedents": patient.antecedents,
-            "created_at": _json_safe(patient.created_at),
-            "updated_at": _json_safe(patient.updated_at),
-        },
-        "cpn": [
-            {
-                "id": s.id,
-                "numero": s.numero,
-                "date": _json_safe(s.date),
-                "notes": s.notes,
-                "created_at": _json_safe(s.created_at),
-            }
-            for s in patient.suivis_cpn.all().order_by("numero")
-        ],
-        "rendez_vous": [
-            {
-                "id": r.id,
-                "date_heure": _json_safe(r.date_heure),
-                "objet": r.objet,
-                "statut": r.statut,
-                "created_at": _json_safe(r.created_at),
-            }
-            for r in patient.rendez_vous.all().order_by("-date_heure")
-        ],
-        "consultations": [
-            {
-                "id": c.id,
-                "date_consultation": _json_safe(c.date_consultation),
-                "motif": c.motif,
-                "observation": c.observation,
-                "created_at": _json_safe(c.created_at),
-            }
-            for c in patient.consultations.all().order_by("-date_consultation")
-        ],
-        "ordonnances": [
-            {
-                "id": o.id,
-                "date": _json_safe(o.date),
-                "diagnostic": o.diagnostic,
-                "instructions": o.instructions,
-                "created_at": _json_safe(o.created_at),
-                "lignes": [
-                    {
-                        "id": l.id,
-                        "medicament": l.medicament,
-                        "posologie": l.posologie,
-                        "duree": l.duree,
-                        "commentaire": l.commentaire,
-                    }
-                    for l in o.lignes.all().order_by("id")
-                ],
-            }
-            for o in ordonnances
-        ],
-        "community": [
-            {
-                "id": d.id,
-                "pathologie": {
-                    "id": d.pathologie_id,
-                    "code": d.pathologie.code,
-                    "nom": d.pathologie.nom,
-                },
-                "date_diagnostic": _json_safe(d.date_diagnostic),
-                "statut": d.statut,
-                "notes": d.notes,
-                "created_at": _json_safe(d.created_at),
-                "suivis": [
-                    {
-                        "id": s.id,
-                        "date": _json_safe(s.date),
-                        "traitement": s.traitement,
-                        "observation": s.observation,
-                        "created_at": _json_safe(s.created_at),
-                    }
-                    for s in d.suivis.all().order_by("-date", "-id")
-                ],
-            }
-            for d in community_dossiers
-        ],
-        "export": {
-            "exported_at": _json_safe(timezone.now()),
-            "exported_by": getattr(request.user, "username", None),
-            "format": "json",
-        },
-    }
-
     log_action(
         request,
         action=AuditLog.ACTION_EXPORT,
@@ -383,8 +312,12 @@ def patient_export_json(request, pk: int):
         extra={"format": "json"},
     )
 
+    # Document écrit rubrique par rubrique (voir patients/export.py)
     filename = f"patient_{patient.code_patient}.json"
-    response = JsonResponse(payload, json_dumps_params={"ensure_ascii": False})
+    response = StreamingHttpResponse(
+        (chunk.encode("utf-8") for chunk in iter_patient_json(patient, exported_by=request.user.get_username())),
+        content_type="application/json",
+    )
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
@@ -396,22 +329,6 @@ def patient_anonymize(request, pk: int):
         return redirect("patient-detail", pk=pk)
 
     patient = get_object_or_404(Patient, pk=pk)
-
-    original_code = patient.code_patient
-
-    patient.nom = "ANONYMISE"
-    patient.prenoms = f"PATIENT_{patient.pk}"
-    patient.telephone = ""
-    patient.adresse = ""
-    patient.antecedents = ""
-    patient.date_naissance = None
-    patient.save(update_fields=["nom", "prenoms", "telephone", "adresse", "antecedents", "date_naissance", "updated_at"])
-
-    log_action(
-        request,
-        action=AuditLog.ACTION_UPDATE,
-        instance=patient,
-        extra={"anonymized": True, "previous_code_patient": original_code},
-    )
+    anonymize_patients(Patient.objects.filter(pk=patient.pk), audit=request_audit_fields(request))
 
     return redirect("patient-detail", pk=patient.pk)
@@ -5,6 +5,7 @@ from .models import Rapport
 
 @admin.register(Rapport)
 class RapportAdmin(admin.ModelAdmin):
-    list_display = ("type", "created_by", "created_at")
-    list_filter = ("type", "created_at")
+    list_display = ("type", "status", "progress", "created_by", "created_at", "finished_at")
+    list_filter = ("type", "status", "created_at")
     search_fields = ("type", "created_by__username")
+    readonly_fields = ("params_hash", "started_at", "finished_at")
@@ -1,67 +1,51 @@
+"""Exports Excel en flux : lecture par paquets (keyset) et écriture au fil de l'eau."""
+
 from __future__ import annotations
 
-from io import BytesIO
+from typing import Iterator
 
-from patients.models import Consultation, Patient
+from django.conf import settings
 
+from core.keyset import iter_keyset
+from patients.models import Consultation, Patient
 
-def export_patients_xlsx() -> bytes:
-    try:
-        from openpyxl import Workbook
-    except ModuleNotFoundError as exc:
-        raise ModuleNotFoundError(
-            "Dépendance manquante: openpyxl. Installe-la avec: pip install -r requirements.txt"
-        ) from exc
+from .xlsx import stream_xlsx
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Patients"
 
-    ws.append(["Code", "Nom", "Prénoms", "Sexe", "Date naissance", "Téléphone", "Zone", "Adresse"])
+def _chunk_size() -> int:
+    return int(getattr(settings, "EXPORT_CHUNK_SIZE", 2000))
 
-    for p in Patient.objects.all().order_by("nom", "prenoms"):
-        ws.append(
-            [
-                p.code_patient,
-                p.nom,
-                p.prenoms,
-                p.sexe,
-                str(p.date_naissance or ""),
-                p.telephone,
-                p.get_zone_display(),
-                p.adresse,
-            ]
-        )
 
-    out = BytesIO()
-    wb.save(out)
-    return out.getvalue()
+def iter_patient_rows(chunk_size: int | None = None) -> Iterator[list]:
+    zones = dict(Patient._meta.get_field("zone").choices)
+    rows = iter_keyset(
+        Patient.objects.all(),
+        ("nom", "prenoms", "id"),
+        ("code_patient", "nom", "prenoms", "sexe", "date_naissance", "telephone", "zone", "adresse"),
+        chunk_size=chunk_size or _chunk_size(),
+    )
+    for code, nom, prenoms, sexe, date_naissance, telephone, zone, adresse in rows:
+        yield [code, nom, prenoms, sexe, str(date_naissance or ""), telephone, zones.get(zone, zone), adresse]
 
 
-def export_consultations_xlsx() -> bytes:
-    try:
-        from openpyxl import Workbook
-    except ModuleNotFoundError as exc:
-        raise ModuleNotFoundError(
-            "Dépendance manquante: openpyxl. Installe-la avec: pip install -r requirements.txt"
-        ) from exc
+def iter_consultation_rows(chunk_size: int | None = None) -> Iterator[list]:
+    rows = iter_keyset(
+        Consultation.objects.all(),
+        ("-date_consultation", "-id"),
+        ("patient__code_patient", "patient__nom", "patient__prenoms", "date_consultation", "motif", "observation"),
+        chunk_size=chunk_size or _chunk_size(),
+    )
+    for code, nom, prenoms, date_consultation, motif, observation in rows:
+        yield [f"{code} - {nom} {prenoms}", date_consultation.strftime("%Y-%m-%d %H:%M"), motif, observation]
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Consultations"
 
-    ws.append(["Patient", "Date", "Motif", "Observation"])
+def export_patients_xlsx() -> Iterator[bytes]:
+    return stream_xlsx(
+        "Patients",
+        ["Code", "Nom", "Prénoms", "Sexe", "Date naissance", "Téléphone", "Zone", "Adresse"],
+        iter_patient_rows(),
+    )
 
-    for c in Consultation.objects.select_related("patient").all().order_by("-date_consultation"):
-        ws.append(
-            [
-                f"{c.patient.code_patient} - {c.patient.nom} {c.patient.prenoms}",
-                c.date_consultation.strftime("%Y-%m-%d %H:%M"),
-                c.motif,
-                c.observation,
-            ]
-        )
 
-    out = BytesIO()
-    wb.save(out)
-    return out.getvalue()
+def export_consultations_xlsx() -> Iterator[bytes]:
+    return stream_xlsx("Consultations", ["Patient", "Date", "Motif", "Observation"], iter_consultation_rows())
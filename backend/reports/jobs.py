@@ -0,0 +1,246 @@
+"""File de génération des rapports : la table ``Rapport`` sert de file d'attente.
+
+Les vues déposent une demande (``enqueue``) ; un worker la réserve avec
+``select_for_update(skip_locked=True)``, génère le fichier sous ``MEDIA_ROOT``
+et met à jour statut et progression. Le worker tourne dans un thread du
+processus web (``REPORT_WORKER_EMBEDDED``) et/ou via ``run_report_worker``.
+
+Une demande identique (même type, mêmes paramètres) en cours, ou terminée
+depuis moins de ``REPORT_REUSE_SECONDS``, est réutilisée au lieu d'être refaite.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.pdf import render_pdf
+from patients.models import Consultation, Patient, RendezVous, SuiviCPN
+
+from .exports import iter_consultation_rows, iter_patient_rows
+from .models import Rapport
+from .xlsx import stream_xlsx
+
+logger = logging.getLogger(__name__)
+
+ProgressFn = Callable[[int], None]
+
+
+def params_key(type_: str, params: dict[str, Any]) -> str:
+    payload = json.dumps([type_, params], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Progress:
+    """Met à jour ``Rapport.progress`` au plus une fois par seconde."""
+
+    def __init__(self, rapport: Rapport, total: int):
+        self.rapport = rapport
+        self.total = max(total, 1)
+        self.done = 0
+        self._last_write = 0.0
+
+    def advance(self, n: int = 1) -> None:
+        self.done += n
+        percent = min(99, self.done * 100 // self.total)
+        now = time.monotonic()
+        if percent > self.rapport.progress and now - self._last_write >= 1:
+            self.rapport.progress = percent
+            Rapport.objects.filter(pk=self.rapport.pk).update(progress=percent)
+            self._last_write = now
+
+    def wrap(self, rows: Iterable) -> Iterator:
+        for row in rows:
+            yield row
+            self.advance()
+
+
+def _build_patients_xlsx(rapport: Rapport) -> tuple[str, Iterable[bytes]]:
+    progress = _Progress(rapport, Patient.objects.count())
+    header = ["Code", "Nom", "Prénoms", "Sexe", "Date naissance", "Téléphone", "Zone", "Adresse"]
+    return "patients.xlsx", stream_xlsx("Patients", header, progress.wrap(iter_patient_rows()))
+
+
+def _build_consultations_xlsx(rapport: Rapport) -> tuple[str, Iterable[bytes]]:
+    progress = _Progress(rapport, Consultation.objects.count())
+    header = ["Patient", "Date", "Motif", "Observation"]
+    return "consultations.xlsx", stream_xlsx("Consultations", header, progress.wrap(iter_consultation_rows()))
+
+
+def _build_mensuel_pdf(rapport: Rapport) -> tuple[str, Iterable[bytes]]:
+    month_start = date.fromisoformat(rapport.params["month_start"])
+    content = render_pdf(
+        "reports/rapport_mensuel_pdf.html",
+        {
+            "month_start": month_start,
+            "consultations": Consultation.objects.filter(date_consultation__date__gte=month_start).select_related("patient"),
+            "rdv": RendezVous.objects.filter(date_heure__date__gte=month_start).select_related("patient"),
+            "cpn": SuiviCPN.objects.filter(date__gte=month_start).select_related("patient"),
+        },
+    )
+    return f"rapport_mensuel_{month_start:%Y_%m}.pdf", [content]
+
+
+BUILDERS: dict[str, Callable[[Rapport], tuple[str, Iterable[bytes]]]] = {
+    Rapport.TYPE_PATIENTS_XLSX: _build_patients_xlsx,
+    Rapport.TYPE_CONSULTATIONS_XLSX: _build_consultations_xlsx,
+    Rapport.TYPE_MENSUEL_PDF: _build_mensuel_pdf,
+}
+
+
+def find_reusable(type_: str, key: str) -> Rapport | None:
+    recent = timezone.now() - timedelta(seconds=getattr(settings, "REPORT_REUSE_SECONDS", 900))
+    candidates = (
+        Rapport.objects.filter(type=type_, params_hash=key)
+        .filter(
+            Q(status__in=[Rapport.STATUS_PENDING, Rapport.STATUS_RUNNING])
+            | (Q(status=Rapport.STATUS_DONE, finished_at__gte=recent) & ~Q(fichier=""))
+        )
+        .order_by("-created_at")
+    )
+    for rapport in candidates[:3]:
+        if rapport.status != Rapport.STATUS_DONE or rapport.fichier.storage.exists(rapport.fichier.name):
+            return rapport
+    return None
+
+
+def enqueue(type_: str, params: dict[str, Any] | None = None, user=None) -> tuple[Rapport, bool]:
+    """Dépose une demande de rapport ; renvoie ``(rapport, réutilisé)``."""
+    params = params or {}
+    key = params_key(type_, params)
+    existing = find_reusable(type_, key)
+    if existing is not None:
+        return existing, True
+
+    rapport = Rapport.objects.create(type=type_, params=params, params_hash=key, created_by=user)
+    if getattr(settings, "REPORT_WORKER_EMBEDDED", True):
+        transaction.on_commit(get_embedded_worker().wake)
+    return rapport, False
+
+
+def claim_next() -> Rapport | None:
+    """Réserve la plus ancienne demande en attente (sans bloquer les autres workers)."""
+    while True:
+        with transaction.atomic():
+            rapport = (
+                Rapport.objects.select_for_update(skip_locked=True)
+                .filter(status=Rapport.STATUS_PENDING)
+                .order_by("created_at", "id")
+                .first()
+            )
+            if rapport is None:
+                return None
+            # Mise à jour conditionnelle : protège aussi les bases sans SELECT ... FOR UPDATE.
+            claimed = Rapport.objects.filter(pk=rapport.pk, status=Rapport.STATUS_PENDING).update(
+                status=Rapport.STATUS_RUNNING, started_at=timezone.now(), progress=0, error=""
+            )
+        if claimed:
+            rapport.refresh_from_db()
+            return rapport
+
+
+def run(rapport: Rapport) -> None:
+    try:
+        filename, chunks = BUILDERS[rapport.type](rapport)
+        with tempfile.TemporaryFile() as tmp:
+            for chunk in chunks:
+                tmp.write(chunk)
+            tmp.seek(0)
+            rapport.fichier.save(filename, File(tmp), save=False)
+    except Exception as exc:
+        logger.exception("Génération du rapport %s impossible", rapport.pk)
+        rapport.status = Rapport.STATUS_FAILED
+        rapport.error = str(exc) or exc.__class__.__name__
+    else:
+        rapport.status = Rapport.STATUS_DONE
+        rapport.progress = 100
+    rapport.finished_at = timezone.now()
+    rapport.save(update_fields=["status", "progress", "error", "fichier", "finished_at"])
+
+
+def fail_stale() -> int:
+    """Passe en échec les rapports « en cours » dont le worker a disparu."""
+    limit = timezone.now() - timedelta(seconds=getattr(settings, "REPORT_JOB_TIMEOUT", 1800))
+    return Rapport.objects.filter(status=Rapport.STATUS_RUNNING, started_at__lt=limit).update(
+        status=Rapport.STATUS_FAILED, error="Génération interrompue (délai dépassé)", finished_at=timezone.now()
+    )
+
+
+def run_pending(limit: int | None = None) -> int:
+    """Traite les demandes en attente ; renvoie le nombre de rapports traités."""
+    fail_stale()
+    done = 0
+    while limit is None or done < limit:
+        rapport = claim_next()
+        if rapport is None:
+            break
+        run(rapport)
+        done += 1
+    return done
+
+
+class EmbeddedWorker:
+    """Thread de fond qui vide la file ; réveillé à chaque demande, sinon par sondage."""
+
+    def __init__(self, poll_interval: int):
+        self.poll_interval = max(1, int(poll_interval))
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def wake(self) -> None:
+        self._ensure_started()
+        self._wake.set()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="report-worker", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                run_pending()
+            except Exception:
+                logger.exception("Worker rapports: erreur, nouvel essai au prochain réveil")
+            finally:
+                connections.close_all()
+
+
+_worker: EmbeddedWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def get_embedded_worker() -> EmbeddedWorker:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = EmbeddedWorker(poll_interval=getattr(settings, "REPORT_WORKER_POLL_INTERVAL", 5))
+        return _worker
+
+
+def _reset_after_fork() -> None:
+    global _worker, _worker_lock
+    _worker = None
+    _worker_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
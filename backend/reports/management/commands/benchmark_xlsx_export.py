@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from reports.exports import iter_consultation_rows
+from reports.xlsx import stream_xlsx
+
+
+def _synthetic_rows(count: int):
+    start = datetime(2024, 1, 1, 8, 0)
+    for i in range(count):
+        yield [
+            f"P{i:07d} - NOM{i % 977} Prénoms {i % 131}",
+            (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M"),
+            "Consultation de suivi",
+            f"Observation n°{i}: tension normale, poids stable, RAS.",
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure l'export Excel des consultations en flux (durée, taille, pic mémoire Python). "
+        "Par défaut sur 500 000 lignes synthétiques ; --db utilise les consultations en base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000, help="Nombre de lignes synthétiques")
+        parser.add_argument("--db", action="store_true", help="Exporte les consultations de la base")
+        parser.add_argument("--output", default="", help="Fichier de sortie (sinon le flux est seulement compté)")
+
+    def handle(self, *args, **options):
+        rows = iter_consultation_rows() if options["db"] else _synthetic_rows(options["rows"])
+        out = open(options["output"], "wb") if options["output"] else None
+
+        tracemalloc.start()
+        started = time.monotonic()
+        size = 0
+        try:
+            for chunk in stream_xlsx("Consultations", ["Patient", "Date", "Motif", "Observation"], rows):
+                size += len(chunk)
+                if out is not None:
+                    out.write(chunk)
+        finally:
+            elapsed = time.monotonic() - started
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if out is not None:
+                out.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Export: {size / 1_048_576:.1f} Mo en {elapsed:.1f}s, pic mémoire Python {peak / 1_048_576:.1f} Mo"
+            )
+        )
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from reports.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Génère les rapports en attente (file Rapport). Plusieurs workers peuvent tourner en parallèle."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Traite la file puis s'arrête")
+        parser.add_argument("--interval", type=int, default=5, help="Délai entre deux sondages (secondes)")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            done = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Rapports générés: {done}"))
+            return
+
+        self.stdout.write("Worker rapports démarré (Ctrl+C pour arrêter)")
+        try:
+            while True:
+                done = run_pending()
+                if done:
+                    self.stdout.write(f"Rapports générés: {done}")
+                connections.close_all()
+                time.sleep(max(1, options["interval"]))
+        except KeyboardInterrupt:
+            self.stdout.write("Worker rapports arrêté")
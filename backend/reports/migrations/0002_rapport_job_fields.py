@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_legacy_done(apps, schema_editor):
+    # Rapports antérieurs : générés de façon synchrone, sans fichier conservé.
+    Rapport = apps.get_model("reports", "Rapport")
+    Rapport.objects.update(status="DONE", progress=100, finished_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapport',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='fichier',
+            field=models.FileField(blank=True, upload_to='rapports/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='params_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('DONE', 'Terminé'), ('FAILED', 'Échec')], default='PENDING', max_length=10),
+        ),
+        migrations.RunPython(mark_legacy_done, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='rapport',
+            index=models.Index(fields=['status', 'created_at'], name='rapport_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rapport',
+            index=models.Index(fields=['type', 'params_hash', 'status'], name='rapport_reuse_idx'),
+        ),
+    ]
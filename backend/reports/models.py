@@ -3,6 +3,8 @@ from django.db import models
 
 
 class Rapport(models.Model):
+    """Demande de rapport, générée en tâche de fond (voir ``reports.jobs``)."""
+
     TYPE_PATIENTS_XLSX = "PATIENTS_XLSX"
     TYPE_CONSULTATIONS_XLSX = "CONSULTATIONS_XLSX"
     TYPE_MENSUEL_PDF = "MENSUEL_PDF"
@@ -13,11 +15,42 @@ class Rapport(models.Model):
         (TYPE_MENSUEL_PDF, "Rapport Mensuel (PDF)"),
     ]
 
+    STATUS_PENDING = "PENDING"
+    STATUS_RUNNING = "RUNNING"
+    STATUS_DONE = "DONE"
+    STATUS_FAILED = "FAILED"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En attente"),
+        (STATUS_RUNNING, "En cours"),
+        (STATUS_DONE, "Terminé"),
+        (STATUS_FAILED, "Échec"),
+    ]
+
     type = models.CharField(max_length=30, choices=TYPE_CHOICES)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     params = models.JSONField(default=dict, blank=True)
+    # Empreinte (type + paramètres) pour réutiliser un fichier récent identique
+    params_hash = models.CharField(max_length=64, blank=True, default="")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    fichier = models.FileField(upload_to="rapports/%Y/%m/", blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="rapport_status_created_idx"),
+            models.Index(fields=["type", "params_hash", "status"], name="rapport_reuse_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.type} - {self.created_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
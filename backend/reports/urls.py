@@ -1,10 +1,21 @@
 from django.urls import path
 
-from .views import export_consultations, export_patients, rapport_mensuel_pdf, reports_home
+from .views import (
+    export_consultations,
+    export_patients,
+    rapport_detail,
+    rapport_download,
+    rapport_mensuel_pdf,
+    rapport_status,
+    reports_home,
+)
 
 urlpatterns = [
     path("reports/", reports_home, name="reports-home"),
     path("reports/patients.xlsx", export_patients, name="reports-patients-xlsx"),
     path("reports/consultations.xlsx", export_consultations, name="reports-consultations-xlsx"),
     path("reports/rapport-mensuel.pdf", rapport_mensuel_pdf, name="reports-mensuel-pdf"),
+    path("reports/rapports/<int:pk>/", rapport_detail, name="reports-rapport-detail"),
+    path("reports/rapports/<int:pk>/status/", rapport_status, name="reports-rapport-status"),
+    path("reports/rapports/<int:pk>/download/", rapport_download, name="reports-rapport-download"),
 ]
@@ -3,51 +3,49 @@ from __future__ import annotations
 from datetime import date
 
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 
 from accounts.permissions import role_required
 from audit.models import AuditLog
 from audit.utils import log_action
-from patients.models import Consultation, RendezVous, SuiviCPN
-from patients.utils import render_to_pdf
 
-from .exports import export_consultations_xlsx, export_patients_xlsx
+from .jobs import enqueue
 from .models import Rapport
 
 
 @login_required
 @role_required("ADMIN", "MEDECIN")
 def reports_home(request):
-    return render(request, "reports/reports_home.html")
+    rapports = Rapport.objects.filter(created_by=request.user).order_by("-created_at")[:10]
+    return render(request, "reports/reports_home.html", {"rapports": rapports})
+
+
+def _request_report(request, type_: str, object_repr: str, params: dict | None = None):
+    rapport, reused = enqueue(type_, params, user=request.user)
+    log_action(
+        request,
+        action=AuditLog.ACTION_EXPORT,
+        app_label="reports",
+        model="rapport",
+        object_id=str(rapport.pk),
+        object_repr=object_repr,
+        extra={**(params or {}), "reused": reused},
+    )
+    return redirect("reports-rapport-detail", pk=rapport.pk)
 
 
 @login_required
 @role_required("ADMIN", "MEDECIN")
 def export_patients(request):
-    Rapport.objects.create(type=Rapport.TYPE_PATIENTS_XLSX, created_by=request.user)
-    log_action(request, action=AuditLog.ACTION_EXPORT, app_label="reports", model="rapport", object_repr="patients.xlsx")
-    content = export_patients_xlsx()
-    response = HttpResponse(content, content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = 'attachment; filename="patients.xlsx"'
-    return response
+    return _request_report(request, Rapport.TYPE_PATIENTS_XLSX, "patients.xlsx")
 
 
 @login_required
 @role_required("ADMIN", "MEDECIN")
 def export_consultations(request):
-    Rapport.objects.create(type=Rapport.TYPE_CONSULTATIONS_XLSX, created_by=request.user)
-    log_action(
-        request,
-        action=AuditLog.ACTION_EXPORT,
-        app_label="reports",
-        model="rapport",
-        object_repr="consultations.xlsx",
-    )
-    content = export_consultations_xlsx()
-    response = HttpResponse(content, content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-    response["Content-Disposition"] = 'attachment; filename="consultations.xlsx"'
-    return response
+    return _request_report(request, Rapport.TYPE_CONSULTATIONS_XLSX, "consultations.xlsx")
 
 
 @login_required
@@ -56,29 +54,46 @@ def rapport_mensuel_pdf(request):
     # Période: mois en cours
     today = date.today()
     month_start = today.replace(day=1)
-
-    consultations = Consultation.objects.filter(date_consultation__date__gte=month_start)
-    rdv = RendezVous.objects.filter(date_heure__date__gte=month_start)
-    cpn = SuiviCPN.objects.filter(date__gte=month_start)
-
-    Rapport.objects.create(type=Rapport.TYPE_MENSUEL_PDF, created_by=request.user, params={"month_start": str(month_start)})
-    log_action(
+    return _request_report(
         request,
-        action=AuditLog.ACTION_EXPORT,
-        app_label="reports",
-        model="rapport",
-        object_repr=f"rapport_mensuel_{today:%Y_%m}.pdf",
-        extra={"month_start": str(month_start)},
+        Rapport.TYPE_MENSUEL_PDF,
+        f"rapport_mensuel_{today:%Y_%m}.pdf",
+        params={"month_start": str(month_start)},
     )
 
-    filename = f"rapport_mensuel_{today:%Y_%m}.pdf"
-    return render_to_pdf(
-        "reports/rapport_mensuel_pdf.html",
+
+@login_required
+@role_required("ADMIN", "MEDECIN")
+def rapport_detail(request, pk: int):
+    rapport = get_object_or_404(Rapport, pk=pk)
+    return render(request, "reports/rapport_detail.html", {"rapport": rapport})
+
+
+@login_required
+@role_required("ADMIN", "MEDECIN")
+def rapport_status(request, pk: int):
+    rapport = get_object_or_404(Rapport, pk=pk)
+    return JsonResponse(
         {
-            "month_start": month_start,
-            "consultations": consultations.select_related("patient"),
-            "rdv": rdv.select_related("patient"),
-            "cpn": cpn.select_related("patient"),
-        },
-        filename=filename,
+            "id": rapport.pk,
+            "type": rapport.type,
+            "status": rapport.status,
+            "progress": rapport.progress,
+            "error": rapport.error,
+            "download_url": reverse("reports-rapport-download", args=[rapport.pk]) if rapport.fichier else None,
+        }
     )
+
+
+@login_required
+@role_required("ADMIN", "MEDECIN")
+def rapport_download(request, pk: int):
+    rapport = get_object_or_404(Rapport, pk=pk, status=Rapport.STATUS_DONE)
+    if not rapport.fichier:
+        raise Http404
+    try:
+        fh = rapport.fichier.open("rb")
+    except FileNotFoundError as exc:
+        raise Http404 from exc
+    filename = rapport.fichier.name.rsplit("/", 1)[-1]
+    return FileResponse(fh, as_attachment=not filename.endswith(".pdf"), filename=filename)
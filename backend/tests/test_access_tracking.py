@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase
+
+from patients import access_tracking
+from patients.access_tracking import AccessTracker
+from patients.models import Patient
+
+
+class AccessTrackerTests(TestCase):
+    def setUp(self):
+        self.p1 = Patient.objects.create(code_patient="P-1", nom="KOUASSI", prenoms="Awa")
+        self.p2 = Patient.objects.create(code_patient="P-2", nom="YAO", prenoms="Kader")
+
+    def test_accesses_are_coalesced_into_one_update(self):
+        tracker = AccessTracker(flush_interval=3600, dedup_window=300)
+        tracker._ensure_started = lambda: None  # pas de thread en test
+
+        for _ in range(10):
+            tracker.record(self.p1.pk)
+        tracker.record(self.p2.pk)
+
+        self.assertEqual(len(tracker._pending), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(tracker.flush(), 2)
+
+        self.p1.refresh_from_db()
+        self.assertIsNotNone(self.p1.date_dernier_acces)
+
+    def test_repeated_hits_within_window_are_ignored(self):
+        tracker = AccessTracker(flush_interval=3600, dedup_window=300)
+        tracker._ensure_started = lambda: None
+
+        tracker.record(self.p1.pk)
+        tracker.flush()
+        tracker.record(self.p1.pk)
+        self.assertEqual(tracker.flush(), 0)
+
+    def test_shutdown_skips_final_flush_when_idle_or_database_gone(self):
+        tracker = AccessTracker(flush_interval=3600, dedup_window=300)
+        tracker._ensure_started = lambda: None
+        with self.assertNumQueries(0):
+            tracker.shutdown()
+
+        tracker.record(self.p1.pk)
+        with mock.patch.object(access_tracking, "_database_ready", return_value=False), self.assertLogs(
+            "patients.access_tracking", "WARNING"
+        ) as logs, self.assertNumQueries(0):
+            tracker.shutdown()
+        self.assertIn("1 accès patients non écrits", logs.output[0])
+
+        with mock.patch.object(tracker, "flush", side_effect=OperationalError("no such table")), self.assertLogs(
+            "patients.access_tracking", "WARNING"
+        ) as logs:
+            tracker.shutdown()
+        self.assertIn("no such table", logs.output[0])
+
+        tracker.shutdown()
+        self.p1.refresh_from_db()
+        self.assertIsNotNone(self.p1.date_dernier_acces)
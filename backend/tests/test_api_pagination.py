@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.keyset import encode_cursor
+from patients.models import Consultation, Patient
+
+User = get_user_model()
+
+
+class ApiPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="u1", password="pw1"))
+        self.patient = Patient.objects.create(code_patient="P-1", nom="TOURE", prenoms="Mariam")
+        now = timezone.now().replace(microsecond=0)
+        # Dates en double pour vérifier le départage par id
+        for i in range(7):
+            Consultation.objects.create(patient=self.patient, date_consultation=now - timedelta(days=i // 2))
+
+    def _walk(self, url, key="next"):
+        ids = []
+        pages = []
+        while url:
+            data = self.client.get(url).json()
+            pages.append(data)
+            ids.extend(r["id"] for r in data["results"])
+            url = data[key]
+        return ids, pages
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        expected = list(Consultation.objects.order_by("-date_consultation", "id").values_list("id", flat=True))
+        ids, pages = self._walk("/api/consultations/?page_size=3")
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]["previous"])
+
+        back = self.client.get(pages[-1]["previous"]).json()
+        self.assertEqual([r["id"] for r in back["results"]], expected[3:6])
+
+    def test_fields_param_does_not_drop_written_data(self):
+        response = self.client.post(
+            "/api/consultations/?fields=id",
+            {"patient": self.patient.pk, "date_consultation": timezone.now().isoformat(), "motif": "Toux"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Consultation.objects.get(pk=response.json()["id"]).motif, "Toux")
+
+        response = self.client.patch(
+            f"/api/patients/{self.patient.pk}/?fields=id", {"nom": "KONE"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.nom, "KONE")
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/api/consultations/?cursor=!!").status_code, 404)
+        for url, values in (
+            ("/api/patients/", ["a", "b", "zz", 0]),
+            ("/api/patients/", ["a", "b", 1, 5]),
+            ("/api/consultations/", ["notadate", 1, 0]),
+            ("/api/consultations/", [None, 1, 0]),
+        ):
+            response = self.client.get(url, {"cursor": encode_cursor(values)})
+            self.assertEqual(response.status_code, 404, values)
+
+    def test_fields_and_expand(self):
+        data = self.client.get("/api/consultations/?page_size=1&fields=id,patient&expand=patient").json()
+        row = data["results"][0]
+        self.assertEqual(set(row), {"id", "patient"})
+        self.assertEqual(row["patient"]["code_patient"], "P-1")
+
+    def test_etag_not_modified(self):
+        response = self.client.get("/api/patients/")
+        etag = response["ETag"]
+        self.assertEqual(self.client.get("/api/patients/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Patient.objects.create(code_patient="P-2", nom="BAMBA", prenoms="Sadio")
+        self.assertEqual(self.client.get("/api/patients/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
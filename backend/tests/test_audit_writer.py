@@ -0,0 +1,68 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from audit.models import AuditLog
+from audit.writer import AuditLogWriter
+
+
+def _fields(action, object_id):
+    return {
+        "user_id": None,
+        "action": action,
+        "app_label": "patients",
+        "model": "patient",
+        "object_id": object_id,
+        "object_repr": "",
+        "ip_address": "",
+        "user_agent": "",
+        "extra": {},
+        "created_at": timezone.now().isoformat(),
+    }
+
+
+class AuditLogWriterTests(TransactionTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool_dir = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batches_are_flushed_in_order(self):
+        writer = AuditLogWriter(batch_size=50, flush_interval_ms=60_000, spool_dir=self.spool_dir)
+        for i in range(5):
+            writer.submit(_fields(AuditLog.ACTION_ACCESS, str(i)))
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+        writer.submit(_fields(AuditLog.ACTION_CREATE, "5"), wait=True)
+        ids = list(AuditLog.objects.order_by("id").values_list("object_id", flat=True))
+        self.assertEqual(ids, ["0", "1", "2", "3", "4", "5"])
+
+        writer.shutdown()
+        self.assertEqual(writer._spool.path.read_text(encoding="utf-8"), "")
+
+    def test_shutdown_flushes_pending_entries(self):
+        writer = AuditLogWriter(batch_size=50, flush_interval_ms=60_000)
+        writer.submit(_fields(AuditLog.ACTION_ACCESS, "1"))
+        writer.shutdown()
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_orphan_spool_is_replayed_from_offset(self):
+        # pid improbable : considéré comme un processus terminé
+        orphan = self.spool_dir / "audit-999999999.jsonl"
+        lines = [json.dumps(_fields(AuditLog.ACTION_ACCESS, str(i))) for i in range(3)]
+        orphan.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        orphan.with_suffix(".offset").write_text("1", encoding="utf-8")
+
+        writer = AuditLogWriter(batch_size=50, flush_interval_ms=10, spool_dir=self.spool_dir)
+        writer.start()
+        writer.flush()
+        writer.shutdown()
+
+        ids = sorted(AuditLog.objects.values_list("object_id", flat=True))
+        self.assertEqual(ids, ["1", "2"])
+        self.assertFalse(orphan.exists())
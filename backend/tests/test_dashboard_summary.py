@@ -0,0 +1,75 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.dashboard import build_summary
+from core.models import DailyZoneKpi
+from core.rollups import refresh
+from patients.models import Consultation, Patient, SuiviCPN
+
+User = get_user_model()
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        today = timezone.localdate()
+        for i, zone in enumerate(["GRAND_BASSAM", "BONOUA", "BONOUA"]):
+            p = Patient.objects.create(code_patient=f"P-{i}", nom="KONE", prenoms=f"Awa {i}", zone=zone)
+            Consultation.objects.create(patient=p, date_consultation=timezone.now())
+            SuiviCPN.objects.create(patient=p, numero=1, date=today - timedelta(days=90))
+
+    def _query_count(self, **kwargs):
+        with CaptureQueriesContext(connection) as ctx:
+            build_summary(**kwargs)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_zones(self):
+        baseline = self._query_count()
+
+        more_zones = ["GRAND_BASSAM", "BONOUA", "ABOISSO", "ADIAKE"]
+        with mock.patch("api.dashboard.zone_codes", return_value=more_zones):
+            self.assertEqual(self._query_count(), baseline)
+            stats = build_summary(fields=["zone_stats"])["zone_stats"]
+
+        self.assertLessEqual(baseline, 6)
+        # repère des agrégats + comptage des patients
+        self.assertEqual(self._query_count(fields=["total_patients"]), 2)
+        self.assertEqual([s["zone"] for s in stats][-2:], ["ABOISSO", "ADIAKE"])
+
+    def test_kpis(self):
+        summary = build_summary(zone="BONOUA")
+        self.assertEqual(summary["kpis"]["total_patients"], 2)
+        self.assertEqual(summary["kpis"]["total_consultations"], 2)
+        self.assertEqual(summary["kpis"]["cpn1"], 2)
+        self.assertEqual(summary["kpis"]["perdues_de_vue"], 2)
+        self.assertEqual(
+            {s["zone"]: s["patients"] for s in summary["zone_stats"]},
+            {"GRAND_BASSAM": 1, "BONOUA": 2},
+        )
+
+    def test_same_values_from_rollups(self):
+        live = build_summary()
+        refresh()
+        self.assertTrue(DailyZoneKpi.objects.exists())
+        self.assertEqual(build_summary(), live)
+
+        baseline = self._query_count()
+        with mock.patch("api.dashboard.zone_codes", return_value=["GRAND_BASSAM", "BONOUA", "ABOISSO"]):
+            self.assertEqual(self._query_count(), baseline)
+
+    def test_fields_selector(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="u1", password="pw1"))
+
+        response = client.get("/api/dashboard/summary/", {"fields": "total_patients"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"kpis": {"total_patients": 3}})
+
+        response = client.get("/api/dashboard/summary/", {"fields": "inconnu"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from messaging.inbox import inbox_page
+from messaging.models import Message, Notification, Thread
+
+User = get_user_model()
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.me = User.objects.create_superuser(username="me", password="pw")
+        self.other = User.objects.create_user(username="other", password="pw")
+        now = timezone.now()
+        self.threads = []
+        for i in range(5):
+            thread = Thread.objects.create(sujet=f"Fil {i}")
+            thread.participants.add(self.me, self.other)
+            self.threads.append(thread)
+        # Activité récente sur le plus ancien fil : il doit remonter en tête.
+        for minutes, text in ((10, "ancien"), (1, "récent")):
+            msg = Message.objects.create(thread=self.threads[0], sender=self.other, contenu=text)
+            Message.objects.filter(pk=msg.pk).update(created_at=now + timedelta(minutes=minutes))
+        Notification.objects.create(user=self.me, titre="x", url=f"/messages/{self.threads[0].pk}/")
+        Notification.objects.create(user=self.me, titre="y", url=f"/messages/{self.threads[0].pk}/", lu=True)
+        hidden = Thread.objects.create(sujet="Autre")
+        hidden.participants.add(self.other)
+
+    def test_orders_by_last_activity_with_preview_and_unread(self):
+        with self.assertNumQueries(2):
+            page = inbox_page(self.me, page_size=10)
+            names = [[p.username for p in t.participants.all()] for t in page["threads"]]
+
+        threads = page["threads"]
+        self.assertEqual(len(threads), 5)
+        self.assertIsNone(page["next_cursor"])
+        first = threads[0]
+        self.assertEqual(first.pk, self.threads[0].pk)
+        self.assertEqual((first.last_message, first.last_sender, first.unread), ("ancien", "other", 1))
+        self.assertEqual(names[0], ["me", "other"])
+        self.assertEqual([t.unread for t in threads[1:]], [0, 0, 0, 0])
+
+    def test_cursor_pagination_covers_every_thread_once(self):
+        seen, cursor = [], None
+        while True:
+            page = inbox_page(self.me, cursor=cursor, page_size=2)
+            seen += [t.pk for t in page["threads"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), sorted(t.pk for t in self.threads))
+        self.assertEqual(len(seen), 5)
+
+    def test_thread_list_view_runs_constant_queries(self):
+        self.client.force_login(self.me)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/messages/")
+        for i in range(10):
+            thread = Thread.objects.create(sujet=f"Extra {i}")
+            thread.participants.add(self.me, self.other)
+            Message.objects.create(thread=thread, sender=self.other, contenu="hello")
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get("/messages/")
+        self.assertContains(response, "Extra 9")
+        self.assertEqual(len(small), len(large))
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from community.models import DossierCommunautaire, Pathologie
+from core.models import DailyZoneKpi, RollupDirtyDay, RollupWatermark
+from core.rollups import KpiReader, merge_ranges, refresh
+from patients.models import CasSuivi, Consultation, Patient, SuiviCPN
+
+
+class KpiRollupTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(code_patient="P-1", nom="KOFFI", prenoms="Grace", zone="BONOUA")
+        Consultation.objects.create(patient=self.patient, date_consultation=timezone.now() - timedelta(days=3))
+        CasSuivi.objects.create(patient=self.patient, type_cas=CasSuivi.TYPE_TB)
+        DossierCommunautaire.objects.create(
+            patient=self.patient,
+            pathologie=Pathologie.objects.get(code="VIH"),
+            date_diagnostic=timezone.localdate() - timedelta(days=10),
+        )
+
+    def test_refresh_matches_live_counts(self):
+        live = KpiReader().zone_totals()
+        live_pathologies = KpiReader().pathologie_totals()
+
+        refresh()
+        self.assertEqual(KpiReader().zone_totals(), live)
+        self.assertEqual(KpiReader().pathologie_totals(), live_pathologies)
+        self.assertEqual(live["consultations"], 1)
+        self.assertEqual(live["cas_tb"], 1)
+
+    def test_incremental_refresh_only_recomputes_touched_days(self):
+        refresh()
+        RollupWatermark.objects.update(value=timezone.now())
+        old_day = timezone.now() - timedelta(days=40)
+        Consultation.objects.create(patient=self.patient, date_consultation=old_day)
+
+        self.assertEqual(refresh(), 1)
+        row = DailyZoneKpi.objects.get(day=timezone.localdate(old_day), zone="BONOUA")
+        self.assertEqual(row.consultations, 1)
+
+    def _stored_consultations(self, when) -> int:
+        row = DailyZoneKpi.objects.filter(day=timezone.localdate(when), zone="BONOUA").first()
+        return row.consultations if row else 0
+
+    def test_incremental_refresh_follows_edited_dates(self):
+        consultation = Consultation.objects.get()
+        old_day = consultation.date_consultation
+        refresh()
+        RollupWatermark.objects.update(value=timezone.now())
+
+        new_day = old_day - timedelta(days=60)
+        consultation.date_consultation = new_day
+        consultation.save()
+        refresh()
+        self.assertEqual(self._stored_consultations(old_day), 0)
+        self.assertEqual(self._stored_consultations(new_day), 1)
+
+        cpn = SuiviCPN.objects.create(patient=self.patient, numero=1, date=date(2026, 1, 5))
+        refresh()
+        RollupWatermark.objects.update(value=timezone.now())
+        cpn.numero = 2
+        cpn.date = date(2026, 1, 20)
+        cpn.save(update_fields=["numero", "date"])
+        refresh()
+        self.assertFalse(DailyZoneKpi.objects.filter(day=date(2026, 1, 5), cpn1__gt=0).exists())
+        self.assertEqual(DailyZoneKpi.objects.get(day=date(2026, 1, 20), zone="BONOUA").cpn2, 1)
+
+    def test_only_date_changes_are_marked(self):
+        consultation = Consultation.objects.get()
+        consultation.motif = "Contrôle"
+        consultation.save()
+        self.assertFalse(RollupDirtyDay.objects.exists())
+
+        consultation.date_consultation -= timedelta(days=2)
+        consultation.save()
+        self.assertEqual(RollupDirtyDay.objects.count(), 2)
+
+    def test_incremental_refresh_follows_deletions(self):
+        consultation = Consultation.objects.get()
+        refresh()
+        RollupWatermark.objects.update(value=timezone.now())
+        self.assertEqual(self._stored_consultations(consultation.date_consultation), 1)
+
+        consultation.delete()
+        refresh()
+        self.assertEqual(self._stored_consultations(consultation.date_consultation), 0)
+        self.assertFalse(RollupDirtyDay.objects.exists())
+
+    def test_live_fallback_for_days_after_watermark(self):
+        refresh()
+        Consultation.objects.create(patient=self.patient, date_consultation=timezone.now())
+        self.assertEqual(KpiReader().zone_totals(["consultations"])["consultations"], 2)
+
+    def test_merge_ranges(self):
+        d = date(2026, 1, 1)
+        days = [d, d + timedelta(days=2), d + timedelta(days=20), d + timedelta(days=60)]
+        self.assertEqual(
+            merge_ranges(days),
+            [(d, d + timedelta(days=2)), (d + timedelta(days=20), d + timedelta(days=20)), (d + timedelta(days=60), d + timedelta(days=60))],
+        )
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.keyset import encode_cursor
+from messaging.history import message_window
+from messaging.models import Message, Thread
+
+User = get_user_model()
+
+
+class MessageHistoryTests(TestCase):
+    def setUp(self):
+        self.me = User.objects.create_superuser(username="me", password="pw")
+        self.other = User.objects.create_user(username="other", password="pw")
+        self.thread = Thread.objects.create(sujet="Coordination")
+        self.thread.participants.add(self.me, self.other)
+        same_time = timezone.now()
+        Message.objects.bulk_create(
+            [Message(thread=self.thread, sender=self.other, contenu=f"m{i}") for i in range(7)]
+        )
+        # Horodatages identiques : l'id départage.
+        Message.objects.filter(thread=self.thread).update(created_at=same_time)
+
+    def test_windows_walk_back_through_the_whole_thread(self):
+        contents, cursor = [], None
+        while True:
+            window = message_window(self.thread, before=cursor, limit=3)
+            contents = [m.contenu for m in window["messages"]] + contents
+            cursor = window["earlier"]
+            if cursor is None:
+                break
+        self.assertEqual(contents, [f"m{i}" for i in range(7)])
+
+    @override_settings(MESSAGE_WINDOW_SIZE=3)
+    def test_detail_page_renders_latest_window_only(self):
+        self.client.force_login(self.me)
+        response = self.client.get(f"/messages/{self.thread.pk}/")
+        self.assertContains(response, "m6")
+        self.assertNotContains(response, "m3<")
+        self.assertContains(response, "Messages précédents")
+
+    def test_json_endpoint_pages_and_checks_membership(self):
+        self.client.force_login(self.me)
+        first = self.client.get(f"/messages/{self.thread.pk}/historique/", {"limit": 4}).json()
+        self.assertEqual([m["contenu"] for m in first["messages"]], ["m3", "m4", "m5", "m6"])
+        rest = self.client.get(f"/messages/{self.thread.pk}/historique/", {"limit": 4, "avant": first["earlier"]}).json()
+        self.assertEqual([m["contenu"] for m in rest["messages"]], ["m0", "m1", "m2"])
+        self.assertIsNone(rest["earlier"])
+
+        # Curseur illisible ou mal typé : fenêtre la plus récente.
+        for cursor in ("2024-01-01T00:00:00_1", encode_cursor(["x", 1])):
+            data = self.client.get(f"/messages/{self.thread.pk}/historique/", {"limit": 4, "avant": cursor}).json()
+            self.assertEqual([m["contenu"] for m in data["messages"]], ["m3", "m4", "m5", "m6"])
+
+        # Taille négative, nulle ou invalide : taille par défaut.
+        for limit in ("-3", "0", "abc"):
+            response = self.client.get(f"/messages/{self.thread.pk}/historique/", {"limit": limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["messages"]), 7)
+
+        outsider = User.objects.create_superuser(username="x", password="pw")
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(f"/messages/{self.thread.pk}/historique/").status_code, 404)
@@ -0,0 +1,146 @@
+import io
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from audit.models import AuditLog
+from patients.anonymization import anonymize_patients
+from patients.models import DoublonPotentiel, Ordonnance, Patient
+from patients.search import search_patients
+
+User = get_user_model()
+
+
+# Pas d'attente des accès des autres workers dans les commandes.
+@override_settings(PATIENT_ACCESS_FLUSH_INTERVAL=0)
+class PatientAnonymizationTests(TestCase):
+    def _patients(self, n: int, start: int = 0, **kwargs) -> list[Patient]:
+        return [
+            Patient.objects.create(
+                code_patient=f"P{i}", nom="Koné", prenoms=f"Awa{i}", telephone="0701020304", adresse="Cocody", **kwargs
+            )
+            for i in range(start, start + n)
+        ]
+
+    def _set_inactive(self, patients, years: int):
+        old = timezone.now() - timedelta(days=365 * years + 10)
+        Patient.objects.filter(pk__in=[p.pk for p in patients]).update(created_at=old, updated_at=old)
+
+    def test_chunks_use_constant_queries(self):
+        patients = self._patients(10)
+        user = User.objects.create_user(username="awa", email="awa@example.org", password="pw")
+        Patient.objects.filter(pk=patients[0].pk).update(user=user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            done = anonymize_patients(Patient.objects.filter(pk__in=[p.pk for p in patients[:5]]), chunk_size=5)
+        small = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            done += anonymize_patients(Patient.objects.filter(pk__in=[p.pk for p in patients[5:]]), chunk_size=5)
+        self.assertEqual(done, 10)
+        # Sans compte lié, le second paquet fait au plus autant de requêtes.
+        self.assertLessEqual(len(ctx.captured_queries), small)
+
+        p = Patient.objects.get(pk=patients[3].pk)
+        self.assertEqual((p.nom, p.prenoms, p.telephone, p.adresse), ("ANONYMISE", f"PATIENT_{p.pk}", "", ""))
+        self.assertEqual(p.cle_phonetique, "")
+        user.refresh_from_db()
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.username, f"anonyme_{patients[0].pk}_{user.pk}")
+        self.assertEqual(user.email, "")
+        logs = AuditLog.objects.filter(action=AuditLog.ACTION_UPDATE, model="patient", extra__anonymized=True)
+        self.assertEqual(logs.count(), 10)
+        self.assertFalse(search_patients("Awa3").exists())
+        self.assertTrue(search_patients("P3").exists())
+
+    def test_already_anonymized_patients_are_skipped(self):
+        patients = self._patients(2)
+        legacy = Patient.objects.create(code_patient="L1", nom="ANONYME_99", prenoms="Inconnu")
+        self.assertEqual(anonymize_patients(Patient.objects.all()), 2)
+        self.assertEqual(anonymize_patients(Patient.objects.all()), 0)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.prenoms, "Inconnu")
+        self.assertEqual(AuditLog.objects.filter(object_id=str(patients[0].pk)).count(), 1)
+
+    def test_commands_share_the_engine(self):
+        old = self._patients(3)
+        recent = self._patients(1, start=3)
+        self._set_inactive(old, years=5)
+
+        out = io.StringIO()
+        call_command("anonymize_patients", "--years", "5", "--dry-run", stdout=out)
+        self.assertIn("[Dry-Run] Koné Awa0", out.getvalue())
+        self.assertFalse(Patient.objects.filter(nom="ANONYMISE").exists())
+
+        call_command("rgpd_cleanup", "--years", "3", "--chunk-size", "2", stdout=io.StringIO())
+        self.assertEqual(Patient.objects.filter(nom="ANONYMISE").count(), 3)
+        self.assertEqual(Patient.objects.get(pk=recent[0].pk).nom, "Koné")
+        log = AuditLog.objects.filter(object_id=str(old[0].pk)).get()
+        self.assertEqual(log.user_agent, "rgpd_cleanup")
+        self.assertEqual(log.extra["previous_code_patient"], "P0")
+
+        out = io.StringIO()
+        call_command("anonymize_patients", "--years", "3", stdout=out)
+        self.assertIn("Aucun patient inactif", out.getvalue())
+
+    def test_view_uses_engine(self):
+        admin = User.objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(admin)
+        patient = self._patients(1)[0]
+        response = self.client.post(f"/patients/{patient.pk}/anonymiser/")
+        self.assertEqual(response.status_code, 302)
+        patient.refresh_from_db()
+        self.assertEqual(patient.nom, "ANONYMISE")
+        log = AuditLog.objects.get(object_id=str(patient.pk), action=AuditLog.ACTION_UPDATE)
+        self.assertEqual(log.user, admin)
+
+    def test_cached_pdfs_and_pending_duplicates_are_removed(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        a, b, c = self._patients(3)
+        ordonnance = Ordonnance.objects.create(patient=a, date=date(2026, 1, 5))
+        cached = Path(cache_dir.name) / "ordonnances" / str(ordonnance.pk)
+        cached.mkdir(parents=True)
+        (cached / "abc.pdf").write_bytes(b"%PDF")
+        DoublonPotentiel.objects.create(patient_a=a, patient_b=b, score=0.9)
+        DoublonPotentiel.objects.create(
+            patient_a=a, patient_b=c, score=0.95, statut=DoublonPotentiel.STATUT_CONFIRME
+        )
+        DoublonPotentiel.objects.create(patient_a=b, patient_b=c, score=0.9)
+
+        with self.settings(PDF_CACHE_DIR=cache_dir.name), self.captureOnCommitCallbacks(execute=True):
+            anonymize_patients(Patient.objects.filter(pk=a.pk))
+
+        self.assertFalse(cached.exists())
+        pairs = DoublonPotentiel.objects.values_list("patient_a_id", "patient_b_id", "statut")
+        self.assertCountEqual(
+            pairs, [(a.pk, c.pk, DoublonPotentiel.STATUT_CONFIRME), (b.pk, c.pk, DoublonPotentiel.STATUT_A_VERIFIER)]
+        )
+
+    @override_settings(PATIENT_ACCESS_FLUSH_INTERVAL=30)
+    def test_commands_only_wait_before_writing(self):
+        with mock.patch("patients.access_tracking.time.sleep") as sleep:
+            # Aucun candidat : pas d'attente.
+            call_command("rgpd_cleanup", stdout=io.StringIO())
+            call_command("anonymize_patients", stdout=io.StringIO())
+            sleep.assert_not_called()
+
+            self._set_inactive(self._patients(1), years=5)
+            call_command("anonymize_patients", "--dry-run", stdout=io.StringIO())
+            call_command("anonymize_patients", "--dry-run", "--no-wait", stdout=io.StringIO())
+            sleep.assert_not_called()
+
+            call_command("anonymize_patients", stdout=io.StringIO())
+            sleep.assert_called_once_with(31)
+
+            self._set_inactive(self._patients(1, start=1), years=5)
+            call_command("rgpd_cleanup", "--no-wait", stdout=io.StringIO())
+            self.assertEqual(sleep.call_count, 1)
+            self.assertEqual(Patient.objects.filter(nom="ANONYMISE").count(), 2)
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.keyset import encode_cursor
+from patients.models import Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous
+
+User = get_user_model()
+
+
+@override_settings(DOSSIER_SECTION_SIZE=3)
+class PatientDossierTests(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(code_patient="P1", nom="Koné", prenoms="Awa")
+        self.client.force_login(User.objects.create_superuser(username="admin", password="pw"))
+
+    def _add(self, consultations=0, ordonnances=0):
+        now = timezone.now()
+        start = Consultation.objects.filter(patient=self.patient).count()
+        Consultation.objects.bulk_create(
+            Consultation(patient=self.patient, date_consultation=now - timedelta(days=start + i), motif=f"C{start + i}")
+            for i in range(consultations)
+        )
+        for i in range(ordonnances):
+            o = Ordonnance.objects.create(patient=self.patient, date=date(2026, 1, 1) - timedelta(days=i))
+            LigneOrdonnance.objects.bulk_create(LigneOrdonnance(ordonnance=o, medicament=f"M{i}-{j}") for j in range(2))
+
+    def _detail_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/patients/{self.patient.pk}/")
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_history(self):
+        self._add(consultations=2, ordonnances=1)
+        _, small = self._detail_queries()
+        self._add(consultations=200, ordonnances=20)
+        RendezVous.objects.create(patient=self.patient, date_heure=timezone.now())
+        response, large = self._detail_queries()
+        self.assertEqual(small, large)
+
+        patient = response.context["patient"]
+        self.assertEqual((patient.consultations_total, patient.ordonnances_total, patient.rdv_total), (202, 21, 1))
+        self.assertEqual([c.motif for c in patient.recent_consultations], ["C0", "C1", "C2"])
+        self.assertEqual(len(patient.recent_ordonnances), 3)
+        self.assertIsNone(patient.more["rdv"])
+        self.assertContains(response, "M0-0, M0-1")
+
+    def test_see_more_walks_the_whole_section(self):
+        self._add(consultations=8)
+        patient = self.client.get(f"/patients/{self.patient.pk}/").context["patient"]
+        motifs = [c.motif for c in patient.recent_consultations]
+        cursor = patient.more["consultations"]
+        url = f"/patients/{self.patient.pk}/dossier/consultations/"
+        while cursor:
+            data = self.client.get(url, {"apres": cursor}).json()
+            motifs += [item["motif"] for item in data["items"]]
+            cursor = data["next"]
+        self.assertEqual(motifs, [f"C{i}" for i in range(8)])
+
+    def test_invalid_limit_falls_back_to_section_size(self):
+        self._add(consultations=5)
+        url = f"/patients/{self.patient.pk}/dossier/consultations/"
+        for limit in ("-5", "0", "x"):
+            response = self.client.get(url, {"limit": limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["items"]), 3)
+        self.assertEqual(len(self.client.get(url, {"limit": "2"}).json()["items"]), 2)
+
+    def test_invalid_cursor_is_not_found(self):
+        self._add(consultations=5)
+        base = f"/patients/{self.patient.pk}/dossier"
+        for section, cursor in (
+            ("consultations", encode_cursor(["notadate", 1])),
+            ("cpn", encode_cursor([1, "zz"])),
+            ("cpn", encode_cursor([1])),
+            ("rdv", "!!"),
+        ):
+            self.assertEqual(self.client.get(f"{base}/{section}/", {"apres": cursor}).status_code, 404, section)
+
+    def test_unknown_section_or_patient(self):
+        self.assertEqual(self.client.get(f"/patients/{self.patient.pk}/dossier/inconnue/").status_code, 404)
+        self.assertEqual(self.client.get("/patients/999/").status_code, 404)
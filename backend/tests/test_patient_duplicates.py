@@ -0,0 +1,71 @@
+from datetime import date
+
+from django.test import TestCase
+
+from patients.duplicates import detect_duplicates, phonetic_key
+from patients.importer import PatientImporter
+from patients.models import DoublonPotentiel, Patient
+
+
+class PhoneticKeyTests(TestCase):
+    def test_variant_spellings_share_a_key(self):
+        for a, b in (("KOUASSI", "Kwassi"), ("N'Guessan", "Ngessan"), ("Traoré", "TRAORE"), ("Coulibaly", "Koulibali")):
+            self.assertEqual(phonetic_key(a), phonetic_key(b), (a, b))
+        self.assertNotEqual(phonetic_key("Kouassi"), phonetic_key("Bamba"))
+
+
+class DuplicateDetectionTests(TestCase):
+    def _patient(self, code, nom, prenoms, **extra):
+        extra.setdefault("date_naissance", date(1990, 5, 1))
+        return Patient.objects.create(code_patient=code, nom=nom, prenoms=prenoms, **extra)
+
+    def _pairs(self):
+        return set(DoublonPotentiel.objects.values_list("patient_a_id", "patient_b_id"))
+
+    def test_pairs_within_blocks_only(self):
+        a = self._patient("P1", "KOUASSI", "Aya Marie")
+        b = self._patient("P2", "Kwassi", "Marie Aya")
+        self._patient("P3", "Kouassi", "Aya Marie", date_naissance=date(1975, 1, 1))  # autre année
+        self._patient("P4", "Kouassi", "Jean", zone="BONOUA")  # autre zone
+        self._patient("P5", "Kouassi", "Koffi Bernard")  # même bloc, prénoms différents
+
+        stats = detect_duplicates()
+
+        self.assertEqual(self._pairs(), {(a.pk, b.pk)})
+        self.assertEqual(stats.patients, 5)
+        self.assertEqual(stats.comparisons, 3)  # P1-P2, P1-P5, P2-P5
+        self.assertFalse(Patient.objects.filter(doublons_verifies=False).exists())
+
+    def test_incremental_over_new_and_changed_patients(self):
+        a = self._patient("P1", "Koné", "Awa")
+        detect_duplicates()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(detect_duplicates().patients, 0)
+
+        b = self._patient("P2", "Kone", "Awa")
+        self.assertEqual(detect_duplicates().patients, 1)
+        self.assertEqual(self._pairs(), {(a.pk, b.pk)})
+
+        # Nouvelle date : nouveau bloc, le patient est revérifié.
+        b.date_naissance = date(2001, 1, 1)
+        b.save()
+        self.assertFalse(Patient.objects.get(pk=b.pk).doublons_verifies)
+        self.assertEqual(detect_duplicates().pairs, 0)
+
+    def test_bulk_import_and_anonymized_patients(self):
+        self._patient("P1", "Bamba", "Fatou", date_naissance=None)
+        importer = PatientImporter({"nom": 0, "prenoms": 1})
+        importer.import_chunk([(2, ("BAMBA", "Fatoumata")), (3, ("Bamba", "Fatou"))])
+        imported = Patient.objects.exclude(code_patient="P1")
+        self.assertTrue(all(p.cle_phonetique for p in imported))
+
+        anonymized = self._patient("P9", "ANONYME_9", "Inconnu", date_naissance=None)
+        self.assertEqual(anonymized.cle_phonetique, "")
+
+        # Seule la paire « Bamba Fatou » atteint le seuil ; le patient anonymisé n'est jamais comparé.
+        self.assertEqual(detect_duplicates().pairs, 1)
+        self.assertEqual(
+            self._pairs(),
+            {(Patient.objects.get(code_patient="P1").pk, imported.get(prenoms="Fatou").pk)},
+        )
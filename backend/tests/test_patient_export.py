@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from audit.models import AuditLog
+from community.models import DossierCommunautaire, Pathologie, SuiviCommunautaire
+from patients.export import iter_ndjson, iter_zip
+from patients.models import Consultation, LigneOrdonnance, Ordonnance, Patient, SuiviCPN
+
+User = get_user_model()
+
+
+class PatientExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(self.user)
+        self.pathologie = Pathologie.objects.create(code="HTA", nom="Hypertension")
+
+    def _patient(self, i: int) -> Patient:
+        patient = Patient.objects.create(code_patient=f"P{i}", nom="Koné", prenoms=f"Awa {i}", zone="URBAINE")
+        SuiviCPN.objects.create(patient=patient, numero=1, date=date(2026, 1, 1))
+        Consultation.objects.create(patient=patient, date_consultation=timezone.now(), motif="Fièvre")
+        o = Ordonnance.objects.create(patient=patient, date=date(2026, 1, 2))
+        LigneOrdonnance.objects.create(ordonnance=o, medicament="Paracétamol")
+        d = DossierCommunautaire.objects.create(
+            patient=patient, pathologie=self.pathologie, date_diagnostic=date(2025, 6, 1)
+        )
+        SuiviCommunautaire.objects.create(dossier=d, date=date(2025, 7, 1), traitement="Amlodipine")
+        return patient
+
+    def _read(self, response) -> bytes:
+        return b"".join(response.streaming_content)
+
+    def test_single_patient_json_is_streamed(self):
+        patient = self._patient(1)
+        response = self.client.get(f"/patients/{patient.pk}/export.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('filename="patient_P1.json"', response["Content-Disposition"])
+
+        doc = json.loads(self._read(response))
+        self.assertEqual(
+            list(doc), ["patient", "cpn", "rendez_vous", "consultations", "ordonnances", "community", "export"]
+        )
+        self.assertEqual(doc["patient"]["nom"], "Koné")
+        self.assertEqual(doc["rendez_vous"], [])
+        self.assertEqual(doc["ordonnances"][0]["lignes"][0]["medicament"], "Paracétamol")
+        self.assertEqual(doc["community"][0]["pathologie"]["code"], "HTA")
+        self.assertEqual(doc["community"][0]["suivis"][0]["traitement"], "Amlodipine")
+        self.assertEqual(doc["export"]["exported_by"], "admin")
+        self.assertTrue(AuditLog.objects.filter(action=AuditLog.ACTION_EXPORT, object_id=str(patient.pk)).exists())
+
+    def test_ndjson_queries_are_per_chunk_not_per_patient(self):
+        for i in range(6):
+            self._patient(i)
+        with CaptureQueriesContext(connection) as ctx:
+            lines = b"".join(iter_ndjson(chunk_size=10)).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertEqual([json.loads(line)["patient"]["code_patient"] for line in lines], [f"P{i}" for i in range(6)])
+        small = len(ctx.captured_queries)
+
+        for i in range(6, 9):
+            self._patient(i)
+        with CaptureQueriesContext(connection) as ctx:
+            lines = b"".join(iter_ndjson(chunk_size=10)).splitlines()
+        self.assertEqual(len(lines), 9)
+        self.assertEqual(len(ctx.captured_queries), small)
+
+    def test_ndjson_chunks_cover_every_patient_once(self):
+        for i in range(5):
+            self._patient(i)
+        lines = b"".join(iter_ndjson(chunk_size=2)).splitlines()
+        self.assertEqual(sorted(json.loads(line)["patient"]["code_patient"] for line in lines), [f"P{i}" for i in range(5)])
+
+    def test_zip_contains_one_document_per_patient(self):
+        for i in range(3):
+            self._patient(i)
+        data = b"".join(iter_zip(Patient.objects.filter(code_patient__in=["P0", "P2"]), chunk_size=1))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(sorted(archive.namelist()), ["patient_P0.json", "patient_P2.json"])
+            doc = json.loads(archive.read("patient_P2.json"))
+        self.assertEqual(doc["patient"]["code_patient"], "P2")
+        self.assertEqual(doc["export"]["format"], "zip")
+
+    def test_admin_action_streams_selection(self):
+        patients = [self._patient(i) for i in range(3)]
+        response = self.client.post(
+            "/admin/patients/patient/",
+            {"action": "export_ndjson", "_selected_action": [patients[0].pk, patients[1].pk]},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = self._read(response).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(AuditLog.objects.filter(action=AuditLog.ACTION_EXPORT, model="patient", object_id="").exists())
+
+    def test_command_writes_file(self):
+        self._patient(1)
+        self._patient(2)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "patients.ndjson")
+            call_command("export_patients", "--output", path, "--chunk-size", "1", stdout=io.StringIO())
+            with open(path, encoding="utf-8") as fh:
+                lines = fh.read().splitlines()
+        self.assertEqual(len(lines), 2)
@@ -0,0 +1,118 @@
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from openpyxl import Workbook
+
+from patients.importer import ImportStats, import_range
+from patients.models import Patient
+
+
+class PatientImportTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _workbook(self, rows):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["Code", "Nom", "Prénoms", "Zone", "Sexe", "Date naissance", "Téléphone"])
+        for row in rows:
+            ws.append(row)
+        path = Path(self.tmp.name) / "patients.xlsx"
+        wb.save(path)
+        return str(path)
+
+    def _import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command("import_patients_excel", path, "--chunk-size", "2", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_creates_updates_and_reports_row_errors(self):
+        Patient.objects.create(code_patient="P-1", nom="ANCIEN", prenoms="Nom", zone="BONOUA", telephone="01")
+        path = self._workbook(
+            [
+                ["P-1", "KOFFI", "Grace", "Bonoua", "F", date(1990, 5, 1), None],
+                ["P-2", "YAO", "Kader", "Bassam", "Homme", "1988-07-08", "07"],
+                ["P-3", "", "Sans nom", None, None, None, None],
+                ["P-4", "AKA", "Ama", None, None, "pas une date", None],
+                [],
+                ["P-5", "X" * 101, "Long", None, None, None, None],
+                ["P-2", "YAO", "Kader bis", None, None, None, None],
+            ]
+        )
+        out, err = self._import(path, "--update-existing")
+
+        self.assertIn("created=1 updated=2 skipped=1 errors=2", out)
+        self.assertIn("Ligne 5: date_naissance", err)
+        self.assertIn("Ligne 7: nom", err)
+
+        p1 = Patient.objects.get(code_patient="P-1")
+        self.assertEqual((p1.nom, p1.sexe, p1.date_naissance, p1.telephone), ("KOFFI", "F", date(1990, 5, 1), ""))
+        p2 = Patient.objects.get(code_patient="P-2")
+        self.assertEqual((p2.prenoms, p2.zone, p2.date_naissance), ("Kader bis", "GRAND_BASSAM", date(1988, 7, 8)))
+
+    def test_existing_patients_are_skipped_by_default_and_dry_run_writes_nothing(self):
+        Patient.objects.create(code_patient="P-1", nom="ANCIEN", prenoms="Nom")
+        path = self._workbook([["P-1", "KOFFI", "Grace"], ["", "AKA", "Ama"], ["", "AKA", "Ama"]])
+
+        out, _err = self._import(path, "--dry-run")
+        self.assertIn("created=2 updated=0 skipped=1", out)
+        self.assertEqual(Patient.objects.count(), 1)
+
+        self._import(path)
+        self.assertEqual(Patient.objects.get(code_patient="P-1").nom, "ANCIEN")
+        self.assertEqual(sorted(Patient.objects.values_list("code_patient", flat=True)), ["P-1", "akaama_3", "akaama_4"])
+
+    def test_ranged_import_resumes_after_interruption(self):
+        path = self._workbook([["", f"NOM{i}", "Prenoms"] for i in range(7)])
+        calls = []
+        real_import_range = import_range
+
+        def flaky(*args, **kwargs):
+            calls.append(args[1][0][0])
+            if len(calls) == 2:
+                raise RuntimeError("coupure")
+            return real_import_range(*args, **kwargs)
+
+        with mock.patch("patients.management.commands.import_patients_excel.import_range", side_effect=flaky):
+            with self.assertRaises(RuntimeError):
+                self._import(path, "--workers", "1", "--range-size", "3")
+        self.assertEqual(Patient.objects.count(), 3)
+        self.assertTrue(Path(f"{path}.import-checkpoint.json").exists())
+
+        with self.assertRaises(CommandError):
+            self._import(path, "--workers", "1", "--range-size", "3")
+
+        out, _err = self._import(path, "--resume", "--range-size", "3")
+        self.assertIn("created=7", out)
+        self.assertEqual(Patient.objects.count(), 7)
+        self.assertFalse(Path(f"{path}.import-checkpoint.json").exists())
+
+    def test_parallel_ranges_are_checkpointed_as_they_complete(self):
+        path = self._workbook([["", f"NOM{i}", "Prenoms"] for i in range(9)])
+
+        def fake(field_to_col, rows, **kwargs):
+            if rows[0][0] == 5:
+                raise RuntimeError("coupure")
+            time.sleep(0.05)
+            return ImportStats(created=len(rows))
+
+        command = "patients.management.commands.import_patients_excel"
+        # Threads à la place des processus : la connexion du test reste ouverte.
+        with mock.patch(f"{command}.import_range", side_effect=fake), mock.patch(
+            f"{command}.process_pool", lambda workers: ThreadPoolExecutor(max_workers=workers)
+        ):
+            with self.assertRaises(RuntimeError):
+                self._import(path, "--workers", "2", "--range-size", "3")
+
+        checkpoint = json.loads(Path(f"{path}.import-checkpoint.json").read_text(encoding="utf-8"))
+        self.assertEqual(checkpoint["done"], [[2, 4], [8, 10]])
+        self.assertEqual(checkpoint["stats"]["created"], 6)
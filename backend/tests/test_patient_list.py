@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.keyset import decode_cursor, encode_cursor
+from patients.listing import zone_counts
+from patients.models import Patient
+
+User = get_user_model()
+
+
+@override_settings(PATIENT_PAGE_SIZE=3)
+class PatientListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for i, (nom, zone, sexe) in enumerate(
+            [("Aka", "BONOUA", "F"), ("Aka", "GRAND_BASSAM", "M"), ("Bamba", "BONOUA", "F"),
+             ("Koné", "GRAND_BASSAM", "F"), ("Yao", "BONOUA", "M"), ("Zadi", "BONOUA", "F")]
+        ):
+            Patient.objects.create(code_patient=f"P{i}", nom=nom, prenoms="Awa", zone=zone, sexe=sexe)
+        self.client.force_login(User.objects.create_superuser(username="admin", password="pw"))
+
+    def _walk(self, params):
+        codes, query = [], params
+        while True:
+            response = self.client.get("/patients/", query)
+            codes += [p.code_patient for p in response.context["patients"]]
+            if not response.context["next_query"]:
+                return codes, response
+            query = response.context["next_query"]
+            self.assertIn("apres=", query)
+            query = {k: v for k, v in (part.split("=", 1) for part in query.split("&"))}
+
+    def test_keyset_pages_follow_ordering_and_filters(self):
+        codes, _ = self._walk({})
+        self.assertEqual(codes, ["P0", "P1", "P2", "P3", "P4", "P5"])
+        codes, response = self._walk({"zone": "BONOUA", "sexe": "F"})
+        self.assertEqual(codes, ["P0", "P2", "P5"])
+        self.assertEqual(response.context["kpi_results"], 3)
+
+    def test_zone_kpis_are_one_cached_grouped_query(self):
+        with CaptureQueriesContext(connection) as first:
+            self.client.get("/patients/")
+        self.assertEqual(sum("COUNT(" in q["sql"] for q in first.captured_queries), 1)
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get("/patients/")
+        self.assertFalse([q for q in second.captured_queries if "COUNT(" in q["sql"]])
+        self.assertEqual(response.context["kpi_total"], 6)
+        self.assertEqual(response.context["kpi_zones"], [("Grand-Bassam", 2), ("Bonoua", 4)])
+
+    def test_counts_invalidated_on_create_update_delete(self):
+        self.assertEqual(zone_counts(), {"GRAND_BASSAM": 2, "BONOUA": 4})
+        with self.captureOnCommitCallbacks(execute=True):
+            Patient.objects.create(code_patient="P9", nom="Ehui", prenoms="Luc", zone="GRAND_BASSAM")
+        self.assertEqual(zone_counts(), {"GRAND_BASSAM": 3, "BONOUA": 4})
+        patient = Patient.objects.get(code_patient="P4")
+        patient.zone = "GRAND_BASSAM"
+        with self.captureOnCommitCallbacks(execute=True):
+            patient.save()
+        self.assertEqual(zone_counts(), {"GRAND_BASSAM": 4, "BONOUA": 3})
+        with self.captureOnCommitCallbacks(execute=True):
+            patient.delete()
+        self.assertEqual(zone_counts(), {"GRAND_BASSAM": 3, "BONOUA": 3})
+
+    def test_cursor_round_trip_and_garbage(self):
+        self.assertEqual(decode_cursor(encode_cursor(["Koné", "Awa é", 12]), 3), ["Koné", "Awa é", 12])
+        self.assertIsNone(decode_cursor("pas-un-curseur!", 3))
+        response = self.client.get("/patients/", {"apres": "%%%"})
+        self.assertEqual(len(response.context["patients"]), 3)
+
+    def test_mistyped_cursor_falls_back_to_first_page(self):
+        for params in ({"apres": encode_cursor(["a", "b", "zz"])}, {"q": "Aka", "apres": encode_cursor(["x", "a", "b", 1])}):
+            response = self.client.get("/patients/", params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context["patients"][0].code_patient, "P0")
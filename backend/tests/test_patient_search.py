@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from patients.importer import PatientImporter
+from patients.models import Patient, PatientSearchToken
+from patients.search import normalize_phone, patient_tokens, search_patients
+
+User = get_user_model()
+
+
+class PatientSearchTests(TestCase):
+    def setUp(self):
+        self.adje = Patient.objects.create(
+            code_patient="GB-0001", nom="Adjé", prenoms="Élise Aya", telephone="07 07 12 34 56"
+        )
+        self.adjeba = Patient.objects.create(code_patient="GB-0002", nom="Adjeba", prenoms="Marc")
+        self.kone = Patient.objects.create(
+            code_patient="BO-0003", nom="Koné", prenoms="Awa", telephone="+225 05 44 33 22 11", zone="BONOUA"
+        )
+
+    def _codes(self, q, qs=None):
+        return [p.code_patient for p in search_patients(q, qs)]
+
+    def test_tokens_are_folded_and_phone_normalized(self):
+        tokens = patient_tokens(code_patient="GB-0001", nom="Adjé", prenoms="Élise", telephone="07 07 12 34 56")
+        self.assertTrue({"adje", "elise", "gb0001", "gb", "0001", "0707123456", "2250707123456"} <= tokens)
+        self.assertEqual(normalize_phone("+225 05 44"), "2250544")
+        self.assertEqual(normalize_phone("00225 05 44"), "2250544")
+
+    def test_prefix_match_accent_insensitive_and_ranked(self):
+        # « adje » est exact pour Adjé et un préfixe d'Adjeba : Adjé d'abord.
+        self.assertEqual(self._codes("ADJE"), ["GB-0001", "GB-0002"])
+        self.assertEqual(self._codes("eli adj"), ["GB-0001"])
+        self.assertCountEqual(self._codes("gb-000"), ["GB-0001", "GB-0002"])
+        self.assertEqual(self._codes("inconnu"), [])
+
+    def test_phone_in_any_format(self):
+        for q in ("0707 12", "+225 07 07 12 34 56", "00225070712"):
+            self.assertEqual(self._codes(q), ["GB-0001"], q)
+        self.assertEqual(self._codes("05 44 33"), ["BO-0003"])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.kone.nom = "Traoré"
+        self.kone.save()
+        self.assertEqual(self._codes("kone"), [])
+        self.assertEqual(self._codes("traore"), ["BO-0003"])
+        self.kone.delete()
+        self.assertFalse(PatientSearchToken.objects.filter(patient_id=self.kone.pk).exists())
+
+    def test_bulk_import_is_indexed(self):
+        importer = PatientImporter(
+            {"code_patient": 0, "nom": 1, "prenoms": 2}, update_existing=True
+        )
+        importer.import_chunk([(2, ("GB-0002", "Yao", "Marc")), (3, ("GB-0009", "Zadi", "Luc"))])
+        self.assertEqual(self._codes("yao"), ["GB-0002"])
+        self.assertEqual(self._codes("adjeba"), [])
+        self.assertEqual(self._codes("zadi luc"), ["GB-0009"])
+
+    def test_list_view_combines_search_and_filters(self):
+        user = User.objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(user)
+        response = self.client.get("/patients/", {"q": "a", "zone": "BONOUA"})
+        self.assertEqual([p.code_patient for p in response.context["patients"]], ["BO-0003"])
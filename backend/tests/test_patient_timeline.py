@@ -0,0 +1,90 @@
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from community.models import DossierCommunautaire, Pathologie, SuiviCommunautaire
+from core.keyset import encode_cursor
+from patients.models import CasSuivi, Consultation, LigneOrdonnance, Ordonnance, Patient, RendezVous, SuiviCPN
+
+User = get_user_model()
+
+
+class PatientTimelineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="u1", password="pw1"))
+        self.patient = Patient.objects.create(code_patient="P-1", nom="TOURE", prenoms="Mariam")
+        other = Patient.objects.create(code_patient="P-2", nom="KONE", prenoms="Awa")
+        tz = timezone.get_current_timezone()
+
+        def at(day, hour=0):
+            return datetime(2026, 3, day, hour, tzinfo=tz)
+
+        for day in (2, 9, 16):
+            Consultation.objects.create(patient=self.patient, date_consultation=at(day, 10), motif=f"C{day}")
+        Consultation.objects.create(patient=other, date_consultation=at(20, 10))
+        SuiviCPN.objects.create(patient=self.patient, numero=1, date=date(2026, 3, 9))
+        RendezVous.objects.create(patient=self.patient, date_heure=at(25, 8))
+        o = Ordonnance.objects.create(patient=self.patient, date=date(2026, 3, 16))
+        LigneOrdonnance.objects.create(ordonnance=o, medicament="Fer")
+        CasSuivi.objects.create(patient=self.patient, type_cas="TB", date_signalement=date(2026, 3, 1))
+        dossier = DossierCommunautaire.objects.create(
+            patient=self.patient, pathologie=Pathologie.objects.create(code="HTA", nom="HTA"), date_diagnostic=date(2026, 1, 1)
+        )
+        SuiviCommunautaire.objects.create(dossier=dossier, date=date(2026, 3, 12))
+        self.url = f"/api/patients/{self.patient.pk}/timeline/"
+
+    def _walk(self, page_size):
+        events, url = [], f"{self.url}?page_size={page_size}"
+        while url:
+            data = self.client.get(url).json()
+            events += [(e["type"], e["date"][:10]) for e in data["results"]]
+            url = data["next"]
+        return events
+
+    def test_merges_sources_newest_first(self):
+        expected = [
+            ("rdv", "2026-03-25"),
+            ("consultation", "2026-03-16"),
+            ("ordonnance", "2026-03-16"),
+            ("suivi_communautaire", "2026-03-12"),
+            ("consultation", "2026-03-09"),
+            ("cpn", "2026-03-09"),
+            ("consultation", "2026-03-02"),
+            ("cas_suivi", "2026-03-01"),
+        ]
+        self.assertEqual(self._walk(50), expected)
+        # Même ordre quelle que soit la taille des pages : les curseurs par source reprennent au bon endroit.
+        for size in (1, 2, 3):
+            self.assertEqual(self._walk(size), expected)
+
+    def test_page_reads_bounded_rows_per_source(self):
+        now = timezone.now()
+        Consultation.objects.bulk_create(
+            Consultation(patient=self.patient, date_consultation=now - timedelta(hours=i)) for i in range(300)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(f"{self.url}?page_size=5").json()
+        self.assertEqual([e["type"] for e in data["results"]], ["consultation"] * 5)
+        consultation_queries = [q["sql"] for q in ctx.captured_queries if 'FROM "patients_consultation"' in q["sql"]]
+        self.assertEqual(len(consultation_queries), 1)
+        self.assertIn("LIMIT 6", consultation_queries[0])
+        self.assertEqual(data["results"][0]["data"]["patient"], self.patient.pk)
+
+    def test_invalid_cursor_and_unknown_patient(self):
+        self.assertEqual(self.client.get(f"{self.url}?cursor=abc").status_code, 404)
+        # Positions de la bonne forme mais mal typées (date, id, ou position non liste).
+        for positions in (
+            [["x", 1], None, None, None, None, None],
+            [None, None, ["2024-01-01T10:00:00+00:00", "zz"], None, None, None],
+            [None, None, None, None, [None, 3], None],
+            [None, None, None, None, None, 7],
+        ):
+            response = self.client.get(self.url, {"cursor": encode_cursor(positions)})
+            self.assertEqual(response.status_code, 404, positions)
+        self.assertEqual(self.client.get("/api/patients/999/timeline/").status_code, 404)
@@ -0,0 +1,117 @@
+import tempfile
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from core import pdf
+from patients.models import LigneOrdonnance, Ordonnance, Patient
+
+
+class PdfServiceTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(PDF_CACHE_DIR=self.cache_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.client.force_login(get_user_model().objects.create_superuser(username="admin", password="pw"))
+        self.patient = Patient.objects.create(code_patient="P-1", nom="KOFFI", prenoms="Grace", zone="BONOUA")
+        self.ordonnance = Ordonnance.objects.create(patient=self.patient, date=date(2026, 1, 5), diagnostic="Paludisme")
+        self.ligne = LigneOrdonnance.objects.create(ordonnance=self.ordonnance, medicament="Artésunate")
+        self.url = f"/patients/{self.patient.pk}/ordonnances/{self.ordonnance.pk}/pdf/"
+
+    def test_repeat_download_is_served_from_cache_until_ordonnance_changes(self):
+        renderer = pdf.PdfRenderer(workers=0, max_pending=0, timeout=30)
+        with mock.patch.object(pdf, "get_renderer", return_value=renderer), mock.patch.object(
+            pdf, "html_to_pdf", wraps=pdf.html_to_pdf
+        ) as html_to_pdf:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first.content, second.content)
+            self.assertEqual(html_to_pdf.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ligne.posologie = "2 cp/j"
+                self.ligne.save()
+            self.assertFalse((Path(self.cache_dir.name) / "ordonnances" / str(self.ordonnance.pk)).exists())
+
+            self.client.get(self.url)
+            self.assertEqual(html_to_pdf.call_count, 2)
+
+    def test_process_pool_renders_pdf(self):
+        renderer = pdf.PdfRenderer(workers=1, max_pending=1, timeout=60)
+        self.addCleanup(renderer.shutdown)
+        content = renderer.render("<html><body><p>Bonjour</p></body></html>")
+        self.assertTrue(content.startswith(b"%PDF"))
+
+    def test_full_queue_is_rejected(self):
+        renderer = pdf.PdfRenderer(workers=1, max_pending=0, timeout=30)
+        renderer._slots.acquire()
+        started = time.monotonic()
+        with self.assertRaises(pdf.PdfBusyError):
+            renderer.render("<p>x</p>")
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_broken_pool_is_replaced(self):
+        renderer = pdf.PdfRenderer(workers=1, max_pending=0, timeout=30)
+        broken = mock.Mock()
+        future = Future()
+        future.set_exception(BrokenProcessPool("processus tué"))
+        broken.submit.return_value = future
+        renderer._pool = broken
+        with self.assertRaises(pdf.PdfRenderError):
+            renderer.render("<p>x</p>")
+        self.assertIsNone(renderer._pool)
+        broken.shutdown.assert_called_once()
+        # La place est rendue : un nouvel appel n'est pas refusé comme file pleine.
+        broken.submit.side_effect = BrokenProcessPool("processus tué")
+        renderer._pool = broken
+        with self.assertRaises(pdf.PdfRenderError) as ctx:
+            renderer.render("<p>x</p>")
+        self.assertNotIsInstance(ctx.exception, pdf.PdfBusyError)
+        self.assertIsNone(renderer._pool)
+
+    def _render(self):
+        renderer = pdf.PdfRenderer(workers=0, max_pending=0, timeout=30)
+        with mock.patch.object(pdf, "get_renderer", return_value=renderer):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return Path(self.cache_dir.name) / "ordonnances" / str(self.ordonnance.pk)
+
+    def test_patient_identity_change_invalidates_pdf(self):
+        cached = self._render()
+        self.assertTrue(cached.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.nom = "KOUASSI"
+            self.patient.save()
+        self.assertFalse(cached.exists())
+
+        # Un changement sans rapport avec l'ordonnance garde le cache.
+        self._render()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.patient.zone = "ABIDJAN"
+            self.patient.save(update_fields=["zone"])
+        self.assertTrue(cached.exists())
+
+    def test_bulk_helper_invalidates_pdf(self):
+        from patients.utils import invalidate_patient_pdfs
+
+        cached = self._render()
+        with self.captureOnCommitCallbacks(execute=True):
+            Patient.objects.filter(pk=self.patient.pk).update(nom="KOUASSI")
+            invalidate_patient_pdfs([self.patient.pk])
+        self.assertFalse(cached.exists())
+
+    def test_only_latest_version_is_kept(self):
+        cache = pdf.PdfCache(self.cache_dir.name)
+        cache.put("ordonnances/1", "a", b"%PDF-a")
+        cache.put("ordonnances/1", "b", b"%PDF-b")
+        self.assertEqual([p.name for p in (Path(self.cache_dir.name) / "ordonnances" / "1").iterdir()], ["b.pdf"])
+        self.assertIsNone(cache.get("ordonnances/1", "a"))
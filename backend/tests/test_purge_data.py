@@ -0,0 +1,79 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.deletion import Collector
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from audit.models import AuditLog
+from core.purge import purge_before
+from messaging.models import Notification
+from messaging.services import notify, unread_count
+from patients.models import SmsLog
+
+User = get_user_model()
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.old = self.now - timedelta(days=400)
+
+    def _audit(self, n: int, when) -> None:
+        AuditLog.objects.bulk_create(
+            AuditLog(action=AuditLog.ACTION_ACCESS, object_id=str(i), created_at=when) for i in range(n)
+        )
+
+    def test_deletes_old_rows_in_pk_batches(self):
+        self._audit(7, self.old)
+        self._audit(3, self.now)
+        with CaptureQueriesContext(connection) as ctx:
+            result = purge_before(AuditLog, self.now - timedelta(days=365), batch_size=3, pause=0)
+        self.assertEqual((result.deleted, result.batches, result.complete), (7, 3, True))
+        self.assertEqual(AuditLog.objects.count(), 3)
+        # Suppression directe : un DELETE par lot, aucune lecture des lignes supprimées
+        # (seule la lecture des clés ``SELECT "audit_auditlog"."id"`` précède chaque lot).
+        sqls = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(len([s for s in sqls if s.startswith("DELETE")]), 3)
+        selects = [s for s in sqls if s.startswith("SELECT")]
+        self.assertEqual(len(selects), 3)
+        for sql in selects:
+            self.assertRegex(sql, r'^SELECT "audit_auditlog"\."id"( AS "pk")? FROM ', sql)
+
+    def test_purged_models_use_the_fast_delete_path(self):
+        # Un récepteur post_delete ou une cascade ferait repasser la purge par la collecte Python.
+        for model in (AuditLog, Notification, SmsLog):
+            qs = model.objects.filter(pk__gte=1)
+            self.assertTrue(Collector(using=qs.db, origin=qs).can_fast_delete(qs), model.__name__)
+
+    def test_interrupted_purge_resumes(self):
+        self._audit(5, self.old)
+        cutoff = self.now - timedelta(days=365)
+        first = purge_before(AuditLog, cutoff, batch_size=2, pause=0, max_seconds=1e-9)
+        self.assertEqual((first.deleted, first.complete), (2, False))
+        second = purge_before(AuditLog, cutoff, batch_size=2, pause=0)
+        self.assertEqual((second.deleted, second.complete), (3, True))
+        self.assertFalse(AuditLog.objects.exists())
+
+    def test_command_purges_and_recounts_unread(self):
+        user = User.objects.create_user(username="u1", password="pw")
+        notify([user], titre="ancienne")
+        notify([user], titre="récente")
+        Notification.objects.filter(titre="ancienne").update(created_at=self.old)
+        self._audit(2, self.old)
+
+        out = io.StringIO()
+        call_command("purge_data", "--dry-run", "--include-audit", stdout=out)
+        self.assertIn("Notifications > 90j: 1 (dry-run)", out.getvalue())
+        self.assertEqual(Notification.objects.count(), 2)
+
+        out = io.StringIO()
+        call_command("purge_data", "--include-audit", "--batch-size", "1", "--pause", "0", stdout=out)
+        self.assertEqual(list(Notification.objects.values_list("titre", flat=True)), ["récente"])
+        self.assertEqual(unread_count(user.pk), 1)
+        self.assertFalse(AuditLog.objects.filter(created_at__lt=self.now - timedelta(days=365)).exists())
+        self.assertIn("AuditLog > 365j: 2 supprimés", out.getvalue())
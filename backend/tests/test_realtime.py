@@ -0,0 +1,114 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from messaging import realtime
+from messaging.models import Notification, Thread
+from messaging.services import mark_read, notify, recount_unread, unread_count
+
+User = get_user_model()
+
+
+class RecordingBroker(realtime.LocalBroker):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, user_id, event):
+        self.published.append((user_id, event))
+        super().publish(user_id, event)
+
+
+class RealtimeTests(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_superuser(username="u1", password="pw")
+        self.user2 = User.objects.create_user(username="u2", password="pw")
+        self.thread = Thread.objects.create(sujet="Suivi")
+        self.thread.participants.add(self.user1, self.user2)
+        self.broker = RecordingBroker()
+        patcher = mock.patch.object(realtime, "_broker", self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_broker_delivers_to_subscribers(self):
+        async def scenario():
+            sub = self.broker.subscribe(self.user2.pk)
+            self.broker.publish(self.user1.pk, {"kind": "notification"})
+            await asyncio.get_running_loop().run_in_executor(None, self.broker.publish, self.user2.pk, {"kind": "message"})
+            event = await sub.get(1)
+            self.broker.unsubscribe(sub)
+            return event, await sub.get(0.01)
+
+        self.assertEqual(asyncio.run(scenario()), ({"kind": "message"}, None))
+
+    def test_message_is_published_after_commit(self):
+        self.client.force_login(self.user1)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.post(f"/messages/{self.thread.pk}/", {"contenu": "Bonjour"})
+        self.assertEqual(self.broker.published, [])
+
+        for callback in callbacks:
+            callback()
+        kinds = sorted((user_id, event["kind"]) for user_id, event in self.broker.published)
+        self.assertEqual(kinds, [(self.user2.pk, "message"), (self.user2.pk, "notification")])
+
+    def test_unread_counter_follows_notifications(self):
+        notify([self.user2], titre="A")
+        notify([self.user2, self.user1], titre="B", url=f"/messages/{self.thread.pk}/")
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.user2.pk), 2)
+
+        self.client.force_login(self.user2)
+        self.assertEqual(self.client.get("/notifications/non-lues/").json(), {"count": 2})
+        self.client.get(f"/messages/{self.thread.pk}/")
+        self.assertEqual(unread_count(self.user2.pk), 1)
+        self.assertEqual(unread_count(self.user1.pk), 1)
+
+        response = self.client.post("/notifications/tout-lire/", HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json(), {"updated": 1, "count": 0})
+        self.assertEqual(unread_count(self.user2.pk), 0)
+        self.assertFalse(Notification.objects.filter(user=self.user2, lu=False).exists())
+
+    def test_recount_repairs_counter(self):
+        Notification.objects.create(user=self.user2, titre="Hors service")
+        self.assertEqual(unread_count(self.user2.pk), 0)
+        recount_unread([self.user2.pk])
+        self.assertEqual(unread_count(self.user2.pk), 1)
+        mark_read(self.user2.pk)
+        mark_read(self.user2.pk)
+        self.assertEqual(unread_count(self.user2.pk), 0)
+
+    async def test_stream_sends_unread_count_then_events(self):
+        await self.async_client.aforce_login(self.user2)
+        response = await self.async_client.get("/notifications/flux/")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+
+        first = await anext(chunks)
+        self.assertIn(b"event: unread", first)
+        self.assertIn(b'"count":0', first)
+
+        self.broker.publish(self.user2.pk, {"kind": "message", "thread_id": self.thread.pk, "contenu": "Salut"})
+        event = await anext(chunks)
+        self.assertTrue(event.startswith(b"event: message\n"))
+        self.assertEqual(json.loads(event.split(b"data: ", 1)[1])["contenu"], "Salut")
+        await chunks.aclose()
+
+    def test_stream_under_wsgi_returns_snapshot(self):
+        self.client.force_login(self.user2)
+        response = self.client.get("/notifications/flux/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b"retry: "))
+
+    def test_header_badge_reads_profile_counter(self):
+        notify([self.user1], titre="A")
+        self.client.force_login(self.user1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/messages/nouveau/")
+        self.assertContains(response, 'data-unread-count>1</span>')
+        self.assertFalse([q for q in queries if "messaging_notification" in q["sql"]])
@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from patients.models import Patient, RendezVous, SmsLog
+from patients.reminders import claim_batch, complete_batch, send_due_reminders
+from patients.sms_dispatch import SmsDispatcher
+from patients.sms_provider import SmsProvider, SmsSendResult
+
+
+class ScriptedProvider(SmsProvider):
+    name = "scripted"
+
+    def send_sms(self, phone, message):
+        if not phone:
+            return SmsSendResult(success=False, provider=self.name, error="Téléphone manquant", retryable=False)
+        if phone == "+busy":
+            return SmsSendResult(success=False, provider=self.name, error="timeout")
+        return SmsSendResult(success=True, provider=self.name, message_id=f"id{phone}")
+
+
+class ReminderClaimTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.rdvs = []
+        for i, phone in enumerate(["+1", "+2", "", "+busy", "+5"]):
+            patient = Patient.objects.create(code_patient=f"P-{i}", nom="KOFFI", prenoms="Grace", zone="BONOUA", telephone=phone)
+            self.rdvs.append(RendezVous.objects.create(patient=patient, date_heure=self.now + timedelta(hours=i + 1)))
+        # Hors fenêtre et annulé : jamais réservés
+        RendezVous.objects.create(patient=patient, date_heure=self.now + timedelta(days=3))
+        RendezVous.objects.create(patient=patient, date_heure=self.now + timedelta(hours=2), statut="ANNULE")
+
+    def test_concurrent_claims_do_not_overlap(self):
+        end = self.now + timedelta(hours=24)
+        token_a, first = claim_batch(self.now, end, limit=3)
+        token_b, second = claim_batch(self.now, end, limit=3)
+        _token, third = claim_batch(self.now, end, limit=3)
+
+        self.assertNotEqual(token_a, token_b)
+        self.assertEqual([r.pk for r in first], [r.pk for r in self.rdvs[:3]])
+        self.assertEqual([r.pk for r in second], [r.pk for r in self.rdvs[3:]])
+        self.assertEqual(third, [])
+
+    def test_expired_lease_is_reclaimed_and_stale_results_ignored(self):
+        end = self.now + timedelta(hours=24)
+        stale_token, _rdvs = claim_batch(self.now, end, limit=1)
+        RendezVous.objects.filter(pk=self.rdvs[0].pk).update(rappel_bail_expire=self.now - timedelta(seconds=1))
+
+        token, rdvs = claim_batch(self.now, end, limit=1)
+        self.assertEqual([r.pk for r in rdvs], [self.rdvs[0].pk])
+        complete_batch(stale_token, {self.rdvs[0].pk: SmsSendResult(success=False, retryable=False)})
+
+        rdv = RendezVous.objects.get(pk=self.rdvs[0].pk)
+        self.assertEqual((rdv.rappel_statut, rdv.rappel_jeton, rdv.rappel_tentatives), (RendezVous.RAPPEL_CLAIMED, token, 2))
+
+    def test_send_due_reminders_records_outcomes(self):
+        dispatcher = SmsDispatcher(ScriptedProvider(), concurrency=2, rate=0, max_attempts=1)
+        stats = send_due_reminders(dispatcher, hours=24, batch_size=2)
+
+        self.assertEqual((stats.total, stats.success, stats.failed), (5, 3, 2))
+        states = dict(RendezVous.objects.filter(pk__in=[r.pk for r in self.rdvs]).values_list("pk", "rappel_statut"))
+        self.assertEqual(
+            [states[r.pk] for r in self.rdvs],
+            ["SENT", "SENT", "FAILED", "PENDING", "SENT"],
+        )
+        self.assertEqual(SmsLog.objects.count(), 5)
+
+        # Relance immédiate : rien à envoyer ; après le délai, seul l'échec temporaire est retenté.
+        self.assertEqual(send_due_reminders(dispatcher, hours=24).total, 0)
+        RendezVous.objects.filter(pk=self.rdvs[3].pk).update(rappel_bail_expire=self.now)
+        stats = send_due_reminders(dispatcher, hours=24)
+        self.assertEqual(stats.total, 1)
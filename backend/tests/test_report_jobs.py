@@ -0,0 +1,62 @@
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from patients.models import Patient
+from reports.jobs import enqueue, run_pending
+from reports.models import Rapport
+
+
+@override_settings(REPORT_WORKER_EMBEDDED=False)
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = get_user_model().objects.create_superuser(username="admin", password="pw")
+        self.client.force_login(self.user)
+        Patient.objects.create(code_patient="P-1", nom="KOFFI", prenoms="Grace", zone="BONOUA")
+
+    def test_request_is_queued_then_generated_by_worker(self):
+        response = self.client.get("/reports/patients.xlsx")
+        rapport = Rapport.objects.get()
+        self.assertRedirects(response, f"/reports/rapports/{rapport.pk}/")
+        self.assertEqual(rapport.status, Rapport.STATUS_PENDING)
+
+        self.assertEqual(run_pending(), 1)
+        status = self.client.get(f"/reports/rapports/{rapport.pk}/status/").json()
+        self.assertEqual((status["status"], status["progress"]), ("DONE", 100))
+
+        download = self.client.get(status["download_url"])
+        ws = load_workbook(BytesIO(b"".join(download.streaming_content)), read_only=True).active
+        self.assertEqual([r[0] for r in ws.iter_rows(values_only=True)], ["Code", "P-1"])
+
+    def test_identical_request_reuses_recent_artifact(self):
+        first, reused = enqueue(Rapport.TYPE_PATIENTS_XLSX, user=self.user)
+        self.assertFalse(reused)
+        # Demande identique encore en attente : pas de doublon
+        self.assertEqual(enqueue(Rapport.TYPE_PATIENTS_XLSX)[0], first)
+
+        run_pending()
+        again, reused = enqueue(Rapport.TYPE_PATIENTS_XLSX)
+        self.assertEqual((again.pk, reused), (first.pk, True))
+
+        other, reused = enqueue(Rapport.TYPE_MENSUEL_PDF, {"month_start": "2026-01-01"})
+        self.assertFalse(reused)
+
+        Rapport.objects.filter(pk=first.pk).update(finished_at=timezone.now() - timezone.timedelta(hours=1))
+        self.assertNotEqual(enqueue(Rapport.TYPE_PATIENTS_XLSX)[0].pk, first.pk)
+
+    def test_failed_build_records_error(self):
+        rapport = Rapport.objects.create(type=Rapport.TYPE_MENSUEL_PDF, params={})
+        run_pending()
+        rapport.refresh_from_db()
+        self.assertEqual(rapport.status, Rapport.STATUS_FAILED)
+        self.assertIn("month_start", rapport.error)
@@ -0,0 +1,159 @@
+import json
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from patients.models import Patient, RendezVous, SmsLog
+from patients.sms_dispatch import SmsDispatcher, SmsJob, TokenBucket
+from patients.sms_provider import (
+    FakeSmsProvider,
+    HttpSmsProvider,
+    LocalFileSmsProvider,
+    SmsMessage,
+    SmsProvider,
+    SmsSendResult,
+    load_sms_provider,
+)
+
+
+class FlakyProvider(SmsProvider):
+    """Échoue ``failures`` fois par numéro avant de réussir."""
+
+    name = "flaky"
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def send_sms(self, phone, message):
+        if not phone:
+            return SmsSendResult(success=False, provider=self.name, error="Téléphone manquant", retryable=False)
+        with self._lock:
+            self.calls[phone] = self.calls.get(phone, 0) + 1
+            n = self.calls[phone]
+        if n <= self.failures:
+            return SmsSendResult(success=False, provider=self.name, error="timeout")
+        return SmsSendResult(success=True, provider=self.name, message_id=f"id-{phone}")
+
+
+class SmsDispatcherTests(TestCase):
+    def setUp(self):
+        patient = Patient.objects.create(code_patient="P-1", nom="KOFFI", prenoms="Grace", zone="BONOUA")
+        when = timezone.now() + timedelta(hours=2)
+        self.rdvs = [RendezVous.objects.create(patient=patient, date_heure=when) for _ in range(5)]
+
+    def _jobs(self, phones):
+        return [SmsJob(rendez_vous_id=rdv.pk, phone=phone, message="Rappel") for rdv, phone in zip(self.rdvs, phones)]
+
+    def test_retries_transient_failures_and_logs_in_batches(self):
+        provider = FlakyProvider(failures=2)
+        dispatcher = SmsDispatcher(
+            provider, concurrency=3, rate=0, max_attempts=3, backoff=1, log_batch_size=2, sleep=lambda _s: None
+        )
+        stats = dispatcher.dispatch(self._jobs(["+1", "+2", "+3", "+4", ""]))
+
+        self.assertEqual((stats.total, stats.success, stats.failed, stats.retries), (5, 4, 1, 8))
+        self.assertEqual(set(provider.calls.values()), {3})
+        self.assertEqual(SmsLog.objects.filter(statut=SmsLog.STATUT_SUCCES).count(), 4)
+        failed = SmsLog.objects.get(statut=SmsLog.STATUT_ECHEC)
+        self.assertEqual(failed.error_message, "Téléphone manquant")
+
+    def test_gives_up_after_max_attempts(self):
+        provider = FlakyProvider(failures=5)
+        dispatcher = SmsDispatcher(provider, concurrency=2, rate=0, max_attempts=2, backoff=1, sleep=lambda _s: None)
+        stats = dispatcher.dispatch(self._jobs(["+1", "+2"]), log=False)
+
+        self.assertEqual((stats.success, stats.failed, stats.retries), (0, 2, 2))
+        self.assertEqual(SmsLog.objects.count(), 0)
+
+    def test_missing_batch_results_are_retried(self):
+        class ShortProvider(FlakyProvider):
+            batch_size = 3
+            batches = 0
+
+            def send_batch(self, messages):
+                self.batches += 1
+                results = super().send_batch(messages)
+                # Premier appel : un seul résultat pour tout le lot.
+                return results[:1] if self.batches == 1 else results
+
+        provider = ShortProvider(failures=0)
+        dispatcher = SmsDispatcher(provider, concurrency=1, rate=0, max_attempts=2, backoff=1, sleep=lambda _s: None)
+        with self.assertLogs("patients.sms_dispatch", "WARNING"):
+            stats = dispatcher.dispatch(self._jobs(["+1", "+2", "+3"]))
+
+        self.assertEqual((stats.total, stats.success, stats.failed, stats.retries), (3, 3, 0, 2))
+        self.assertEqual(SmsLog.objects.filter(statut=SmsLog.STATUT_SUCCES).count(), 3)
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ports = set()
+
+    def do_POST(self):
+        _GatewayHandler.ports.add(self.client_address[1])
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = 400 if data["to"] == "+invalid" else 200
+        body = json.dumps({"id": f"gw-{data['to']}"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SmsProviderTests(TestCase):
+    def test_local_file_provider_writes_batches_to_one_handle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "out" / "sms.log"
+            provider = LocalFileSmsProvider(path=str(path))
+            results = provider.send_batch([SmsMessage("+1", "a"), SmsMessage("", "b"), SmsMessage("+2", "c")])
+            handle = provider._file
+            provider.send_sms("+3", "d")
+            self.assertIs(provider._file, handle)
+            provider.close()
+
+            self.assertEqual([r.success for r in results], [True, False, True])
+            self.assertFalse(results[1].retryable)
+            self.assertEqual(len(path.read_text(encoding="utf-8").splitlines()), 3)
+
+    def test_http_provider_reuses_connections(self):
+        _GatewayHandler.ports = set()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _GatewayHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            provider = HttpSmsProvider(f"http://127.0.0.1:{server.server_port}/send", token="t", pool_size=2)
+            results = provider.send_batch([SmsMessage(f"+{i}", "Rappel") for i in range(5)])
+            invalid = provider.send_sms("+invalid", "Rappel")
+            provider.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertTrue(all(r.success for r in results))
+        self.assertEqual(results[0].message_id, "gw-+0")
+        self.assertEqual(len(_GatewayHandler.ports), 1)
+        self.assertFalse(invalid.success)
+        self.assertFalse(invalid.retryable)
+
+    @override_settings(SMS_BACKEND="fake")
+    def test_registry_resolves_aliases_and_dotted_paths(self):
+        self.assertIsInstance(load_sms_provider(), FakeSmsProvider)
+        self.assertIsInstance(load_sms_provider("patients.sms_provider.LocalFileSmsProvider"), LocalFileSmsProvider)
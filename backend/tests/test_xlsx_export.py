@@ -0,0 +1,41 @@
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from patients.models import Consultation, Patient
+from reports import exports
+
+
+def _read(content: bytes):
+    ws = load_workbook(BytesIO(content), read_only=True).active
+    return ws.title, [list(r) for r in ws.iter_rows(values_only=True)]
+
+
+class StreamingXlsxExportTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for i in range(5):
+            p = Patient.objects.create(code_patient=f"P-{i}", nom=f"NOM{4 - i}", prenoms="Aï & <b>\x01", zone="BONOUA")
+            Consultation.objects.create(patient=p, date_consultation=now - timedelta(days=i), motif=f"m{i}")
+
+    def test_patients_export_is_a_valid_workbook(self):
+        with mock.patch.object(exports, "_chunk_size", return_value=2):
+            title, rows = _read(b"".join(exports.export_patients_xlsx()))
+
+        self.assertEqual(title, "Patients")
+        self.assertEqual(rows[0][0], "Code")
+        self.assertEqual([r[0] for r in rows[1:]], ["P-4", "P-3", "P-2", "P-1", "P-0"])
+        self.assertEqual(rows[1][2], "Aï & <b>")
+        self.assertEqual(rows[1][6], "Bonoua")
+
+    def test_consultations_export_is_ordered_by_date_desc(self):
+        with mock.patch.object(exports, "_chunk_size", return_value=2):
+            _title, rows = _read(b"".join(exports.export_consultations_xlsx()))
+
+        self.assertEqual(rows[0], ["Patient", "Date", "Motif", "Observation"])
+        self.assertEqual([r[2] for r in rows[1:]], ["m0", "m1", "m2", "m3", "m4"])
+        self.assertTrue(rows[1][0].startswith("P-0 - NOM4"))
@@ -52,3 +52,126 @@
     });
   }
 })();
+
+// Notifications en temps réel (Server-Sent Events) : badge de non-lues et messages du fil ouvert
+(() => {
+  const link = document.querySelector('[data-realtime]');
+  if (!link || !window.EventSource) return;
+
+  const badge = link.querySelector('[data-unread-count]');
+  const threadBox = document.querySelector('[data-thread-messages]');
+  const source = new EventSource(link.dataset.realtime);
+
+  source.addEventListener('unread', (e) => {
+    const { count } = JSON.parse(e.data);
+    badge.textContent = count > 99 ? '99+' : String(count);
+    badge.hidden = count === 0;
+  });
+
+  source.addEventListener('message', (e) => {
+    const msg = JSON.parse(e.data);
+    if (!threadBox || String(msg.thread_id) !== threadBox.dataset.threadMessages) return;
+    threadBox.querySelector('[data-message-list]').append(...renderMessage(msg));
+  });
+})();
+
+// Rendu d'un message de fil (mêmes balises que thread_detail.html)
+function renderMessage(msg) {
+  const head = document.createElement('div');
+  head.className = 'kv';
+  const label = document.createElement('span');
+  label.className = 'kv__k';
+  label.textContent = `${msg.sender} - ${new Date(msg.created_at).toLocaleString('fr-FR')}`;
+  head.appendChild(label);
+  const text = document.createElement('div');
+  text.className = 'card__text';
+  text.textContent = msg.contenu;
+  return [head, text];
+}
+
+// Historique d'un fil : chargement des messages précédents sans recharger la page
+(() => {
+  const button = document.querySelector('[data-load-earlier]');
+  if (!button || !window.fetch) return;
+  const list = document.querySelector('[data-message-list]');
+
+  button.addEventListener('click', async (e) => {
+    e.preventDefault();
+    const url = `${button.dataset.loadEarlier}?avant=${encodeURIComponent(button.dataset.cursor)}`;
+    const response = await fetch(url, { headers: { Accept: 'application/json' } });
+    if (!response.ok) return;
+    const data = await response.json();
+    list.prepend(...data.messages.flatMap(renderMessage));
+    if (data.earlier) {
+      button.dataset.cursor = data.earlier;
+    } else {
+      button.remove();
+    }
+  });
+})();
+
+// Dossier patient : entrées suivantes d'une rubrique (« Voir plus »)
+(() => {
+  const buttons = document.querySelectorAll('[data-load-more]');
+  if (!buttons.length || !window.fetch) return;
+
+  const kv = (key, value, href) => {
+    const row = document.createElement('div');
+    row.className = 'kv';
+    const k = document.createElement('span');
+    k.className = 'kv__k';
+    k.textContent = key;
+    const v = document.createElement('span');
+    v.className = 'kv__v';
+    if (href) {
+      const a = document.createElement('a');
+      a.className = 'link';
+      a.href = href;
+      a.textContent = value;
+      v.appendChild(a);
+    } else {
+      v.textContent = value;
+    }
+    row.append(k, v);
+    return row;
+  };
+  const text = (value, muted) => {
+    const div = document.createElement('div');
+    div.className = 'card__text';
+    if (muted) div.style.color = 'var(--muted)';
+    div.textContent = value;
+    return div;
+  };
+  const day = (iso) => new Date(iso).toLocaleDateString('fr-FR');
+  const moment = (iso) => new Date(iso).toLocaleString('fr-FR');
+
+  // Mêmes balises que patient_detail.html
+  const renderers = {
+    cpn: (s) => [kv(`CPN${s.numero}`, day(s.date))],
+    rdv: (r) => [kv(moment(r.date_heure), r.statut_display)],
+    consultations: (c) => [kv(moment(c.date_consultation), c.motif || '-'), ...(c.observation ? [text(c.observation)] : [])],
+    ordonnances: (o, list) => [
+      kv(day(o.date), 'Voir', `/patients/${list.dataset.patientId}/ordonnances/${o.id}/`),
+      ...(o.diagnostic ? [text(o.diagnostic)] : []),
+      ...(o.lignes.length ? [text(o.lignes.map((l) => l.medicament).join(', '), true)] : []),
+    ],
+  };
+
+  buttons.forEach((button) => {
+    const list = document.querySelector(`[data-section-list="${button.dataset.section}"]`);
+    const render = renderers[button.dataset.section];
+    button.addEventListener('click', async (e) => {
+      e.preventDefault();
+      const url = `${button.dataset.loadMore}?apres=${encodeURIComponent(button.dataset.cursor)}`;
+      const response = await fetch(url, { headers: { Accept: 'application/json' } });
+      if (!response.ok) return;
+      const data = await response.json();
+      list.append(...data.items.flatMap((item) => render(item, list)));
+      if (data.next) {
+        button.dataset.cursor = data.next;
+      } else {
+        button.remove();
+      }
+    });
+  });
+})();